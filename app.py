@@ -1,11 +1,17 @@
 
 
 from flask import Flask, render_template
-from fitness.db.db import init_db
+from fitness.db.db import init_db, init_app as init_db_app
 from fitness.cardio import cardio_bp
 from fitness.food import food_bp
 from fitness.health import health_bp
 from fitness.strength import strength_bp
+from fitness.jobs import jobs_bp
+from fitness.search import search_bp
+from fitness.api import api_bp
+from fitness.jobs.runner import recover_jobs
+from fitness.utils.metrics import init_app as init_metrics
+from fitness.db.writer import init_app as init_writer
 
 import os
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -16,6 +22,17 @@ app = Flask(__name__,
 
 app.secret_key = "supersecret"
 
+# request-scoped pooled SQLite connections (pool size / pragmas live in fitness/db/db.py)
+init_db_app(app)
+# per-endpoint latency and SQL statement/time metrics at /metrics
+init_metrics(app)
+# write transactions for the logging routes; FITNESS_WRITE_QUEUE=1 turns on group commit
+init_writer(app)
+# apply pending migrations; once the schema is current this is one version check
+init_db()
+# mark jobs orphaned by a crashed/restarted worker as failed
+recover_jobs()
+
 # tell Flask how many proxies to trust (set to 1 for single nginx)
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)
 
@@ -24,6 +41,9 @@ app.register_blueprint(cardio_bp, url_prefix="/cardio")
 app.register_blueprint(food_bp, url_prefix="/food")
 app.register_blueprint(health_bp, url_prefix="/health")
 app.register_blueprint(strength_bp, url_prefix="/strength")
+app.register_blueprint(jobs_bp, url_prefix="/jobs")
+app.register_blueprint(search_bp, url_prefix="/search")
+app.register_blueprint(api_bp, url_prefix="/api/v1")
 
 @app.route("/")
 def index():
@@ -31,5 +51,4 @@ def index():
 
 
 if __name__ == "__main__":
-    init_db()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,2 @@
+# bench/__init__.py
+"""Synthetic data generator and route benchmarks (see README: benchmarks)."""
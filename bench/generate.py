@@ -0,0 +1,152 @@
+# bench/generate.py
+"""Deterministic synthetic data for benchmarks.
+
+Fills a fresh database (all migrations applied) with `years` of history
+ending on `end`. `scale` multiplies the per-day volume; the same arguments
+and seed always produce the same rows.
+
+    python -m bench.generate --db /tmp/fitness-bench.db --years 5 --scale 10
+
+Per day at scale 1: ~1 cardio workout, ~5 food entries, ~2 health readings
+and ~0.6 strength workouts of 5 exercises x 4 sets (~4,400 sets a year).
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from fitness.db.cache import DATA_TABLES, bump_versions
+from fitness.db.migrate import upgrade
+from fitness.strength.analytics import rebuild_analytics
+from fitness.utils.export_import import insert_many
+from fitness.utils.helpers import calculate_pace
+
+CHUNK_SIZE = 20000
+
+ACTIVITIES = {"Run": (6.0, 3.0, 10.5), "Walk": (3.0, 1.5, 18.0), "Bike": (15.0, 6.0, 4.0),
+              "Swim": (1.0, 0.4, 30.0), "Row": (4.0, 1.5, 9.0)}  # name: (mean miles, sd, min/mile)
+FOODS = ["oats", "eggs", "toast", "banana", "apple", "yogurt", "protein shake", "chicken", "rice",
+         "salad", "pasta", "paneer", "roti", "dal", "salmon", "steak", "sandwich", "soup", "cereal",
+         "coffee", "tea", "chips", "salsa", "almonds", "berries", "cheese", "pizza", "burrito", "tofu"]
+MEALS = ("Breakfast", "Lunch", "Dinner", "Snack")
+NOTES = ["easy", "felt strong", "tired", "knee pain", "hot day", "windy", "great sleep", "short on time",
+         "new shoes", "with friends", "back was tight", "personal best", ""]
+EXERCISES = {
+    "Chest": ["Barbell Bench Press", "Incline Dumbbell Press", "Cable Fly", "Dips", "Push Up", "Decline Press"],
+    "Back": ["Deadlift", "Pull Up", "Barbell Row", "Lat Pulldown", "Seated Cable Row", "Face Pull"],
+    "Legs": ["Back Squat", "Leg Press", "Romanian Deadlift", "Walking Lunge", "Leg Curl", "Calf Raise"],
+    "Shoulders": ["Overhead Press", "Lateral Raise", "Rear Delt Fly", "Arnold Press", "Upright Row"],
+    "Arms": ["Barbell Curl", "Hammer Curl", "Triceps Pushdown", "Skull Crusher", "Preacher Curl"],
+}
+EXERCISES_PER_WORKOUT = 5
+SETS_PER_EXERCISE = 4
+
+
+def _daily(rng, per_day):
+    """How many events happen on one day, averaging per_day."""
+    whole = int(per_day)
+    return whole + (rng.random() < per_day - whole)
+
+
+def _chunks(conn, insert_sql, rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        insert_many(conn, insert_sql, rows[i:i + CHUNK_SIZE])
+
+
+def generate(path, years=1, scale=1.0, seed=42, end=date(2025, 12, 31)):
+    """Create `path` from scratch and fill it; returns {table: rows}."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    upgrade(conn)
+
+    rng = random.Random(seed)
+    start = end - timedelta(days=int(365 * years) - 1)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany("INSERT OR IGNORE INTO activity_types (name) VALUES (?)", [(a,) for a in ACTIVITIES])
+    activity_ids = {r["name"]: r["id"] for r in conn.execute("SELECT id, name FROM activity_types")}
+    meal_ids = {r["name"]: r["id"] for r in conn.execute("SELECT id, name FROM meal_types")}
+    conn.executemany("INSERT OR IGNORE INTO exercise_types (name, body_part) VALUES (?, ?)",
+                     [(name, part) for part, names in EXERCISES.items() for name in names])
+
+    cardio, food, health, workouts, exercises, sets = [], [], [], [], [], []
+    weight = 190.0
+    for day in days:
+        d = day.isoformat()
+        for _ in range(_daily(rng, scale)):
+            name = rng.choice(list(ACTIVITIES))
+            mean, sd, pace = ACTIVITIES[name]
+            distance = round(max(0.2, rng.gauss(mean, sd)), 2)
+            duration = round(distance * pace * rng.uniform(0.85, 1.15), 1)
+            cardio.append((d, f"{rng.randint(5, 20):02d}:{rng.randint(0, 59):02d}", activity_ids[name],
+                           distance, duration, calculate_pace(distance, duration), rng.randint(110, 170),
+                           int(duration * rng.uniform(7, 12)), round(weight, 1), rng.choice(NOTES) or None))
+        for _ in range(_daily(rng, 5 * scale)):
+            meal = rng.choice(MEALS)
+            item = rng.choice(FOODS) if rng.random() < 0.7 else f"{rng.choice(FOODS)} + {rng.choice(FOODS)}"
+            food.append((d, f"{rng.randint(6, 22):02d}:{rng.randint(0, 59):02d}", meal_ids[meal], item,
+                         str(rng.randint(1, 3)), rng.randint(50, 900) if rng.random() < 0.8 else None,
+                         rng.choice(NOTES) or None))
+        for _ in range(_daily(rng, 2 * scale)):
+            weight = min(260.0, max(140.0, weight + rng.gauss(0, 0.3)))
+            health.append((d, f"{rng.randint(6, 22):02d}:{rng.randint(0, 59):02d}", int(rng.gauss(125, 12)),
+                           int(rng.gauss(80, 8)), int(rng.gauss(70, 8)), round(weight, 1),
+                           round(weight * 703 / (65 * 65), 1)))
+        for _ in range(_daily(rng, 0.6 * scale)):
+            part = rng.choice(list(EXERCISES))
+            workout_id = len(workouts) + 1
+            workouts.append((workout_id, d, f"{rng.randint(5, 20):02d}:00", part, rng.choice(NOTES) or None))
+            for name in rng.sample(EXERCISES[part], EXERCISES_PER_WORKOUT):
+                exercise_id = len(exercises) + 1
+                exercises.append((exercise_id, workout_id, name))
+                base = rng.uniform(40, 250)
+                for n in range(1, SETS_PER_EXERCISE + 1):
+                    sets.append((exercise_id, n, rng.randint(3, 15), round(base * rng.uniform(0.9, 1.1) / 2.5) * 2.5,
+                                 rng.choice((60, 90, 120, 180))))
+
+    _chunks(conn, """INSERT INTO cardio_workouts (date, time, activity_type_id, distance_miles, duration_minutes,
+                     pace_min_per_mile, avg_heart_rate, calories_burned, weight_lbs, notes)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", cardio)
+    _chunks(conn, """INSERT INTO food_log (date, time, meal_type_id, food_item, quantity, calories, notes)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)""", food)
+    _chunks(conn, """INSERT INTO health_log (date, time, systolic, diastolic, bpm, weight, bmi)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)""", health)
+    _chunks(conn, "INSERT INTO workouts (id, date, time, body_part, notes) VALUES (?, ?, ?, ?, ?)", workouts)
+    _chunks(conn, "INSERT INTO exercises (id, workout_id, exercise_name) VALUES (?, ?, ?)", exercises)
+    _chunks(conn, "INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds) VALUES (?, ?, ?, ?, ?)",
+            sets)
+    bump_versions(conn, *DATA_TABLES)
+    conn.commit()
+
+    rebuild_analytics(conn)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return {"cardio_workouts": len(cardio), "food_log": len(food), "health_log": len(health),
+            "workouts": len(workouts), "exercises": len(exercises), "sets": len(sets)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database file to (re)create")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--scale", type=float, default=1, help="multiplier for the per-day volume")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = generate(args.db, args.years, args.scale, args.seed)
+    for table, rows in counts.items():
+        print(f"{table:16} {rows:>10,}")
+    print(f"generated {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
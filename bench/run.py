@@ -0,0 +1,247 @@
+# bench/run.py
+"""Route benchmarks on synthetic data, with regression checks against a baseline.
+
+For every data size (years of history at --scale) a database is generated
+once (cached in --data-dir) and copied. Each copy is then benchmarked in a
+fresh process, since FITNESS_DB_PATH is read at import. Every case is
+requested through the Flask test client: one cold request, then --repeat
+timed ones. Imports post --import-rows rows taken from the matching export
+and wait for the background job to finish.
+
+    python -m bench.run --sizes 1,5 --scale 2 --out bench/results/latest.json
+    python -m bench.run --sizes 1,5 --scale 2 --baseline bench/results/baseline.json
+
+Results are JSON. With --baseline, any case whose median is more than
+--threshold slower (and at least MIN_DELTA_MS slower) than the baseline is
+reported and the exit status is 1. --save-baseline writes the results as
+the new baseline.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# differences below this are noise, whatever the ratio
+MIN_DELTA_MS = 1.0
+
+GET_CASES = [
+    ("cardio_list", "/cardio/"),
+    ("cardio_api_list", "/cardio/api/workouts"),
+    ("cardio_dashboard", "/cardio/dashboard"),
+    ("food_list", "/food/food"),
+    ("food_dashboard", "/food/food/dashboard"),
+    ("food_items", "/food/api/food/items?q=ch"),
+    ("health_list", "/health/health"),
+    ("health_dashboard", "/health/health/dashboard"),
+    ("health_series", "/health/api/health/series"),
+    ("strength_list", "/strength/strength"),
+    ("strength_api_list", "/strength/api/workouts?expand=exercises"),
+    ("strength_dashboard", "/strength/strength_dashboard"),
+    ("get_strength_data", "/strength/api/strength_data/{exercise_type_id}"),
+    ("search", "/search/api?q=knee"),
+    ("export_cardio_csv", "/cardio/export_csv"),
+    ("export_cardio_json", "/cardio/export_json"),
+    ("export_cardio_ndjson", "/cardio/export_ndjson"),
+    ("export_food_csv", "/food/food/export_csv"),
+    ("export_food_json", "/food/food/export_json"),
+    ("export_food_ndjson", "/food/food/export_ndjson"),
+    ("export_health_csv", "/health/health/export"),
+    ("export_strength_csv", "/strength/export_strength/csv"),
+    ("export_strength_json", "/strength/export_strength/json"),
+    ("export_strength_ndjson", "/strength/export_strength/ndjson"),
+]
+
+# name: (export the payload is cut from, import url, extra form fields)
+IMPORT_CASES = [
+    ("import_cardio_csv", "/cardio/export_csv", "/cardio/import_csv", {}),
+    ("import_food_csv", "/food/food/export_csv", "/food/food/import_csv", {}),
+    ("import_health_csv", "/health/health/export", "/health/health/import", {}),
+    ("import_strength_csv", "/strength/export_strength/csv", "/strength/import_strength", {"format": "csv"}),
+]
+IMPORT_REPEAT = 3
+ROW_TABLES = ("cardio_workouts", "food_log", "health_log", "workouts", "exercises", "sets")
+
+
+def _stats(first, samples):
+    samples = sorted(samples)
+    return {
+        "first_ms": round(first, 2),
+        "min_ms": round(samples[0], 2),
+        "median_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "runs": len(samples),
+    }
+
+
+# ---------------------------
+# Worker (one database, one process)
+# ---------------------------
+def run_worker(repeat, import_rows):
+    from app import app
+    from fitness.db.db import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    rows = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ROW_TABLES}
+    top_type = conn.execute("SELECT exercise_type_id FROM exercises GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1")
+    params = {"exercise_type_id": (top_type.fetchone() or [0])[0]}
+    conn.close()
+
+    client = app.test_client()
+    cases = {}
+
+    def timed_get(url):
+        started = time.perf_counter()
+        resp = client.get(url)
+        body = resp.get_data()  # drains streamed exports too
+        elapsed = (time.perf_counter() - started) * 1000
+        resp.close()
+        return elapsed, resp.status_code, len(body)
+
+    for name, url in GET_CASES:
+        url = url.format(**params)
+        first, status, size = timed_get(url)
+        samples = [timed_get(url)[0] for _ in range(repeat)]
+        cases[name] = {**_stats(first, samples), "status": status, "bytes": size}
+
+    for name, export_url, import_url, form in IMPORT_CASES:
+        resp = client.get(export_url)
+        lines = resp.get_data(as_text=True).splitlines()[:import_rows + 1]
+        resp.close()
+        payload = ("\n".join(lines) + "\n").encode()
+        timings, status = [], None
+        for _ in range(IMPORT_REPEAT + 1):
+            started = time.perf_counter()
+            resp = client.post(import_url, data={**form, "file": (io.BytesIO(payload), "bench.csv")},
+                               headers={"Accept": "application/json"}, content_type="multipart/form-data")
+            job_id = resp.get_json()["job_id"]
+            while True:
+                job = client.get(f"/jobs/api/{job_id}").get_json()
+                if job["status"] not in ("queued", "running"):
+                    break
+                time.sleep(0.005)
+            timings.append((time.perf_counter() - started) * 1000)
+            status = job["status"]
+        cases[name] = {**_stats(timings[0], timings[1:]), "status": status, "rows": len(lines) - 1}
+
+    json.dump({"rows": rows, "cases": cases}, sys.stdout)
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _copy_db(src, dst):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(dst + suffix):
+            os.remove(dst + suffix)
+    with sqlite3.connect(src) as source, sqlite3.connect(dst) as target:
+        source.backup(target)
+
+
+def bench_size(years, args):
+    from bench.generate import generate
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    base = os.path.join(args.data_dir, f"y{years:g}-s{args.scale:g}-seed{args.seed}.db")
+    if args.regenerate or not os.path.exists(base):
+        print(f"generating {base} ...", file=sys.stderr)
+        generate(base, years, args.scale, args.seed)
+    work = base.replace(".db", ".work.db")
+    _copy_db(base, work)
+
+    env = dict(os.environ, FITNESS_DB_PATH=work,
+               FITNESS_JOBS_DB_PATH=os.path.join(args.data_dir, "jobs.db"))
+    proc = subprocess.run([sys.executable, "-m", "bench.run", "--worker", "--repeat", str(args.repeat),
+                           "--import-rows", str(args.import_rows)],
+                          env=env, capture_output=True, text=True)
+    if proc.returncode:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"benchmark worker failed for {years:g} years")
+    return json.loads(proc.stdout)
+
+
+def compare(results, baseline, threshold):
+    """[(size, case, baseline median, median)] for cases that got slower."""
+    regressions = []
+    for label, size in results["sizes"].items():
+        base_cases = baseline.get("sizes", {}).get(label, {}).get("cases", {})
+        for case, stats in size["cases"].items():
+            base = base_cases.get(case)
+            if base is None:
+                continue
+            before, after = base["median_ms"], stats["median_ms"]
+            if after > before * (1 + threshold) and after - before >= MIN_DELTA_MS:
+                regressions.append((label, case, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,5", help="comma-separated years of history")
+    parser.add_argument("--scale", type=float, default=1, help="per-day volume multiplier (see bench.generate)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="timed requests per case after the cold one")
+    parser.add_argument("--import-rows", type=int, default=5000)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "fitness-bench"))
+    parser.add_argument("--regenerate", action="store_true", help="rebuild cached databases")
+    parser.add_argument("--out", default=os.path.join("bench", "results", "latest.json"))
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(args.repeat, args.import_rows)
+
+    results = {
+        "meta": {"created": datetime.now().isoformat(timespec="seconds"), "git": _git_revision(),
+                 "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "scale": args.scale, "seed": args.seed, "repeat": args.repeat},
+        "sizes": {},
+    }
+    for years in (float(s) for s in args.sizes.split(",")):
+        label = f"{years:g}y"
+        results["sizes"][label] = size = bench_size(years, args)
+        print(f"\n{label}: " + ", ".join(f"{t} {n:,}" for t, n in size["rows"].items()))
+        for case, stats in size["cases"].items():
+            print(f"  {case:24} median {stats['median_ms']:9.2f} ms   first {stats['first_ms']:9.2f} ms"
+                  f"   [{stats['status']}]")
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        results["regressions"] = [{"size": s, "case": c, "baseline_ms": b, "median_ms": m}
+                                  for s, c, b, m in regressions]
+
+    for path in filter(None, (args.out, args.baseline if args.save_baseline else None)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote {path}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) (> {args.threshold:.0%} slower than baseline):")
+        for size, case, before, after in regressions:
+            print(f"  {size} {case}: {before:.2f} ms -> {after:.2f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# fitness/api/__init__.py
+
+from flask import Blueprint
+
+# Define the blueprint
+api_bp = Blueprint(
+    'api_bp',
+    __name__
+)
+
+# Import routes after blueprint creation
+from fitness.api.routes import ingest_routes
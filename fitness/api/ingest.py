@@ -0,0 +1,221 @@
+# fitness/api/ingest.py
+"""Batch ingestion of JSON records for the /api/v1 endpoints.
+
+A batch is a list of records of one kind, in the same layout the JSON
+exports use:
+
+    cardio    {date, time, activity_type, distance_miles, duration_minutes, pace_min_per_mile,
+               avg_heart_rate, calories_burned, weight_lbs, notes}
+    food      {date, time, meal_type, food_item, quantity, calories, notes}
+    health    {date, time, systolic, diastolic, bpm, weight}
+    strength  {date, time, body_part, notes,
+               exercises: [{exercise_name, sets: [{set_number, reps, weight, rest_seconds}]}]}
+
+Any record may carry an `idempotency_key`. ingest_keys remembers the id
+created for each (kind, key), so a retried record (or a repeat within the
+same batch) is reported as a duplicate and not inserted again.
+
+ingest() validates every record in one pass. Lookup names (activity and
+meal types) are only resolved to ids, creating unknown ones, for the
+records that passed, so a rejected record leaves nothing behind. It then
+reserves ids with allocate_ids() and writes the valid records and their
+keys with insert_many(), one statement per table, in the caller's
+transaction. The
+result has one entry per record, in order:
+
+    {"index": 0, "status": "created", "id": 812}
+    {"index": 1, "status": "duplicate", "id": 640}
+    {"index": 2, "status": "invalid", "error": "date is required"}
+"""
+import json
+
+from fitness.db.cache import bump_versions
+from fitness.strength.analytics import refresh_workouts
+from fitness.utils.export_import import (LookupMap, allocate_ids, insert_many, to_date, to_float, to_int,
+                                         to_text, to_time)
+
+# records per request at most
+MAX_BATCH_ITEMS = 1000
+KEY_FIELD = "idempotency_key"
+MAX_KEY_LENGTH = 200
+
+
+class BatchRejected(Exception):
+    """Raised (rolling the batch back) when an atomic batch has invalid records."""
+
+    def __init__(self, results):
+        super().__init__("batch rejected")
+        self.results = results
+
+
+# ---------------------------
+# Record converters
+# ---------------------------
+# A lookup column holds the name until ingest() resolves it (see KINDS).
+def _required(item, field):
+    value = to_text(item.get(field))
+    if value is None:
+        raise ValueError(f"{field} is required")
+    return value
+
+
+def _cardio(item):
+    return (to_date(item.get("date")), to_time(item.get("time")), _required(item, "activity_type"),
+            to_float(item.get("distance_miles")), to_float(item.get("duration_minutes")),
+            to_text(item.get("pace_min_per_mile")), to_int(item.get("avg_heart_rate")),
+            to_int(item.get("calories_burned")), to_float(item.get("weight_lbs")), to_text(item.get("notes")))
+
+
+def _food(item):
+    food_item = _required(item, "food_item")
+    # unknown/missing meal types are created on the fly, as in the CSV import
+    meal_type = to_text(item.get("meal_type")) or "Unknown"
+    return (to_date(item.get("date")), to_time(item.get("time")), meal_type, food_item,
+            to_text(item.get("quantity")), to_int(item.get("calories")), to_text(item.get("notes")))
+
+
+def _health(item):
+    weight = to_float(item.get("weight"))
+    bmi = round(weight * 703 / (65 * 65), 1) if weight else None  # 5'5" = 65 inches
+    return (to_date(item.get("date")), to_time(item.get("time")), to_int(item.get("systolic")),
+            to_int(item.get("diastolic")), to_int(item.get("bpm")), weight, bmi)
+
+
+def _strength(item):
+    """-> ((date, time, body_part, notes), [(exercise_name, [set params])])."""
+    exercises = []
+    for ex in item.get("exercises") or []:
+        name = to_text(ex.get("exercise_name"))
+        if name is None:
+            raise ValueError("exercise_name is required")
+        sets = [(to_int(s.get("set_number")) or n, to_int(s.get("reps")), to_float(s.get("weight")),
+                 to_int(s.get("rest_seconds")))
+                for n, s in enumerate(ex.get("sets") or [], start=1)]
+        exercises.append((name, sets))
+    workout = (to_date(item.get("date")), to_time(item.get("time")), to_text(item.get("body_part")),
+               to_text(item.get("notes")))
+    return workout, exercises
+
+
+# ---------------------------
+# Writers: (conn, [(id, params)]) -> None
+# ---------------------------
+def _insert(insert_sql):
+    def write(conn, rows):
+        insert_many(conn, insert_sql, [(id, *params) for id, params in rows])
+    return write
+
+
+def _write_strength(conn, rows):
+    exercises, sets = [], []
+    all_exercises = [(workout_id, ex) for workout_id, (_, exs) in rows for ex in exs]
+    for (workout_id, (name, ex_sets)), ex_id in zip(all_exercises,
+                                                     allocate_ids(conn, "exercises", len(all_exercises))):
+        exercises.append((ex_id, workout_id, name))
+        sets.extend((ex_id, *s) for s in ex_sets)
+    workouts = [(workout_id, *workout) for workout_id, (workout, _) in rows]
+    insert_many(conn, "INSERT INTO workouts (id, date, time, body_part, notes) VALUES (?, ?, ?, ?, ?)", workouts)
+    insert_many(conn, "INSERT INTO exercises (id, workout_id, exercise_name) VALUES (?, ?, ?)", exercises)
+    insert_many(conn, """
+        INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
+        VALUES (?, ?, ?, ?, ?)
+    """, sets)
+    refresh_workouts(conn, [workout_id for workout_id, _ in rows])
+    bump_versions(conn, "exercises", "sets")
+
+
+# kind -> (table, {param index: lookup table}, convert, write)
+KINDS = {
+    "cardio": ("cardio_workouts", {2: "activity_types"}, _cardio, _insert("""
+        INSERT INTO cardio_workouts (id, date, time, activity_type_id, distance_miles, duration_minutes,
+            pace_min_per_mile, avg_heart_rate, calories_burned, weight_lbs, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """)),
+    "food": ("food_log", {2: "meal_types"}, _food, _insert("""
+        INSERT INTO food_log (id, date, time, meal_type_id, food_item, quantity, calories, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """)),
+    "health": ("health_log", {}, _health, _insert("""
+        INSERT INTO health_log (id, date, time, systolic, diastolic, bpm, weight, bmi)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """)),
+    "strength": ("workouts", {}, _strength, _write_strength),
+}
+
+
+def _key(item):
+    key = item.get(KEY_FIELD)
+    if key is None:
+        return None
+    if not isinstance(key, (str, int)) or isinstance(key, bool) or not str(key) or len(str(key)) > MAX_KEY_LENGTH:
+        raise ValueError(f"{KEY_FIELD} must be a non-empty string of at most {MAX_KEY_LENGTH} characters")
+    return str(key)
+
+
+def _error(e):
+    if isinstance(e, KeyError):
+        return f"missing {e.args[0]}"
+    if isinstance(e, AttributeError):
+        return "expected an object"
+    return str(e)
+
+
+def ingest(conn, kind, items, atomic=False):
+    """Validate and write a batch of `kind` records; returns the per-record results.
+
+    Runs in the caller's write transaction. Invalid records are skipped, or
+    with atomic=True the whole batch is rejected with BatchRejected.
+    """
+    table, lookup_columns, convert, write = KINDS[kind]
+    keys = [item.get(KEY_FIELD) if isinstance(item, dict) else None for item in items]
+    known = dict(conn.execute(
+        "SELECT key, record_id FROM ingest_keys WHERE kind = ? AND key IN (SELECT value FROM json_each(?))",
+        (kind, json.dumps([str(k) for k in keys if isinstance(k, (str, int))]))))
+
+    results, accepted, first_index = [], [], {}
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise TypeError("expected an object")
+            key = _key(item)
+            if key is not None and (key in known or key in first_index):
+                results.append({"index": index, "status": "duplicate", "id": known.get(key), "key": key})
+                continue
+            params = convert(item)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            results.append({"index": index, "status": "invalid", "error": _error(e)})
+            continue
+        if key is not None:
+            first_index[key] = len(accepted)
+        results.append({"index": index, "status": "created"})
+        accepted.append((key, params))
+
+    if atomic and any(r["status"] == "invalid" for r in results):
+        raise BatchRejected(results)
+
+    if accepted and lookup_columns:
+        lookups = {index: LookupMap(conn, name) for index, name in lookup_columns.items()}
+        accepted = [(key, tuple(lookups[i](value) if i in lookups else value for i, value in enumerate(params)))
+                    for key, params in accepted]
+
+    ids = allocate_ids(conn, table, len(accepted))
+    write(conn, [(id, params) for id, (_, params) in zip(ids, accepted)])
+    if accepted:
+        bump_versions(conn, table)
+    insert_many(conn, "INSERT INTO ingest_keys (kind, key, record_id) VALUES (?, ?, ?)",
+                [(kind, key, id) for id, (key, _) in zip(ids, accepted) if key is not None])
+
+    created = iter(ids)
+    for result in results:
+        if result["status"] == "created":
+            result["id"] = next(created)
+        elif result["status"] == "duplicate":
+            key = result.pop("key")
+            if result["id"] is None:   # repeated within this batch
+                result["id"] = ids[first_index[key]]
+    return results
+
+
+def summarize(kind, results):
+    counts = {status: sum(r["status"] == status for r in results) for status in ("created", "duplicate", "invalid")}
+    return {"kind": kind, **counts, "results": results}
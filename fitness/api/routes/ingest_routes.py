@@ -0,0 +1,29 @@
+# fitness/api/routes/ingest_routes.py
+from flask import abort, jsonify, request
+from fitness.db.writer import write
+from fitness.api import api_bp
+from fitness.api.ingest import KINDS, MAX_BATCH_ITEMS, BatchRejected, ingest, summarize
+
+
+@api_bp.route('/<kind>', methods=['POST'])
+def ingest_batch(kind):
+    """POST a JSON array of records (or {"items": [...]}) of one kind.
+
+    200 with per-record results; with ?atomic=1 any invalid record rejects
+    the whole batch with 422 and nothing is written.
+    """
+    if kind not in KINDS:
+        abort(404)
+    body = request.get_json(silent=True)
+    items = body.get('items') if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        return jsonify({"error": "expected a JSON array of records or {\"items\": [...]}"}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"at most {MAX_BATCH_ITEMS} records per batch"}), 413
+
+    atomic = request.args.get('atomic', '').lower() in ('1', 'true', 'yes')
+    try:
+        results = write(ingest, kind, items, atomic)
+    except BatchRejected as e:
+        return jsonify(summarize(kind, e.results)), 422
+    return jsonify(summarize(kind, results))
@@ -9,8 +9,10 @@ cardio_bp = Blueprint(
     'cardio_bp',
     __name__,
     template_folder='templates',
-    static_folder='static'
+    static_folder='static',
+    cli_group='cardio'
 )
 
 # Import routes after blueprint creation
 from fitness.cardio.routes import cardio_routes,activity_routes
+from fitness.cardio import rollup
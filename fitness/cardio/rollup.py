@@ -0,0 +1,132 @@
+# fitness/cardio/rollup.py
+"""Weekly cardio rollup (cardio_weekly_rollup).
+
+The table is maintained by triggers on cardio_workouts (migration 0005); this
+module reads it for the dashboard and can rebuild or verify it from the base
+table:
+
+    flask cardio rebuild-rollup
+    flask cardio check-rollup
+"""
+import click
+
+from fitness.cardio import cardio_bp
+from fitness.db.cache import bump_versions
+from fitness.db.db import get_connection
+from fitness.utils.charts import load_columns, memoized, period_over_period, ratio, rolling_mean, to_list
+
+TREND_WEEKS = 4
+
+ROLLUP_COLUMNS = ("workout_count", "total_distance", "total_duration",
+                  "total_calories", "pace_sum", "pace_count")
+
+# Same aggregation as the triggers, computed from scratch.
+WEEKLY_AGGREGATE_SQL = """
+    SELECT IFNULL(strftime('%Y-%W', date), '') AS week,
+           COUNT(*) AS workout_count,
+           IFNULL(SUM(NULLIF(distance_miles, '')), 0) AS total_distance,
+           IFNULL(SUM(NULLIF(duration_minutes, '')), 0) AS total_duration,
+           IFNULL(SUM(NULLIF(calories_burned, '')), 0) AS total_calories,
+           IFNULL(SUM(duration_minutes / NULLIF(distance_miles, 0)), 0) AS pace_sum,
+           COUNT(duration_minutes / NULLIF(distance_miles, 0)) AS pace_count
+    FROM cardio_workouts
+    GROUP BY 1
+"""
+
+
+WEEKLY_TOTALS_SQL = """
+    SELECT week, workout_count, total_distance, total_calories, total_duration, pace_sum, pace_count
+    FROM cardio_weekly_rollup
+    ORDER BY week
+"""
+
+
+@memoized("cardio_workouts")
+def weekly_trends(conn):
+    """Dashboard series, one value per week (oldest first), computed on arrays.
+
+    Adds a TREND_WEEKS rolling average of distance and pace and the
+    week-over-week change in distance to the rollup's totals.
+    """
+    data = load_columns(conn, WEEKLY_TOTALS_SQL)
+    distance = data["total_distance"]
+    pace = ratio(data["pace_sum"], data["pace_count"])
+    _, distance_change = period_over_period(distance)
+    return {
+        "weeks": data["week"].tolist(),
+        "distances": to_list(distance),
+        "calories": to_list(data["total_calories"], 0),
+        "pace_decimal": to_list(pace),
+        "distance_avg": to_list(rolling_mean(distance, TREND_WEEKS)),
+        "distance_change_pct": to_list(distance_change, 1),
+        "pace_trend": to_list(rolling_mean(pace, TREND_WEEKS)),
+    }
+
+
+def rebuild_rollup(conn):
+    """Recompute the whole rollup from cardio_workouts; returns the number of weeks.
+
+    Bumps cardio_workouts' version so the memoized dashboard data is dropped.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM cardio_weekly_rollup")
+        cur = conn.execute(f"INSERT INTO cardio_weekly_rollup (week, {', '.join(ROLLUP_COLUMNS)}) "
+                           + WEEKLY_AGGREGATE_SQL)
+        bump_versions(conn, "cardio_workouts")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+
+def check_rollup(conn, tolerance=1e-6):
+    """Compare the rollup with a fresh aggregate.
+
+    Returns a list of (week, stored, expected) for weeks that differ; stored or
+    expected is None when the week is missing on that side. Sums are compared
+    with a small tolerance since the triggers add and subtract floats; a stored
+    value that is not a number (e.g. '') is always a mismatch.
+    """
+    def differs(have, want):
+        if not isinstance(have, (int, float)) or not isinstance(want, (int, float)):
+            return True
+        return abs(have - want) > tolerance
+
+    stored = {r["week"]: r for r in conn.execute("SELECT * FROM cardio_weekly_rollup")}
+    expected = {r["week"]: r for r in conn.execute(WEEKLY_AGGREGATE_SQL)}
+    mismatches = []
+    for week in sorted(stored.keys() | expected.keys()):
+        have, want = stored.get(week), expected.get(week)
+        if have is None or want is None or any(
+                differs(have[c], want[c]) for c in ROLLUP_COLUMNS):
+            mismatches.append((week,
+                               dict(have) if have is not None else None,
+                               dict(want) if want is not None else None))
+    return mismatches
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+@cardio_bp.cli.command("rebuild-rollup")
+def rebuild_rollup_command():
+    """Recompute cardio_weekly_rollup from cardio_workouts."""
+    conn = get_connection()
+    weeks = rebuild_rollup(conn)
+    conn.close()
+    click.echo(f"rebuilt cardio_weekly_rollup: {weeks} weeks")
+
+
+@cardio_bp.cli.command("check-rollup")
+def check_rollup_command():
+    """Verify cardio_weekly_rollup against cardio_workouts (exit 1 on mismatch)."""
+    conn = get_connection()
+    mismatches = check_rollup(conn)
+    conn.close()
+    for week, have, want in mismatches:
+        click.echo(f"week {week!r}: stored {have} expected {want}")
+    if mismatches:
+        raise click.exceptions.Exit(1)
+    click.echo("cardio_weekly_rollup is consistent")
@@ -1,5 +1,6 @@
 from flask import render_template, request, redirect, url_for, flash
 from fitness.db.db import get_connection
+import sqlite3
 from fitness.cardio import cardio_bp
 
 # ---------------------------
@@ -53,8 +54,11 @@ def edit_activity_type(id):
 def delete_activity_type(id):
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("DELETE FROM activity_types WHERE id=?", (id,))
-    conn.commit()
+    try:
+        cur.execute("DELETE FROM activity_types WHERE id=?", (id,))
+        conn.commit()
+        flash("Activity type deleted.", "warning")
+    except sqlite3.IntegrityError:
+        flash("Activity type is used by existing workouts.", "danger")
     conn.close()
-    flash("Activity type deleted.", "warning")
     return redirect(url_for("cardio_bp.activity_types"))
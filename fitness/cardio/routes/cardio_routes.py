@@ -1,52 +1,69 @@
 # fitness/cardio/routes/cardio_routes.py
 from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from fitness.db.cache import lookup_cache
 from fitness.db.db import get_connection
+from fitness.db.writer import execute as execute_write
 from fitness.utils.helpers import calculate_pace
+from fitness.utils.pagination import keyset_page
+from fitness.utils.conditional import conditional
+from fitness.utils.export_import import (iter_csv, iter_ndjson, csv_response, ndjson_response,
+                                         export_query, export_filters, bulk_import,
+                                         LookupMap,
+                                         to_text, to_int, to_float, to_date, to_time)
 from fitness.cardio import cardio_bp
+from fitness.jobs.runner import job_started, save_upload, submit
+from fitness.cardio.rollup import TREND_WEEKS, weekly_trends
 import csv, io
 
 
+CARDIO_LIST_SQL = """
+    SELECT cw.*, at.name AS activity_name
+    FROM cardio_workouts cw
+    JOIN activity_types at ON cw.activity_type_id = at.id
+"""
+
+
 # ---------------------------
 # Cardio Workouts CRUD
 # ---------------------------
 @cardio_bp.route("/")
+@conditional("cardio_workouts", "activity_types")
 def cardio_list():
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT cw.*, at.name AS activity_name
-        FROM cardio_workouts cw
-        JOIN activity_types at ON cw.activity_type_id = at.id
-        ORDER BY date DESC, time DESC
-    """)
-    workouts = cur.fetchall()
+    page = keyset_page(conn, CARDIO_LIST_SQL, alias="cw")
     conn.close()
-    return render_template("cardio_list.html", workouts=workouts)
+    return render_template("cardio_list.html", workouts=page.items, page=page)
+
+
+@cardio_bp.route("/api/workouts")
+@conditional("cardio_workouts", "activity_types")
+def api_cardio_list():
+    conn = get_connection()
+    page = keyset_page(conn, CARDIO_LIST_SQL, alias="cw")
+    conn.close()
+    return jsonify(page.to_dict())
 
 
 @cardio_bp.route("/add", methods=["GET", "POST"])
 def add_cardio():
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM activity_types ORDER BY name")
-    activity_types = cur.fetchall()
+    activity_types = lookup_cache.rows(conn, "activity_types")
 
     if request.method == "POST":
         data = {key: request.form.get(key) for key in request.form}
-        distance = float(data["distance_miles"]) if data["distance_miles"] else None
-        duration = float(data["duration_minutes"]) if data["duration_minutes"] else None
+        distance = to_float(data["distance_miles"])
+        duration = to_float(data["duration_minutes"])
 
-        cur.execute("SELECT name FROM activity_types WHERE id=?", (data["activity_type_id"],))
-        activity_name = cur.fetchone()["name"].lower()
+        activity_name = lookup_cache.get(conn, "activity_types", data["activity_type_id"])["name"].lower()
         pace = calculate_pace(distance, duration) if "run" in activity_name or "treadmill" in activity_name else None
 
-        cur.execute("""
+        execute_write("""
             INSERT INTO cardio_workouts (date, time, activity_type_id, distance_miles, duration_minutes,
                 pace_min_per_mile, avg_heart_rate, calories_burned, weight_lbs, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (data["date"], data["time"], data["activity_type_id"], distance, duration,
-              pace, data["avg_heart_rate"], data["calories_burned"], data["weight_lbs"], data["notes"]))
-        conn.commit()
+              pace, to_int(data["avg_heart_rate"]), to_int(data["calories_burned"]), to_float(data["weight_lbs"]),
+              data["notes"]))
         conn.close()
         flash("Workout added successfully!", "success")
         return redirect(url_for("cardio_bp.cardio_list"))
@@ -59,26 +76,24 @@ def add_cardio():
 def edit_cardio(id):
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM activity_types ORDER BY name")
-    activity_types = cur.fetchall()
+    activity_types = lookup_cache.rows(conn, "activity_types")
 
     if request.method == "POST":
         data = {key: request.form.get(key) for key in request.form}
-        distance = float(data["distance_miles"]) if data["distance_miles"] else None
-        duration = float(data["duration_minutes"]) if data["duration_minutes"] else None
+        distance = to_float(data["distance_miles"])
+        duration = to_float(data["duration_minutes"])
 
-        cur.execute("SELECT name FROM activity_types WHERE id=?", (data["activity_type_id"],))
-        activity_name = cur.fetchone()["name"].lower()
+        activity_name = lookup_cache.get(conn, "activity_types", data["activity_type_id"])["name"].lower()
         pace = calculate_pace(distance, duration) if "run" in activity_name or "treadmill" in activity_name else None
 
-        cur.execute("""
+        execute_write("""
             UPDATE cardio_workouts
             SET date=?, time=?, activity_type_id=?, distance_miles=?, duration_minutes=?,
                 pace_min_per_mile=?, avg_heart_rate=?, calories_burned=?, weight_lbs=?, notes=?
             WHERE id=?
         """, (data["date"], data["time"], data["activity_type_id"], distance, duration,
-              pace, data["avg_heart_rate"], data["calories_burned"], data["weight_lbs"], data["notes"], id))
-        conn.commit()
+              pace, to_int(data["avg_heart_rate"]), to_int(data["calories_burned"]), to_float(data["weight_lbs"]),
+              data["notes"], id))
         conn.close()
         flash("Workout updated successfully!", "success")
         return redirect(url_for("cardio_bp.cardio_list"))
@@ -91,11 +106,7 @@ def edit_cardio(id):
 
 @cardio_bp.route("/delete/<int:id>")
 def delete_cardio(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM cardio_workouts WHERE id=?", (id,))
-    conn.commit()
-    conn.close()
+    execute_write("DELETE FROM cardio_workouts WHERE id=?", (id,))
     flash("Workout deleted.", "warning")
     return redirect(url_for("cardio_bp.cardio_list"))
 
@@ -104,118 +115,99 @@ def delete_cardio(id):
 # Dashboard
 # ---------------------------
 @cardio_bp.route("/dashboard")
+@conditional("cardio_workouts")
 def dashboard():
     conn = get_connection()
-    data = conn.execute("""
-        SELECT
-            strftime('%Y-%W', date) AS week,
-            SUM(distance_miles) AS total_distance,
-            SUM(calories_burned) AS total_calories,
-            AVG(duration_minutes / NULLIF(distance_miles, 0)) AS avg_pace_min_per_mile
-        FROM cardio_workouts
-        GROUP BY week
-        ORDER BY week
-    """).fetchall()
+    trends = weekly_trends(conn)
     conn.close()
-
-    weeks = [d['week'] for d in data]
-    distances = [round(d['total_distance'] or 0, 2) for d in data]
-    calories = [int(d['total_calories'] or 0) for d in data]
-    pace_decimal = []
-    for d in data:
-        if d['avg_pace_min_per_mile']:
-            total_sec = d['avg_pace_min_per_mile'] * 60
-            pace_decimal.append(round(total_sec / 60, 2))
-        else:
-            pace_decimal.append(None)
-
-    return render_template('dashboard.html',
-                           weeks=weeks, distances=distances,
-                           calories=calories, pace_decimal=pace_decimal)
+    return render_template('dashboard.html', trend_weeks=TREND_WEEKS, **trends)
 
 
 # ---------------------------
 # Export / Import
 # ---------------------------
+# Exports accept ?fields=a,b and ?start=/?end= (YYYY-MM-DD), applied in SQL.
+CARDIO_EXPORT_COLUMNS = {
+    "id": "cw.id", "date": "cw.date", "time": "cw.time", "activity_type": "at.name",
+    "distance_miles": "cw.distance_miles", "duration_minutes": "cw.duration_minutes",
+    "pace_min_per_mile": "cw.pace_min_per_mile", "avg_heart_rate": "cw.avg_heart_rate",
+    "calories_burned": "cw.calories_burned", "weight_lbs": "cw.weight_lbs", "notes": "cw.notes",
+}
+CARDIO_EXPORT_FROM = "cardio_workouts cw JOIN activity_types at ON cw.activity_type_id = at.id"
+
+
+def _export_cardio_cursor(conn):
+    sql, params = export_query(CARDIO_EXPORT_COLUMNS, CARDIO_EXPORT_FROM, "cw.date DESC",
+                               **export_filters(CARDIO_EXPORT_COLUMNS))
+    return conn.execute(sql, params)
+
+
 @cardio_bp.route('/export_csv')
+@conditional("cardio_workouts", "activity_types")
 def export_cardio_csv():
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT cw.id, cw.date, cw.time, at.name AS activity_type, cw.distance_miles,
-               cw.duration_minutes, cw.pace_min_per_mile, cw.avg_heart_rate,
-               cw.calories_burned, cw.weight_lbs, cw.notes
-        FROM cardio_workouts cw
-        JOIN activity_types at ON cw.activity_type_id = at.id
-        ORDER BY cw.date DESC
-    """)
-    rows = cur.fetchall()
-    headers = [desc[0] for desc in cur.description]
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(headers)
-    writer.writerows(rows)
-    output.seek(0)
-
-    return send_file(io.BytesIO(output.getvalue().encode('utf-8')),
-                     mimetype='text/csv',
-                     as_attachment=True,
-                     download_name='cardio_workouts.csv')
+    return csv_response(iter_csv(_export_cardio_cursor(conn)), 'cardio_workouts.csv')
 
 
 @cardio_bp.route('/export_json')
+@conditional("cardio_workouts", "activity_types")
 def export_cardio_json():
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT cw.id, cw.date, cw.time, at.name AS activity_type, cw.distance_miles,
-               cw.duration_minutes, cw.pace_min_per_mile, cw.avg_heart_rate,
-               cw.calories_burned, cw.weight_lbs, cw.notes
-        FROM cardio_workouts cw
-        JOIN activity_types at ON cw.activity_type_id = at.id
-        ORDER BY cw.date DESC
-    """)
-    rows = [dict(zip([col[0] for col in cur.description], row)) for row in cur.fetchall()]
+    rows = [dict(r) for r in _export_cardio_cursor(conn).fetchall()]
+    conn.close()
     return jsonify(rows)
 
 
+@cardio_bp.route('/export_ndjson')
+@conditional("cardio_workouts", "activity_types")
+def export_cardio_ndjson():
+    conn = get_connection()
+    return ndjson_response(iter_ndjson(_export_cardio_cursor(conn)))
+
+
+CARDIO_INSERT_SQL = """
+    INSERT INTO cardio_workouts (date, time, activity_type_id, distance_miles,
+                                 duration_minutes, pace_min_per_mile,
+                                 avg_heart_rate, calories_burned, weight_lbs, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _cardio_import_row(row, activity_ids):
+    """CSV row (export_csv layout) -> CARDIO_INSERT_SQL parameters."""
+    date, time = to_date(row['date']), to_time(row.get('time'))
+    rest = (
+        to_float(row.get('distance_miles')), to_float(row.get('duration_minutes')),
+        to_text(row.get('pace_min_per_mile')), to_int(row.get('avg_heart_rate')),
+        to_int(row.get('calories_burned')), to_float(row.get('weight_lbs')), to_text(row.get('notes'))
+    )
+    # resolved last: an unknown activity type is created, so the row must already be valid
+    return (date, time, activity_ids(row['activity_type']), *rest)
+
+
+def import_cardio_job(job, path):
+    """Background job: import a saved CSV upload."""
+    conn = get_connection()
+    try:
+        reader = csv.DictReader(job.open_upload(path))
+        activity_ids = LookupMap(conn, "activity_types")
+        summary = bulk_import(conn, reader, lambda row: _cardio_import_row(row, activity_ids),
+                              CARDIO_INSERT_SQL, progress=job.progress)
+    finally:
+        conn.close()
+    return summary.to_dict()
+
+
 @cardio_bp.route('/import_csv', methods=['GET', 'POST'])
 def import_cardio_csv():
     if request.method == 'POST':
         file = request.files['file']
         if not file:
             flash('No file uploaded', 'error')
-            return redirect(url_for('cardio.cardio_list'))
-
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        reader = csv.DictReader(stream)
-
-        conn = get_connection()
-        cur = conn.cursor()
-        for row in reader:
-            cur.execute("SELECT id FROM activity_types WHERE name = ?", (row['activity_type'],))
-            activity_type = cur.fetchone()
-            if not activity_type:
-                cur.execute("INSERT INTO activity_types (name) VALUES (?)", (row['activity_type'],))
-                activity_type_id = cur.lastrowid
-            else:
-                activity_type_id = activity_type[0]
-
-            cur.execute("""
-                INSERT INTO cardio_workouts (date, time, activity_type_id, distance_miles,
-                                             duration_minutes, pace_min_per_mile,
-                                             avg_heart_rate, calories_burned, weight_lbs, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row['date'], row.get('time'), activity_type_id,
-                row.get('distance_miles'), row.get('duration_minutes'),
-                row.get('pace_min_per_mile'), row.get('avg_heart_rate'),
-                row.get('calories_burned'), row.get('weight_lbs'), row.get('notes')
-            ))
-        conn.commit()
-        conn.close()
-        flash('Cardio workouts imported successfully!', 'success')
-        return redirect(url_for('cardio.cardio_list'))
+            return redirect(url_for('cardio_bp.cardio_list'))
+
+        path = save_upload(file)
+        job_id = submit("cardio-import", import_cardio_job, path, description=file.filename, upload=path)
+        return job_started(job_id)
 
     return render_template('import_cardio.html')
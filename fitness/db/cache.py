@@ -0,0 +1,103 @@
+# fitness/db/cache.py
+"""In-process cache for the small lookup tables (activity, meal and exercise types).
+
+Every worker keeps its own copy of each table together with the table's
+counter from table_versions, which triggers bump on any write (migration
+0008). The counters are read once per request, so a change made by any
+worker is picked up on that worker's next request, and in steady state a
+form page makes no lookup queries at all.
+"""
+import json
+import re
+import threading
+
+from flask import g, has_app_context
+
+LOOKUP_QUERIES = {
+    "activity_types": "SELECT * FROM activity_types ORDER BY name",
+    "meal_types": "SELECT * FROM meal_types ORDER BY name",
+    "exercise_types": "SELECT * FROM exercise_types ORDER BY body_part, name",
+}
+
+
+def table_versions(conn):
+    """{table name: (change counter, updated_at)}; read once per request inside an
+    app context."""
+    if has_app_context():
+        versions = g.get("_table_versions")
+        if versions is None:
+            versions = g._table_versions = _read_versions(conn)
+        return versions
+    return _read_versions(conn)
+
+
+def _read_versions(conn):
+    return {name: (version, updated_at) for name, version, updated_at
+            in conn.execute("SELECT name, version, updated_at FROM table_versions")}
+
+
+# tables whose counters are bumped by bump_versions() rather than by triggers
+DATA_TABLES = ("cardio_workouts", "food_log", "health_log", "workouts", "exercises", "sets")
+
+_WRITE_TARGET = re.compile(r"^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)"
+                           r"\s+(\w+)", re.IGNORECASE)
+
+
+def written_table(sql):
+    """The table an INSERT/UPDATE/DELETE statement writes to, or None."""
+    match = _WRITE_TARGET.match(sql)
+    return match.group(1) if match else None
+
+
+def bump_versions(conn, *tables):
+    """Advance the change counters of `tables` in the caller's write transaction.
+
+    A per-row trigger on the data tables would add an UPDATE to every row an
+    import writes, so whatever writes them calls this once per transaction.
+    """
+    conn.execute("UPDATE table_versions SET version = version + 1, "
+                 "updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now') "
+                 "WHERE name IN (SELECT value FROM json_each(?))", (json.dumps(tables),))
+
+
+class LookupCache:
+    """table -> (version, rows, rows by id), reloaded when the version moves."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, conn, table):
+        version = table_versions(conn).get(table, (None,))[0]
+        entry = self._entries.get(table)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+            rows = conn.execute(LOOKUP_QUERIES[table]).fetchall()
+            entry = self._entries[table] = (version, rows, {row["id"]: row for row in rows})
+        return entry
+
+    def rows(self, conn, table):
+        """All rows of a lookup table, in its display order."""
+        return self._entry(conn, table)[1]
+
+    def get(self, conn, table, id):
+        """One row by id, or None."""
+        try:
+            return self._entry(conn, table)[2].get(int(id))
+        except (TypeError, ValueError):
+            return None
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "tables": {table: entry[0] for table, entry in self._entries.items()}}
+
+
+lookup_cache = LookupCache()
@@ -1,151 +1,390 @@
 import sqlite3
 import os
+import queue
+import threading
+import time
+from collections import Counter
+
+import click
+from flask import g, has_app_context, jsonify
+
+from fitness.db import slowlog
+from fitness.db.cache import lookup_cache
+from fitness.db.migrate import current_version, upgrade
 
 # -------------------------------
 # Database Location Setup
 # -------------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))   # directory of db.py
-DB_PATH = os.path.join(BASE_DIR, "fitness.db")          # ensures DB is inside fitness/db
+DB_PATH = os.environ.get("FITNESS_DB_PATH",
+                         os.path.join(BASE_DIR, "fitness.db"))  # ensures DB is inside fitness/db
 
 # Make sure the db directory exists (important if running from app.py)
 os.makedirs(BASE_DIR, exist_ok=True)
 
 
+# -------------------------------
+# Connection Pool Settings
+# -------------------------------
+# Each gunicorn worker owns its own pool, so the total number of open
+# connections is roughly workers * POOL_SIZE.
+POOL_SIZE = int(os.environ.get("FITNESS_DB_POOL_SIZE", 4))
+# Seconds to wait for an idle connection before opening a temporary overflow one.
+POOL_TIMEOUT = float(os.environ.get("FITNESS_DB_POOL_TIMEOUT", 2.0))
+
+# Applied to every new connection, in order.
+PRAGMAS = {
+    "journal_mode": "WAL",         # readers no longer block the writer
+    "synchronous": "NORMAL",       # safe with WAL, one fsync per checkpoint instead of per commit
+    "busy_timeout": 5000,          # ms to wait on a locked database before raising
+    "cache_size": -16000,          # negative = KiB, ~16 MB page cache per connection
+    "mmap_size": 134217728,        # 128 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",          # enforce the REFERENCES clauses in the schema
+}
+
+
+class QueryStats:
+    """Statements run and seconds spent in SQLite on one request's connection."""
+
+    __slots__ = ("statements", "seconds", "texts")
+
+    def __init__(self):
+        self.statements = 0      # from the trace callback; trigger bodies are not counted
+        self.seconds = 0.0       # execute/fetch/commit time
+        self.texts = Counter()   # SQL text -> execute() calls, to spot N+1 loops
+
+    def repeated(self):
+        """Calls of the most repeated SQL text (1 when nothing ran twice)."""
+        return max(self.texts.values(), default=0)
+
+
+def _timed(method):
+    """Wrap a Connection method so its time is added to the bound QueryStats."""
+    def wrapper(self, *args, **kwargs):
+        stats = self.stats
+        if stats is None:
+            return method(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            stats.seconds += time.perf_counter() - started
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports to its connection's QueryStats and feeds the slow-query log.
+
+    A statement's time is its execute() plus, for a fetchall(), the fetch; rows
+    pulled by iterating the cursor or with fetchone/fetchmany are added to the
+    request's DB time but not to the statement's. Statements are checked
+    against the slow-query threshold whether or not a QueryStats is bound, so
+    background jobs and CLI commands are logged too.
+    """
+
+    _pending = None   # (sql, params, rows, seconds) of an execute that may still be fetched
+
+    @property
+    def stats(self):
+        return self.connection.stats
+
+    def _run(self, method, args, sql=None, params=None, rows=0):
+        stats = self.stats
+        if stats is None and slowlog.threshold() is None:
+            return method(self, *args)
+        if stats is not None and sql is not None:
+            stats.texts[sql] += 1
+        started = time.perf_counter()
+        try:
+            result = method(self, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            if stats is not None:
+                stats.seconds += elapsed
+        if sql is not None:
+            self._pending = None
+            self._check(sql, params, rows, elapsed, final=method is not sqlite3.Cursor.execute)
+        elif method is sqlite3.Cursor.fetchall and self._pending is not None:
+            sql, params, rows, seconds = self._pending
+            self._pending = None
+            self._check(sql, params, rows, seconds + elapsed, final=True)
+        return result
+
+    def _check(self, sql, params, rows, seconds, final):
+        limit = slowlog.threshold()
+        if limit is None:
+            return
+        if seconds >= limit:
+            slowlog.record(self.connection, sql, params, seconds, rows)
+        elif not final:
+            self._pending = (sql, params, rows, seconds)
+
+    def execute(self, sql, parameters=()):
+        return self._run(sqlite3.Cursor.execute, (sql, parameters), sql, parameters)
+
+    def executemany(self, sql, parameters):
+        rows, first = 0, None
+        if isinstance(parameters, (list, tuple)):
+            rows, first = len(parameters), (parameters[0] if parameters else None)
+        return self._run(sqlite3.Cursor.executemany, (sql, parameters), sql, first, rows)
+
+    def executescript(self, script):
+        return self._run(sqlite3.Cursor.executescript, (script,), script)
+
+    def fetchone(self):
+        return self._run(sqlite3.Cursor.fetchone, ())
+
+    def fetchmany(self, size=None):
+        return self._run(sqlite3.Cursor.fetchmany, (self.arraysize if size is None else size,))
+
+    def fetchall(self):
+        return self._run(sqlite3.Cursor.fetchall, ())
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool.
+
+    While a QueryStats is bound with track(), every statement is counted through
+    sqlite3's trace callback and the time spent executing, fetching and
+    committing is added to it.
+    """
+
+    pool = None
+    overflow = False
+    request_bound = False
+    stats = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* would use a plain cursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    commit = _timed(sqlite3.Connection.commit)
+    rollback = _timed(sqlite3.Connection.rollback)
+
+    def track(self, stats):
+        """Start reporting to `stats`, or stop with None."""
+        self.stats = stats
+        self.set_trace_callback(self._trace if stats is not None else None)
+
+    def _trace(self, sql):
+        stats = self.stats
+        if stats is not None and not sql.startswith("--"):   # "-- TRIGGER name" lines
+            stats.statements += 1
+
+    def close(self):
+        if self.request_bound:
+            return  # released by close_connection() when the app context ends
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self.dispose()
+
+    def dispose(self):
+        """Really close the underlying sqlite3 connection."""
+        super().close()
+
+
+def connect(path=None, pragmas=None):
+    """A tuned connection outside any pool; its close() really closes it."""
+    conn = sqlite3.connect(path or DB_PATH, factory=PooledConnection, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for name, value in (pragmas if pragmas is not None else PRAGMAS).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+class ConnectionPool:
+    """A small per-process LIFO pool of tuned sqlite3 connections."""
+
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT, pragmas=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(PRAGMAS, **(pragmas or {}))
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._in_use = 0
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "overflows": 0, "wait_seconds": 0.0}
+
+    def _connect(self):
+        conn = connect(self.path, self.pragmas)
+        conn.pool = self
+        return conn
+
+    def _checkout(self, conn, stat, waited=0.0):
+        with self._lock:
+            self._stats[stat] += 1
+            self._stats["wait_seconds"] += waited
+            self._in_use += 1
+        return conn
+
+    def acquire(self):
+        """Return an idle connection, open a new one, or wait for one to be released."""
+        try:
+            return self._checkout(self._idle.get_nowait(), "hits")
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._checkout(self._connect(), "misses")
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+            return self._checkout(conn, "waits", time.perf_counter() - started)
+        except queue.Empty:
+            # pool exhausted; serve the request anyway with a throwaway connection
+            conn = self._connect()
+            conn.overflow = True
+            return self._checkout(conn, "overflows", time.perf_counter() - started)
+
+    def release(self, conn):
+        """Roll back anything left open and put the connection back on the idle stack."""
+        with self._lock:
+            self._in_use -= 1
+        if conn.stats is not None:
+            conn.track(None)
+        if conn.overflow or os.getpid() != self.pid:
+            conn.dispose()
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            conn.dispose()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        wait_seconds=round(self._stats["wait_seconds"], 6),
+                        pid=self.pid, size=self.size, opened=self._opened,
+                        in_use=self._in_use, idle=self._idle.qsize())
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_settings = {}
+
+
+def configure_pool(size=None, timeout=None, pragmas=None):
+    """Override pool settings; takes effect the next time the pool is created."""
+    global _pool
+    with _pool_lock:
+        if size is not None:
+            _pool_settings["size"] = int(size)
+        if timeout is not None:
+            _pool_settings["timeout"] = float(timeout)
+        if pragmas:
+            _pool_settings["pragmas"] = dict(pragmas)
+        _pool = None
+
+
+def get_pool():
+    """Return this process's pool, rebuilding it after a fork (gunicorn workers)."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool(DB_PATH, **_pool_settings)
+            pool = _pool
+    return pool
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
 # ---------------------------
 # DB Setup
 # ---------------------------
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Return a pooled connection.
+
+    Inside a Flask app context the same connection is reused for the whole
+    request and released by close_connection(); calling close() on it is a no-op.
+    """
+    if has_app_context():
+        conn = g.get("_db_conn")
+        if conn is None:
+            conn = get_pool().acquire()
+            conn.request_bound = True
+            conn.track(g.get("_query_stats"))
+            g._db_conn = conn
+        return conn
+    return get_pool().acquire()
+
+
+def detach_connection():
+    """Take the request's connection off flask.g so it can outlive the request
+    (streamed responses); the caller becomes responsible for close()."""
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        conn.request_bound = False
     return conn
 
+
+def close_connection(exc=None):
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        conn.request_bound = False
+        conn.close()
+
+
+def init_app(app):
+    """Wire the request-scoped connection into a Flask app."""
+    configure_pool(size=app.config.get("DB_POOL_SIZE"),
+                   timeout=app.config.get("DB_POOL_TIMEOUT"),
+                   pragmas=app.config.get("DB_PRAGMAS"))
+    slowlog.configure(threshold_ms=app.config.get("SLOW_QUERY_MS"), path=app.config.get("SLOW_QUERY_LOG"))
+    app.teardown_appcontext(close_connection)
+    app.add_url_rule("/db/stats", "db_stats",
+                     lambda: jsonify(dict(pool_stats(), lookup_cache=lookup_cache.stats())))
+    app.add_url_rule("/db/slow-queries", "slow_queries", slowlog.slow_queries_view)
+    app.cli.add_command(migrate_command)
+
+
+@click.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = init_db()
+    conn = get_connection()
+    click.echo(f"applied {applied or 'nothing'}; schema version {current_version(conn)}")
+
+
 def init_db():
+    """Bring the schema up to date; once current this is a single version check."""
     conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS activity_types (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        description TEXT
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS cardio_workouts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        time TEXT,
-        activity_type_id INTEGER NOT NULL,
-        distance_miles REAL,
-        duration_minutes REAL,
-        pace_min_per_mile TEXT,
-        avg_heart_rate INTEGER,
-        calories_burned INTEGER,
-        weight_lbs REAL,
-        notes TEXT,
-        FOREIGN KEY (activity_type_id) REFERENCES activity_types (id)
-    )
-    """)
-
-    # Meal Types (lookup)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS meal_types (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
-        )
-    """)
-
-    # Food Log
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS food_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            time TEXT,
-            meal_type_id INTEGER NOT NULL,
-            food_item TEXT NOT NULL,
-            quantity TEXT,
-            calories INTEGER,
-            notes TEXT,
-            FOREIGN KEY (meal_type_id) REFERENCES meal_types(id)
-        )
-    """)
-
-    # Prepopulate meal types if empty
-    existing = cur.execute("SELECT COUNT(*) FROM meal_types").fetchone()[0]
-    if existing == 0:
-        cur.executemany("INSERT INTO meal_types (name) VALUES (?)",
-                        [("Breakfast",), ("Lunch",), ("Dinner",), ("Snack",)])
-
-    # Health Log
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS health_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            time TEXT,
-            systolic INTEGER,
-            diastolic INTEGER,
-            bpm INTEGER,
-            weight REAL,
-            bmi REAL
-        )
-    """)
-
-    # --- Strength / Weight Training Tables ---
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS exercise_types (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        body_part TEXT
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS workouts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        time TEXT,
-        body_part TEXT,
-        notes TEXT
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS exercises (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        workout_id INTEGER NOT NULL,
-        exercise_name TEXT NOT NULL,
-        FOREIGN KEY (workout_id) REFERENCES workouts(id)
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS sets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        exercise_id INTEGER NOT NULL,
-        set_number INTEGER,
-        reps INTEGER,
-        weight REAL,
-        rest_seconds INTEGER,
-        FOREIGN KEY (exercise_id) REFERENCES exercises(id)
-    )
-    """)
-
-    # insert some common exercise types if table empty
-    existing = cur.execute("SELECT COUNT(*) FROM exercise_types").fetchone()[0]
-    if existing == 0:
-        cur.executemany("INSERT INTO exercise_types (name, body_part) VALUES (?, ?)",
-                        [
-                            ('Barbell Bench Press', 'Chest'),
-                            ('Incline Dumbbell Press', 'Chest'),
-                            ('Back Squat', 'Legs'),
-                            ('Deadlift', 'Legs'),
-                            ('Lat Pulldown', 'Back'),
-                            ('Face Pull', 'Back'),
-                            ('Incline Dumbbell Curl', 'Biceps'),
-                            ('Preacher Curl', 'Biceps'),
-                            ('Triceps Rope Pressdown', 'Triceps')
-                        ])
-
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    try:
+        applied = upgrade(conn)
+    finally:
+        conn.close()
+    return applied
@@ -0,0 +1,89 @@
+# fitness/db/migrate.py
+"""Versioned schema migrations.
+
+Migrations are the numbered ``NNNN_description.sql`` files in
+``fitness/db/migrations``. Each one runs in its own transaction and is
+recorded in the ``schema_version`` table, so a database only ever runs a
+migration once.
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def list_migrations():
+    """Return [(version, name, path)] for every migration file, oldest first."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+
+def current_version(conn):
+    """Highest applied migration, 0 for a database that has never been migrated."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def split_statements(script):
+    """Split a SQL script into single statements (trigger bodies stay intact)."""
+    statements, buf = [], ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            statements.append(buf.strip())
+            buf = ""
+    return statements
+
+
+def upgrade(conn):
+    """Apply pending migrations and return the versions that were applied.
+
+    Safe to call from every gunicorn worker at boot: each migration takes the
+    write lock (BEGIN IMMEDIATE) and re-checks the version before running.
+    """
+    migrations = list_migrations()
+    if not migrations or current_version(conn) >= migrations[-1][0]:
+        return []
+
+    applied = []
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # transactions are managed explicitly below
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        """)
+        for version, name, path in migrations:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    for statement in split_statements(f.read()):
+                        conn.execute(statement)
+                conn.execute("INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                             (version, name, datetime.now().isoformat(timespec="seconds")))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
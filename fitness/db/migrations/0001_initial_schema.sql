@@ -0,0 +1,108 @@
+-- Baseline schema (what init_db() used to create on every boot).
+-- Written with IF NOT EXISTS so databases created before migrations existed
+-- are adopted as version 1 without changes.
+
+CREATE TABLE IF NOT EXISTS activity_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cardio_workouts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT,
+    activity_type_id INTEGER NOT NULL,
+    distance_miles REAL,
+    duration_minutes REAL,
+    pace_min_per_mile TEXT,
+    avg_heart_rate INTEGER,
+    calories_burned INTEGER,
+    weight_lbs REAL,
+    notes TEXT,
+    FOREIGN KEY (activity_type_id) REFERENCES activity_types (id)
+);
+
+-- Meal Types (lookup)
+CREATE TABLE IF NOT EXISTS meal_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE
+);
+
+-- Food Log
+CREATE TABLE IF NOT EXISTS food_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT,
+    meal_type_id INTEGER NOT NULL,
+    food_item TEXT NOT NULL,
+    quantity TEXT,
+    calories INTEGER,
+    notes TEXT,
+    FOREIGN KEY (meal_type_id) REFERENCES meal_types(id)
+);
+
+-- Prepopulate meal types if empty
+INSERT INTO meal_types (name)
+SELECT name FROM (SELECT 'Breakfast' AS name UNION ALL SELECT 'Lunch'
+                  UNION ALL SELECT 'Dinner' UNION ALL SELECT 'Snack')
+WHERE NOT EXISTS (SELECT 1 FROM meal_types);
+
+-- Health Log
+CREATE TABLE IF NOT EXISTS health_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT,
+    systolic INTEGER,
+    diastolic INTEGER,
+    bpm INTEGER,
+    weight REAL,
+    bmi REAL
+);
+
+-- --- Strength / Weight Training Tables ---
+CREATE TABLE IF NOT EXISTS exercise_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    body_part TEXT
+);
+
+CREATE TABLE IF NOT EXISTS workouts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT,
+    body_part TEXT,
+    notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS exercises (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    workout_id INTEGER NOT NULL,
+    exercise_name TEXT NOT NULL,
+    FOREIGN KEY (workout_id) REFERENCES workouts(id)
+);
+
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exercise_id INTEGER NOT NULL,
+    set_number INTEGER,
+    reps INTEGER,
+    weight REAL,
+    rest_seconds INTEGER,
+    FOREIGN KEY (exercise_id) REFERENCES exercises(id)
+);
+
+-- insert some common exercise types if table empty
+INSERT INTO exercise_types (name, body_part)
+SELECT name, body_part FROM (
+    SELECT 'Barbell Bench Press' AS name, 'Chest' AS body_part
+    UNION ALL SELECT 'Incline Dumbbell Press', 'Chest'
+    UNION ALL SELECT 'Back Squat', 'Legs'
+    UNION ALL SELECT 'Deadlift', 'Legs'
+    UNION ALL SELECT 'Lat Pulldown', 'Back'
+    UNION ALL SELECT 'Face Pull', 'Back'
+    UNION ALL SELECT 'Incline Dumbbell Curl', 'Biceps'
+    UNION ALL SELECT 'Preacher Curl', 'Biceps'
+    UNION ALL SELECT 'Triceps Rope Pressdown', 'Triceps'
+)
+WHERE NOT EXISTS (SELECT 1 FROM exercise_types);
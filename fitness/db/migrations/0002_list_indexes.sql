@@ -0,0 +1,13 @@
+-- Indexes for the list views, which all ORDER BY date DESC, time DESC.
+-- SQLite walks these backwards, so no separate DESC index is needed.
+
+CREATE INDEX IF NOT EXISTS idx_cardio_workouts_date_time ON cardio_workouts (date, time);
+
+CREATE INDEX IF NOT EXISTS idx_food_log_date_time ON food_log (date, time);
+
+-- Covers every health_log column, so health_list and the health dashboard
+-- are served from the index alone.
+CREATE INDEX IF NOT EXISTS idx_health_log_date_time
+    ON health_log (date, time, systolic, diastolic, bpm, weight, bmi);
+
+CREATE INDEX IF NOT EXISTS idx_workouts_date_time ON workouts (date, time);
@@ -0,0 +1,12 @@
+-- Indexes on foreign key columns: used by the joins/lookups in the routes and
+-- by SQLite itself to check child rows when PRAGMA foreign_keys is on.
+
+CREATE INDEX IF NOT EXISTS idx_cardio_workouts_activity_type ON cardio_workouts (activity_type_id);
+
+CREATE INDEX IF NOT EXISTS idx_food_log_meal_type ON food_log (meal_type_id);
+
+CREATE INDEX IF NOT EXISTS idx_exercises_workout ON exercises (workout_id);
+
+-- (set_number, reps, weight) let the per-exercise set listing skip the sort
+-- and answer volume/PR queries without reading the table.
+CREATE INDEX IF NOT EXISTS idx_sets_exercise ON sets (exercise_id, set_number, reps, weight);
@@ -0,0 +1,17 @@
+-- Keyset pagination seeks on (date, IFNULL(time, ''), id). Rebuild the list
+-- indexes on that exact expression so the seek and the ORDER BY both use
+-- them; rows with a NULL time sort as '' (last within their day, as before).
+
+DROP INDEX IF EXISTS idx_cardio_workouts_date_time;
+CREATE INDEX idx_cardio_workouts_date_time ON cardio_workouts (date, IFNULL(time, ''));
+
+DROP INDEX IF EXISTS idx_food_log_date_time;
+CREATE INDEX idx_food_log_date_time ON food_log (date, IFNULL(time, ''));
+
+-- still covering: the raw time column is kept alongside the sort expression
+DROP INDEX IF EXISTS idx_health_log_date_time;
+CREATE INDEX idx_health_log_date_time
+    ON health_log (date, IFNULL(time, ''), time, systolic, diastolic, bpm, weight, bmi);
+
+DROP INDEX IF EXISTS idx_workouts_date_time;
+CREATE INDEX idx_workouts_date_time ON workouts (date, IFNULL(time, ''));
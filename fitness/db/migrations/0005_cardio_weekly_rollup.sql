@@ -0,0 +1,107 @@
+-- Weekly cardio totals for the dashboard, kept current by triggers so every
+-- write path (forms, CSV import, deletes) maintains it and the dashboard reads
+-- one row per week instead of re-aggregating cardio_workouts.
+--
+-- Pace is stored as numerator/denominator (pace_sum / pace_count) so the
+-- dashboard's AVG(duration / distance) can be updated incrementally.
+-- week is strftime('%Y-%W', date), or '' for unparseable dates.
+--
+-- The forms used to save blank fields as '' rather than NULL. Those become
+-- NULL here, and the totals read '' as 0 so one can never be stored as text.
+
+CREATE TABLE IF NOT EXISTS cardio_weekly_rollup (
+    week TEXT PRIMARY KEY,
+    workout_count INTEGER NOT NULL DEFAULT 0,
+    total_distance REAL NOT NULL DEFAULT 0,
+    total_duration REAL NOT NULL DEFAULT 0,
+    total_calories INTEGER NOT NULL DEFAULT 0,
+    pace_sum REAL NOT NULL DEFAULT 0,
+    pace_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+UPDATE cardio_workouts SET distance_miles = NULL WHERE distance_miles = '';
+UPDATE cardio_workouts SET duration_minutes = NULL WHERE duration_minutes = '';
+UPDATE cardio_workouts SET avg_heart_rate = NULL WHERE avg_heart_rate = '';
+UPDATE cardio_workouts SET calories_burned = NULL WHERE calories_burned = '';
+UPDATE cardio_workouts SET weight_lbs = NULL WHERE weight_lbs = '';
+
+DELETE FROM cardio_weekly_rollup;
+
+INSERT INTO cardio_weekly_rollup
+    (week, workout_count, total_distance, total_duration, total_calories, pace_sum, pace_count)
+SELECT IFNULL(strftime('%Y-%W', date), ''),
+       COUNT(*),
+       IFNULL(SUM(NULLIF(distance_miles, '')), 0),
+       IFNULL(SUM(NULLIF(duration_minutes, '')), 0),
+       IFNULL(SUM(NULLIF(calories_burned, '')), 0),
+       IFNULL(SUM(duration_minutes / NULLIF(distance_miles, 0)), 0),
+       COUNT(duration_minutes / NULLIF(distance_miles, 0))
+FROM cardio_workouts
+GROUP BY 1;
+
+CREATE TRIGGER IF NOT EXISTS cardio_weekly_rollup_insert
+AFTER INSERT ON cardio_workouts
+BEGIN
+    INSERT INTO cardio_weekly_rollup
+        (week, workout_count, total_distance, total_duration, total_calories, pace_sum, pace_count)
+    VALUES (IFNULL(strftime('%Y-%W', NEW.date), ''),
+            1,
+            IFNULL(NULLIF(NEW.distance_miles, ''), 0),
+            IFNULL(NULLIF(NEW.duration_minutes, ''), 0),
+            IFNULL(NULLIF(NEW.calories_burned, ''), 0),
+            IFNULL(NEW.duration_minutes / NULLIF(NEW.distance_miles, 0), 0),
+            NEW.duration_minutes / NULLIF(NEW.distance_miles, 0) IS NOT NULL)
+    ON CONFLICT (week) DO UPDATE SET
+        workout_count = workout_count + excluded.workout_count,
+        total_distance = total_distance + excluded.total_distance,
+        total_duration = total_duration + excluded.total_duration,
+        total_calories = total_calories + excluded.total_calories,
+        pace_sum = pace_sum + excluded.pace_sum,
+        pace_count = pace_count + excluded.pace_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cardio_weekly_rollup_delete
+AFTER DELETE ON cardio_workouts
+BEGIN
+    UPDATE cardio_weekly_rollup SET
+        workout_count = workout_count - 1,
+        total_distance = total_distance - IFNULL(NULLIF(OLD.distance_miles, ''), 0),
+        total_duration = total_duration - IFNULL(NULLIF(OLD.duration_minutes, ''), 0),
+        total_calories = total_calories - IFNULL(NULLIF(OLD.calories_burned, ''), 0),
+        pace_sum = pace_sum - IFNULL(OLD.duration_minutes / NULLIF(OLD.distance_miles, 0), 0),
+        pace_count = pace_count - (OLD.duration_minutes / NULLIF(OLD.distance_miles, 0) IS NOT NULL)
+    WHERE week = IFNULL(strftime('%Y-%W', OLD.date), '');
+    DELETE FROM cardio_weekly_rollup
+    WHERE week = IFNULL(strftime('%Y-%W', OLD.date), '') AND workout_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cardio_weekly_rollup_update
+AFTER UPDATE OF date, distance_miles, duration_minutes, calories_burned ON cardio_workouts
+BEGIN
+    UPDATE cardio_weekly_rollup SET
+        workout_count = workout_count - 1,
+        total_distance = total_distance - IFNULL(NULLIF(OLD.distance_miles, ''), 0),
+        total_duration = total_duration - IFNULL(NULLIF(OLD.duration_minutes, ''), 0),
+        total_calories = total_calories - IFNULL(NULLIF(OLD.calories_burned, ''), 0),
+        pace_sum = pace_sum - IFNULL(OLD.duration_minutes / NULLIF(OLD.distance_miles, 0), 0),
+        pace_count = pace_count - (OLD.duration_minutes / NULLIF(OLD.distance_miles, 0) IS NOT NULL)
+    WHERE week = IFNULL(strftime('%Y-%W', OLD.date), '');
+    DELETE FROM cardio_weekly_rollup
+    WHERE week = IFNULL(strftime('%Y-%W', OLD.date), '') AND workout_count <= 0;
+    INSERT INTO cardio_weekly_rollup
+        (week, workout_count, total_distance, total_duration, total_calories, pace_sum, pace_count)
+    VALUES (IFNULL(strftime('%Y-%W', NEW.date), ''),
+            1,
+            IFNULL(NULLIF(NEW.distance_miles, ''), 0),
+            IFNULL(NULLIF(NEW.duration_minutes, ''), 0),
+            IFNULL(NULLIF(NEW.calories_burned, ''), 0),
+            IFNULL(NEW.duration_minutes / NULLIF(NEW.distance_miles, 0), 0),
+            NEW.duration_minutes / NULLIF(NEW.distance_miles, 0) IS NOT NULL)
+    ON CONFLICT (week) DO UPDATE SET
+        workout_count = workout_count + excluded.workout_count,
+        total_distance = total_distance + excluded.total_distance,
+        total_duration = total_duration + excluded.total_duration,
+        total_calories = total_calories + excluded.total_calories,
+        pace_sum = pace_sum + excluded.pace_sum,
+        pace_count = pace_count + excluded.pace_count;
+END;
@@ -0,0 +1,41 @@
+-- Per-exercise, per-day strength analytics for /api/strength_data. Rows are
+-- refreshed by the strength routes and importer for the (exercise, date) keys a
+-- write touches; `flask strength rebuild-analytics` recomputes the table.
+--
+-- est_1rm is the best Epley estimate of the day: weight * (1 + reps / 30),
+-- or the weight itself for single-rep sets. top_weight/top_reps describe the
+-- heaviest set (most reps on ties).
+
+CREATE TABLE IF NOT EXISTS strength_exercise_daily (
+    exercise_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    total_volume REAL NOT NULL DEFAULT 0,
+    top_weight REAL,
+    top_reps INTEGER,
+    total_reps INTEGER NOT NULL DEFAULT 0,
+    set_count INTEGER NOT NULL DEFAULT 0,
+    est_1rm REAL,
+    PRIMARY KEY (exercise_name, date)
+) WITHOUT ROWID;
+
+DELETE FROM strength_exercise_daily;
+
+INSERT INTO strength_exercise_daily
+    (exercise_name, date, total_volume, top_weight, top_reps, total_reps, set_count, est_1rm)
+WITH ranked AS (
+    SELECT e.exercise_name, w.date, s.reps, s.weight,
+           ROW_NUMBER() OVER (PARTITION BY e.exercise_name, w.date
+                              ORDER BY s.weight DESC, s.reps DESC) AS rank
+    FROM workouts w
+    JOIN exercises e ON e.workout_id = w.id
+    JOIN sets s ON s.exercise_id = e.id
+)
+SELECT exercise_name, date,
+       IFNULL(SUM(weight * reps), 0),
+       MAX(CASE WHEN rank = 1 THEN weight END),
+       MAX(CASE WHEN rank = 1 THEN reps END),
+       IFNULL(SUM(reps), 0),
+       COUNT(*),
+       MAX(CASE WHEN reps = 1 THEN weight ELSE weight * (1 + reps / 30.0) END)
+FROM ranked
+GROUP BY exercise_name, date;
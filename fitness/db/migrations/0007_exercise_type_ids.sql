@@ -0,0 +1,78 @@
+-- Link exercises to exercise_types by id. exercise_name stays as entered; the
+-- type id is what the dashboard and analytics group on.
+--
+-- Names are matched case-insensitively. Names with no matching type (custom
+-- exercises) get a new type, with the body part of the workout they came from.
+-- The triggers keep the link set for every later insert or rename.
+
+ALTER TABLE exercises ADD COLUMN exercise_type_id INTEGER REFERENCES exercise_types (id);
+
+INSERT INTO exercise_types (name, body_part)
+SELECT e.exercise_name, MIN(w.body_part)
+FROM exercises e JOIN workouts w ON w.id = e.workout_id
+WHERE NOT EXISTS (SELECT 1 FROM exercise_types et WHERE et.name = e.exercise_name COLLATE NOCASE)
+GROUP BY e.exercise_name COLLATE NOCASE;
+
+UPDATE exercises SET exercise_type_id = (
+    SELECT MIN(et.id) FROM exercise_types et WHERE et.name = exercises.exercise_name COLLATE NOCASE
+);
+
+CREATE INDEX IF NOT EXISTS idx_exercises_exercise_type ON exercises (exercise_type_id);
+
+CREATE TRIGGER IF NOT EXISTS exercises_link_type_insert
+AFTER INSERT ON exercises
+WHEN NEW.exercise_type_id IS NULL
+BEGIN
+    INSERT INTO exercise_types (name, body_part)
+    SELECT NEW.exercise_name, (SELECT body_part FROM workouts WHERE id = NEW.workout_id)
+    WHERE NOT EXISTS (SELECT 1 FROM exercise_types WHERE name = NEW.exercise_name COLLATE NOCASE);
+    UPDATE exercises SET exercise_type_id = (
+        SELECT MIN(id) FROM exercise_types WHERE name = NEW.exercise_name COLLATE NOCASE
+    ) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS exercises_link_type_rename
+AFTER UPDATE OF exercise_name ON exercises
+BEGIN
+    INSERT INTO exercise_types (name, body_part)
+    SELECT NEW.exercise_name, (SELECT body_part FROM workouts WHERE id = NEW.workout_id)
+    WHERE NOT EXISTS (SELECT 1 FROM exercise_types WHERE name = NEW.exercise_name COLLATE NOCASE);
+    UPDATE exercises SET exercise_type_id = (
+        SELECT MIN(id) FROM exercise_types WHERE name = NEW.exercise_name COLLATE NOCASE
+    ) WHERE id = NEW.id;
+END;
+
+-- Re-key the daily analytics (migration 0006) by exercise type.
+DROP TABLE IF EXISTS strength_exercise_daily;
+
+CREATE TABLE strength_exercise_daily (
+    exercise_type_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    total_volume REAL NOT NULL DEFAULT 0,
+    top_weight REAL,
+    top_reps INTEGER,
+    total_reps INTEGER NOT NULL DEFAULT 0,
+    set_count INTEGER NOT NULL DEFAULT 0,
+    est_1rm REAL,
+    PRIMARY KEY (exercise_type_id, date)
+) WITHOUT ROWID;
+
+INSERT INTO strength_exercise_daily
+    (exercise_type_id, date, total_volume, top_weight, top_reps, total_reps, set_count, est_1rm)
+WITH ranked AS (
+    SELECT e.exercise_type_id, w.date, s.reps, s.weight,
+           ROW_NUMBER() OVER (PARTITION BY e.exercise_type_id, w.date
+                              ORDER BY s.weight DESC, s.reps DESC) AS rank
+    FROM workouts w
+    JOIN exercises e ON e.workout_id = w.id
+    JOIN sets s ON s.exercise_id = e.id
+)
+SELECT exercise_type_id, date,
+       IFNULL(SUM(weight * reps), 0),
+       MAX(CASE WHEN rank = 1 THEN weight END),
+       MAX(CASE WHEN rank = 1 THEN reps END),
+       IFNULL(SUM(reps), 0),
+       COUNT(*),
+       MAX(CASE WHEN reps = 1 THEN weight ELSE weight * (1 + reps / 30.0) END)
+FROM ranked
+GROUP BY exercise_type_id, date;
@@ -0,0 +1,65 @@
+-- Per-table change counters. Triggers bump a table's version (and updated_at)
+-- on every insert, update or delete, so any worker process can tell whether
+-- its cached copy of that table is stale with a single primary-key read.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_versions (name) VALUES ('activity_types'), ('meal_types'), ('exercise_types');
+
+CREATE TRIGGER IF NOT EXISTS activity_types_version_insert AFTER INSERT ON activity_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'activity_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_types_version_update AFTER UPDATE ON activity_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'activity_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_types_version_delete AFTER DELETE ON activity_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'activity_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS meal_types_version_insert AFTER INSERT ON meal_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'meal_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS meal_types_version_update AFTER UPDATE ON meal_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'meal_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS meal_types_version_delete AFTER DELETE ON meal_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'meal_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS exercise_types_version_insert AFTER INSERT ON exercise_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'exercise_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS exercise_types_version_update AFTER UPDATE ON exercise_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'exercise_types';
+END;
+
+CREATE TRIGGER IF NOT EXISTS exercise_types_version_delete AFTER DELETE ON exercise_types
+BEGIN
+    UPDATE table_versions SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')
+    WHERE name = 'exercise_types';
+END;
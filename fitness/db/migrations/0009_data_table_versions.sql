@@ -0,0 +1,11 @@
+-- Change counters (see 0008) for the data tables, so list views, dashboards
+-- and exports can answer conditional GETs (ETag) without running their
+-- queries.
+--
+-- Unlike the lookup tables these have no triggers: a per-row UPDATE of
+-- table_versions made every imported row more expensive. The code that
+-- writes a data table bumps its counter once per transaction instead
+-- (fitness.db.cache.bump_versions).
+
+INSERT OR IGNORE INTO table_versions (name) VALUES
+    ('cardio_workouts'), ('food_log'), ('health_log'), ('workouts'), ('exercises'), ('sets');
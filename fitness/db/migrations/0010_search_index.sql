@@ -0,0 +1,135 @@
+-- Full-text index over the free-text columns of every log, for /search.
+--
+-- One FTS5 table holds all kinds; rowid = source id * 4 + kind
+-- (0 cardio_workouts, 1 food_log, 2 workouts, 3 health_log) so a hit maps
+-- straight back to its row and triggers can address it without a lookup.
+-- title: activity type / food item / body part; body: notes (health_log has
+-- no free text, so its readings are indexed as words instead).
+-- Kept current by triggers on every source table.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    date UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61'
+);
+
+DELETE FROM search_index;
+
+INSERT INTO search_index (rowid, date, title, body)
+SELECT cw.id * 4, cw.date, at.name, cw.notes
+FROM cardio_workouts cw LEFT JOIN activity_types at ON at.id = cw.activity_type_id;
+
+INSERT INTO search_index (rowid, date, title, body)
+SELECT id * 4 + 1, date, food_item, notes FROM food_log;
+
+INSERT INTO search_index (rowid, date, title, body)
+SELECT id * 4 + 2, date, body_part, notes FROM workouts;
+
+INSERT INTO search_index (rowid, date, title, body)
+SELECT id * 4 + 3, date, 'health',
+       trim(IFNULL('bp ' || systolic || '/' || diastolic, '') || IFNULL(' pulse ' || bpm, '') ||
+            IFNULL(' weight ' || weight, '') || IFNULL(' bmi ' || bmi, ''))
+FROM health_log;
+
+-- cardio_workouts
+CREATE TRIGGER IF NOT EXISTS search_cardio_insert
+AFTER INSERT ON cardio_workouts
+BEGIN
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4, NEW.date, (SELECT name FROM activity_types WHERE id = NEW.activity_type_id), NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_cardio_update
+AFTER UPDATE OF date, activity_type_id, notes ON cardio_workouts
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4;
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4, NEW.date, (SELECT name FROM activity_types WHERE id = NEW.activity_type_id), NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_cardio_delete
+AFTER DELETE ON cardio_workouts
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_activity_type_rename
+AFTER UPDATE OF name ON activity_types
+BEGIN
+    UPDATE search_index SET title = NEW.name
+    WHERE rowid IN (SELECT id * 4 FROM cardio_workouts WHERE activity_type_id = NEW.id);
+END;
+
+-- food_log
+CREATE TRIGGER IF NOT EXISTS search_food_insert
+AFTER INSERT ON food_log
+BEGIN
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4 + 1, NEW.date, NEW.food_item, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_food_update
+AFTER UPDATE OF date, food_item, notes ON food_log
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4 + 1, NEW.date, NEW.food_item, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_food_delete
+AFTER DELETE ON food_log
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+END;
+
+-- workouts (strength)
+CREATE TRIGGER IF NOT EXISTS search_workout_insert
+AFTER INSERT ON workouts
+BEGIN
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4 + 2, NEW.date, NEW.body_part, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_workout_update
+AFTER UPDATE OF date, body_part, notes ON workouts
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4 + 2, NEW.date, NEW.body_part, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_workout_delete
+AFTER DELETE ON workouts
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+END;
+
+-- health_log
+CREATE TRIGGER IF NOT EXISTS search_health_insert
+AFTER INSERT ON health_log
+BEGIN
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4 + 3, NEW.date, 'health',
+            trim(IFNULL('bp ' || NEW.systolic || '/' || NEW.diastolic, '') || IFNULL(' pulse ' || NEW.bpm, '') ||
+                 IFNULL(' weight ' || NEW.weight, '') || IFNULL(' bmi ' || NEW.bmi, '')));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_health_update
+AFTER UPDATE ON health_log
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+    INSERT INTO search_index (rowid, date, title, body)
+    VALUES (NEW.id * 4 + 3, NEW.date, 'health',
+            trim(IFNULL('bp ' || NEW.systolic || '/' || NEW.diastolic, '') || IFNULL(' pulse ' || NEW.bpm, '') ||
+                 IFNULL(' weight ' || NEW.weight, '') || IFNULL(' bmi ' || NEW.bmi, '')));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_health_delete
+AFTER DELETE ON health_log
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+END;
+
+-- ORDER BY rank weighs title matches above body matches (date is not indexed)
+INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(0.0, 2.0, 1.0)');
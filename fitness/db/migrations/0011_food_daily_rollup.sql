@@ -0,0 +1,64 @@
+-- Daily calories per meal type for the food dashboard, kept current by
+-- triggers so every write path (forms, CSV import, deletes) maintains it and
+-- the dashboard reads one row per day and meal type instead of
+-- re-aggregating food_log.
+--
+-- calorie_entries counts the entries that have calories, so averages per
+-- entry can be derived without rescanning.
+
+CREATE TABLE IF NOT EXISTS food_daily_rollup (
+    date TEXT NOT NULL,
+    meal_type_id INTEGER NOT NULL,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    total_calories INTEGER NOT NULL DEFAULT 0,
+    calorie_entries INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, meal_type_id)
+) WITHOUT ROWID;
+
+DELETE FROM food_daily_rollup;
+
+INSERT INTO food_daily_rollup (date, meal_type_id, entry_count, total_calories, calorie_entries)
+SELECT date, meal_type_id, COUNT(*), IFNULL(SUM(calories), 0), COUNT(calories)
+FROM food_log
+GROUP BY date, meal_type_id;
+
+CREATE TRIGGER IF NOT EXISTS food_daily_rollup_insert
+AFTER INSERT ON food_log
+BEGIN
+    INSERT INTO food_daily_rollup (date, meal_type_id, entry_count, total_calories, calorie_entries)
+    VALUES (NEW.date, NEW.meal_type_id, 1, IFNULL(NEW.calories, 0), NEW.calories IS NOT NULL)
+    ON CONFLICT (date, meal_type_id) DO UPDATE SET
+        entry_count = entry_count + excluded.entry_count,
+        total_calories = total_calories + excluded.total_calories,
+        calorie_entries = calorie_entries + excluded.calorie_entries;
+END;
+
+CREATE TRIGGER IF NOT EXISTS food_daily_rollup_delete
+AFTER DELETE ON food_log
+BEGIN
+    UPDATE food_daily_rollup SET
+        entry_count = entry_count - 1,
+        total_calories = total_calories - IFNULL(OLD.calories, 0),
+        calorie_entries = calorie_entries - (OLD.calories IS NOT NULL)
+    WHERE date = OLD.date AND meal_type_id = OLD.meal_type_id;
+    DELETE FROM food_daily_rollup
+    WHERE date = OLD.date AND meal_type_id = OLD.meal_type_id AND entry_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS food_daily_rollup_update
+AFTER UPDATE OF date, meal_type_id, calories ON food_log
+BEGIN
+    UPDATE food_daily_rollup SET
+        entry_count = entry_count - 1,
+        total_calories = total_calories - IFNULL(OLD.calories, 0),
+        calorie_entries = calorie_entries - (OLD.calories IS NOT NULL)
+    WHERE date = OLD.date AND meal_type_id = OLD.meal_type_id;
+    DELETE FROM food_daily_rollup
+    WHERE date = OLD.date AND meal_type_id = OLD.meal_type_id AND entry_count <= 0;
+    INSERT INTO food_daily_rollup (date, meal_type_id, entry_count, total_calories, calorie_entries)
+    VALUES (NEW.date, NEW.meal_type_id, 1, IFNULL(NEW.calories, 0), NEW.calories IS NOT NULL)
+    ON CONFLICT (date, meal_type_id) DO UPDATE SET
+        entry_count = entry_count + excluded.entry_count,
+        total_calories = total_calories + excluded.total_calories,
+        calorie_entries = calorie_entries + excluded.calorie_entries;
+END;
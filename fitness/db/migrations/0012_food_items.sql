@@ -0,0 +1,83 @@
+-- Distinct food items with how often and when they were last logged, for
+-- autocomplete on the food form. Kept current by triggers on food_log.
+--
+-- name is case-insensitive (NOCASE), so "Eggs" and "eggs" are one item shown
+-- with the spelling used most recently. last_used is date || ' ' || time of
+-- the latest entry (just the date when it has no time); last_quantity /
+-- last_calories come from that entry.
+-- The food_log index lets the delete/update triggers recompute one item from
+-- its own entries instead of scanning the log.
+
+CREATE TABLE IF NOT EXISTS food_items (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    use_count INTEGER NOT NULL,
+    last_used TEXT NOT NULL,
+    last_quantity TEXT,
+    last_calories INTEGER
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_food_log_item ON food_log (food_item COLLATE NOCASE, date, time);
+
+DELETE FROM food_items;
+
+INSERT INTO food_items (name, use_count, last_used, last_quantity, last_calories)
+SELECT food_item, use_count, last_used, quantity, calories
+FROM (
+    SELECT food_item, quantity, calories,
+           rtrim(date || ' ' || IFNULL(time, '')) AS last_used,
+           COUNT(*) OVER (PARTITION BY food_item COLLATE NOCASE) AS use_count,
+           ROW_NUMBER() OVER (PARTITION BY food_item COLLATE NOCASE
+                              ORDER BY date DESC, time DESC, id DESC) AS rn
+    FROM food_log
+    WHERE trim(food_item) <> ''
+)
+WHERE rn = 1;
+
+CREATE TRIGGER IF NOT EXISTS food_items_insert
+AFTER INSERT ON food_log
+WHEN trim(NEW.food_item) <> ''
+BEGIN
+    INSERT INTO food_items (name, use_count, last_used, last_quantity, last_calories)
+    VALUES (NEW.food_item, 1, rtrim(NEW.date || ' ' || IFNULL(NEW.time, '')), NEW.quantity, NEW.calories)
+    ON CONFLICT (name) DO UPDATE SET
+        use_count = use_count + 1,
+        name = CASE WHEN excluded.last_used >= last_used THEN excluded.name ELSE name END,
+        last_quantity = CASE WHEN excluded.last_used >= last_used THEN excluded.last_quantity ELSE last_quantity END,
+        last_calories = CASE WHEN excluded.last_used >= last_used THEN excluded.last_calories ELSE last_calories END,
+        last_used = MAX(last_used, excluded.last_used);
+END;
+
+-- deletes and edits recompute the affected item(s) from their remaining entries
+CREATE TRIGGER IF NOT EXISTS food_items_delete
+AFTER DELETE ON food_log
+BEGIN
+    DELETE FROM food_items WHERE name = OLD.food_item;
+    INSERT INTO food_items (name, use_count, last_used, last_quantity, last_calories)
+    SELECT food_item, (SELECT COUNT(*) FROM food_log WHERE food_item = OLD.food_item COLLATE NOCASE),
+           rtrim(date || ' ' || IFNULL(time, '')), quantity, calories
+    FROM food_log
+    WHERE food_item = OLD.food_item COLLATE NOCASE AND trim(food_item) <> ''
+    ORDER BY date DESC, time DESC, id DESC
+    LIMIT 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS food_items_update
+AFTER UPDATE OF date, time, food_item, quantity, calories ON food_log
+BEGIN
+    DELETE FROM food_items WHERE name IN (OLD.food_item, NEW.food_item);
+    INSERT INTO food_items (name, use_count, last_used, last_quantity, last_calories)
+    SELECT food_item, (SELECT COUNT(*) FROM food_log WHERE food_item = OLD.food_item COLLATE NOCASE),
+           rtrim(date || ' ' || IFNULL(time, '')), quantity, calories
+    FROM food_log
+    WHERE food_item = OLD.food_item COLLATE NOCASE AND trim(food_item) <> ''
+    ORDER BY date DESC, time DESC, id DESC
+    LIMIT 1;
+    INSERT INTO food_items (name, use_count, last_used, last_quantity, last_calories)
+    SELECT food_item, (SELECT COUNT(*) FROM food_log WHERE food_item = NEW.food_item COLLATE NOCASE),
+           rtrim(date || ' ' || IFNULL(time, '')), quantity, calories
+    FROM food_log
+    WHERE food_item = NEW.food_item COLLATE NOCASE AND trim(food_item) <> ''
+    ORDER BY date DESC, time DESC, id DESC
+    LIMIT 1
+    ON CONFLICT (name) DO NOTHING;
+END;
@@ -0,0 +1,11 @@
+-- Idempotency keys for the /api/v1 batch ingestion endpoints. A record sent
+-- with a key is created once; a retry of the same (kind, key) is answered
+-- with the id created the first time instead of inserting it again.
+
+CREATE TABLE IF NOT EXISTS ingest_keys (
+    kind TEXT NOT NULL,          -- cardio, food, health, strength
+    key TEXT NOT NULL,
+    record_id INTEGER NOT NULL,  -- cardio_workouts / food_log / health_log / workouts id
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
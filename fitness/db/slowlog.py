@@ -0,0 +1,201 @@
+# fitness/db/slowlog.py
+"""Slow-query log.
+
+A statement run on a pooled connection or one from connect() (see
+TimedCursor in db.py) that takes at least SLOW_QUERY_MS is appended as one JSON line to a rotating
+log, slow_queries.log next to fitness.db by default. The time counted is
+the statement's execute() plus fetchall() on the same cursor. Each line records:
+
+    fingerprint   hash of the normalized SQL (literals and IN lists -> ?)
+    sql           the normalized SQL
+    params        the bound parameters' shape, e.g. ["int", "str"] (never their values)
+    ms            duration
+    route         endpoint, method and path of the request that ran it
+                  (null for background jobs and CLI commands)
+    plan          EXPLAIN QUERY PLAN output, taken right after on the same connection
+
+/db/slow-queries reads the log and its rotated files back and aggregates
+them by fingerprint. Several gunicorn workers append to the same file;
+each record is a single short write, but a rotation can lose a few lines
+written at that moment.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, render_template, request
+
+SLOW_QUERY_MS = float(os.environ.get("FITNESS_SLOW_QUERY_MS", 100))   # <= 0 turns the log off
+SLOW_QUERY_LOG = os.environ.get("FITNESS_SLOW_QUERY_LOG")             # default: next to fitness.db
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_settings = {"threshold": SLOW_QUERY_MS / 1000, "path": SLOW_QUERY_LOG}
+_logger = logging.getLogger("fitness.slow_queries")
+_logger.propagate = False
+_handler_lock = threading.Lock()
+
+
+def configure(threshold_ms=None, path=None):
+    """Override the threshold (milliseconds) or log path."""
+    if threshold_ms is not None:
+        _settings["threshold"] = float(threshold_ms) / 1000
+    if path is not None:
+        _settings["path"] = path
+        with _handler_lock:
+            for handler in list(_logger.handlers):
+                _logger.removeHandler(handler)
+                handler.close()
+
+
+def threshold():
+    """Seconds a statement must take to be logged; None when the log is off."""
+    return _settings["threshold"] if _settings["threshold"] > 0 else None
+
+
+def log_path():
+    if _settings["path"] is None:
+        from fitness.db.db import DB_PATH
+        _settings["path"] = os.path.join(os.path.dirname(DB_PATH), "slow_queries.log")
+    return _settings["path"]
+
+
+def _ensure_handler():
+    if _logger.handlers:
+        return
+    with _handler_lock:
+        if not _logger.handlers:
+            handler = RotatingFileHandler(log_path(), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                          encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.INFO)
+
+
+# ---------------------------
+# Normalizing
+# ---------------------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """SQL with literals replaced by ?, placeholder lists collapsed and whitespace squeezed."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?, ...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def param_shape(params):
+    """Types of the bound parameters: a list, or a dict for named parameters."""
+    def kind(value):
+        return "null" if value is None else type(value).__name__
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: kind(value) for name, value in params.items()}
+    return [kind(value) for value in params]
+
+
+def _explain(conn, sql, params):
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    stats, conn.stats = conn.stats, None   # the EXPLAIN itself is not part of the request's numbers
+    try:
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+        return [row[3] for row in rows]
+    except (sqlite3.Error, ValueError, TypeError):
+        return None
+    finally:
+        conn.stats = stats
+
+
+def record(conn, sql, params, seconds, many=0):
+    """Append a slow statement to the log. `many` is the row count of an executemany
+    (`params` then being its first row, if known)."""
+    try:
+        normalized = normalize(sql)
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "fingerprint": fingerprint(normalized),
+            "sql": normalized,
+            "params": param_shape(params),
+            "ms": round(seconds * 1000, 2),
+            "route": (f"{request.endpoint} {request.method} {request.path}" if has_request_context() else None),
+            "plan": _explain(conn, sql, params),
+        }
+        if many:
+            entry["rows"] = many
+        _ensure_handler()
+        _logger.info(json.dumps(entry))
+    except Exception:  # never fail the query being measured
+        logging.getLogger(__name__).exception("could not write the slow-query log")
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+def read_entries():
+    """Every record in the log and its rotated files, oldest file first."""
+    path = log_path()
+    for name in [f"{path}.{i}" for i in range(LOG_BACKUPS, 0, -1)] + [path]:
+        try:
+            with open(name, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def plan_warnings(plan):
+    """Plan steps worth a look: full table scans and temp b-trees for sorting/grouping."""
+    return [step for step in plan or ()
+            if (step.startswith("SCAN") and " USING " not in step and "VIRTUAL TABLE" not in step)
+            or "TEMP B-TREE" in step]
+
+
+def aggregate(entries):
+    """Group records by fingerprint, heaviest total time first."""
+    groups = {}
+    for e in entries:
+        group = groups.get(e["fingerprint"])
+        if group is None:
+            group = groups[e["fingerprint"]] = {"fingerprint": e["fingerprint"], "sql": e["sql"], "count": 0,
+                                            "total_ms": 0.0, "max_ms": 0.0, "routes": Counter()}
+        group["count"] += 1
+        group["total_ms"] += e["ms"]
+        group["max_ms"] = max(group["max_ms"], e["ms"])
+        group["last_seen"], group["params"] = e["ts"], e.get("params")
+        group["plan"] = e.get("plan") or group.get("plan")
+        if e.get("route"):
+            group["routes"][e["route"].split(" ")[0]] += 1
+    result = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+    for group in result:
+        group["mean_ms"] = group["total_ms"] / group["count"]
+        group["routes"] = group["routes"].most_common(5)
+        group["warnings"] = plan_warnings(group["plan"])
+    return result
+
+
+def slow_queries_view():
+    return render_template("slow_queries.html", groups=aggregate(read_entries()),
+                           threshold=threshold(), path=log_path())
@@ -0,0 +1,178 @@
+# fitness/db/writer.py
+"""Write transactions for the logging routes, with optional group commit.
+
+    write(fn, *args)   # runs fn(conn, *args) in a write transaction, returns its result
+
+By default write() runs fn on the request's connection between BEGIN
+IMMEDIATE and COMMIT, as the routes always have. With FITNESS_WRITE_QUEUE=1
+(app config WRITE_QUEUE) each worker process instead hands writes to one
+writer thread. That thread takes the first pending write, collects more
+for up to WRITE_MAX_DELAY_MS or until WRITE_MAX_BATCH are waiting, and
+runs them all in one transaction. Each write gets its own SAVEPOINT, so a
+failing write is rolled back and re-raised to its caller alone, while the
+rest commit together. Callers return only after that commit, so a burst
+of small inserts costs one lock acquisition and one WAL sync instead of
+one each. Workers still contend with each other for SQLite's write lock,
+just once per batch instead of once per request.
+
+fn runs on the writer thread, so it must only use the connection it is
+given, not flask.g, request or the request's connection. fn is also
+responsible for bump_versions() on the data tables it writes; execute()
+does that for its statement.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from fitness.db.cache import bump_versions, written_table
+from fitness.db.db import connect, get_connection, get_pool
+from fitness.utils.metrics import Counter, Gauge, Histogram, register
+
+WRITE_QUEUE = os.environ.get("FITNESS_WRITE_QUEUE") == "1"
+# writes committed together at most
+WRITE_MAX_BATCH = int(os.environ.get("FITNESS_WRITE_MAX_BATCH", 64))
+# how long the writer waits for more writes after the first one of a batch
+WRITE_MAX_DELAY_MS = float(os.environ.get("FITNESS_WRITE_MAX_DELAY_MS", 2))
+# seconds a caller waits for its batch to commit (the write itself is not cancelled)
+WRITE_TIMEOUT = 30
+
+BATCH_SIZE = register(Histogram("fitness_write_batch_size", "Writes committed per group-commit transaction.",
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)))
+WRITE_SECONDS = register(Histogram("fitness_write_wait_seconds",
+                                   "Time from queueing a write to its commit, by outcome.", ("outcome",)))
+WRITES = register(Counter("fitness_writes_total", "Queued writes by outcome.", ("outcome",)))
+
+_settings = {"enabled": WRITE_QUEUE, "max_batch": WRITE_MAX_BATCH, "max_delay": WRITE_MAX_DELAY_MS / 1000}
+
+
+class GroupCommitWriter:
+    """One thread with its own connection, committing queued writes in batches."""
+
+    def __init__(self, max_batch, max_delay):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="fitness-writer", daemon=True)
+        self._thread.start()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def submit(self, fn, args):
+        future = Future()
+        self._queue.put((fn, args, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, conn, batch):
+        """Run one batch in a transaction; returns [(future, queued, result, error)]."""
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        for fn, args, future, queued in batch:
+            conn.execute("SAVEPOINT queued_write")
+            try:
+                results.append((future, queued, fn(conn, *args), None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO queued_write")
+                results.append((future, queued, None, e))
+            conn.execute("RELEASE queued_write")
+        conn.commit()
+        return results
+
+    def _loop(self):
+        conn = None
+        while True:
+            batch = self._collect()
+            BATCH_SIZE.observe((), len(batch))
+            try:
+                if conn is None:
+                    conn = connect(pragmas=get_pool().pragmas)
+                results = self._commit(conn, batch)
+            except BaseException as e:
+                # whatever went wrong fails this batch only; the thread keeps serving
+                results = [(future, queued, None, e) for _, _, future, queued in batch]
+                try:
+                    if conn is not None and conn.in_transaction:
+                        conn.rollback()
+                except Exception:
+                    conn.close()
+                    conn = None   # reconnect for the next batch
+            for future, queued, result, error in results:
+                outcome = "failed" if error is not None else "committed"
+                WRITES.inc((outcome,))
+                WRITE_SECONDS.observe((outcome,), time.perf_counter() - queued)
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def alive(self):
+        return self.pid == os.getpid() and self._thread.is_alive()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """This process's writer, restarted after a fork (gunicorn workers) or if its thread died."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.alive():
+            _writer = GroupCommitWriter(_settings["max_batch"], _settings["max_delay"])
+        return _writer
+
+
+register(Gauge("fitness_write_queue_depth", "Writes waiting for the writer thread.",
+               lambda: _writer.depth() if _writer is not None and _writer.pid == os.getpid() else 0))
+
+
+def write(fn, *args):
+    """Run fn(conn, *args) in a write transaction and return its result; an
+    exception from fn rolls its changes back and is re-raised here."""
+    if _settings["enabled"]:
+        return get_writer().submit(fn, args).result(timeout=WRITE_TIMEOUT)
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(conn, *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+def execute(sql, params=()):
+    """write() of a single statement; returns the number of rows it changed.
+
+    The written table's version is bumped when any row changed.
+    """
+    table = written_table(sql)
+
+    def run(conn):
+        changed = conn.execute(sql, params).rowcount
+        if changed and table is not None:
+            bump_versions(conn, table)
+        return changed
+    return write(run)
+
+
+def init_app(app):
+    """Pick up WRITE_QUEUE / WRITE_MAX_BATCH / WRITE_MAX_DELAY_MS from the app config."""
+    _settings["enabled"] = bool(app.config.get("WRITE_QUEUE", _settings["enabled"]))
+    _settings["max_batch"] = int(app.config.get("WRITE_MAX_BATCH", _settings["max_batch"]))
+    _settings["max_delay"] = float(app.config.get("WRITE_MAX_DELAY_MS", _settings["max_delay"] * 1000)) / 1000
@@ -8,8 +8,10 @@ food_bp = Blueprint(
     'food_bp',
     __name__,
     template_folder='templates',
-    static_folder='static'
+    static_folder='static',
+    cli_group='food'
 )
 
 # Import routes after blueprint creation
 from fitness.food.routes import food_routes,meal_types_routes
+from fitness.food import rollup, items
@@ -0,0 +1,86 @@
+# fitness/food/items.py
+"""Food item autocomplete (food_items).
+
+The table is maintained by triggers on food_log (migration 0012); this
+module answers prefix lookups from it and can rebuild it from the log:
+
+    flask food rebuild-items
+"""
+import click
+
+from fitness.db.cache import bump_versions
+from fitness.db.db import get_connection
+from fitness.food import food_bp
+
+SUGGESTION_LIMIT = 10
+MAX_SUGGESTION_LIMIT = 50
+# a use this many days ago counts half as much as one today
+RECENCY_DAYS = 30
+
+# The prefix is a range on the NOCASE primary key, so a keystroke only reads
+# the items that start with it. Those are ranked by use count, decayed by how
+# long ago the item was last logged.
+SUGGEST_SQL = f"""
+    SELECT name, use_count, last_used, last_quantity AS quantity, last_calories AS calories
+    FROM food_items
+    WHERE name >= :prefix AND name < :prefix || char(1114111)
+    ORDER BY use_count / (1.0 + IFNULL(julianday('now') - julianday(substr(last_used, 1, 10)), 0)
+                                / {RECENCY_DAYS}) DESC,
+             last_used DESC
+    LIMIT :limit
+"""
+
+# Same content as the triggers, computed from scratch.
+ITEMS_FROM_LOG_SQL = """
+    SELECT food_item, use_count, last_used, quantity, calories
+    FROM (
+        SELECT food_item, quantity, calories,
+               rtrim(date || ' ' || IFNULL(time, '')) AS last_used,
+               COUNT(*) OVER (PARTITION BY food_item COLLATE NOCASE) AS use_count,
+               ROW_NUMBER() OVER (PARTITION BY food_item COLLATE NOCASE
+                                  ORDER BY date DESC, time DESC, id DESC) AS rn
+        FROM food_log
+        WHERE trim(food_item) <> ''
+    )
+    WHERE rn = 1
+"""
+
+
+def suggest(conn, prefix, limit=SUGGESTION_LIMIT):
+    """Items starting with prefix (case-insensitive), most frequently and
+    recently used first, with the quantity and calories last logged."""
+    prefix = (prefix or "").lstrip()
+    if not prefix:
+        return []
+    rows = conn.execute(SUGGEST_SQL, {"prefix": prefix, "limit": limit}).fetchall()
+    return [dict(r) for r in rows]
+
+
+def rebuild_items(conn):
+    """Recompute food_items from food_log; returns the number of items.
+
+    Bumps food_log's version, which the suggestions' ETag is built from.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM food_items")
+        cur = conn.execute("INSERT INTO food_items (name, use_count, last_used, last_quantity, last_calories) "
+                           + ITEMS_FROM_LOG_SQL)
+        bump_versions(conn, "food_log")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+@food_bp.cli.command("rebuild-items")
+def rebuild_items_command():
+    """Recompute food_items (autocomplete) from food_log."""
+    conn = get_connection()
+    items = rebuild_items(conn)
+    conn.close()
+    click.echo(f"rebuilt food_items: {items} items")
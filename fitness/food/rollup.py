@@ -0,0 +1,151 @@
+# fitness/food/rollup.py
+"""Daily nutrition rollup (food_daily_rollup).
+
+The table is maintained by triggers on food_log (migration 0011); this
+module reads it for the food dashboard and can rebuild or verify it from the
+base table:
+
+    flask food rebuild-rollup
+    flask food check-rollup
+"""
+import click
+import numpy as np
+
+from fitness.db.cache import bump_versions
+from fitness.db.db import get_connection
+from fitness.food import food_bp
+from fitness.utils.charts import load_columns, memoized, rolling_mean, to_list
+
+# days in the rolling calorie average
+AVERAGE_DAYS = 7
+
+ROLLUP_COLUMNS = ("entry_count", "total_calories", "calorie_entries")
+
+# Same aggregation as the triggers, computed from scratch.
+DAILY_AGGREGATE_SQL = """
+    SELECT date, meal_type_id,
+           COUNT(*) AS entry_count,
+           IFNULL(SUM(calories), 0) AS total_calories,
+           COUNT(calories) AS calorie_entries
+    FROM food_log
+    GROUP BY date, meal_type_id
+"""
+
+# rows with dates that are not plain YYYY-MM-DD are left off the charts
+DAILY_ROWS_SQL = """
+    SELECT r.date, r.meal_type_id, mt.name AS meal_name, r.entry_count, r.total_calories
+    FROM food_daily_rollup r
+    JOIN meal_types mt ON mt.id = r.meal_type_id
+    WHERE r.date = date(r.date) {where}
+    ORDER BY r.date
+"""
+
+
+@memoized("food_log", "meal_types")
+def daily_nutrition(conn, start=None, end=None):
+    """Dashboard series, one value per calendar day from the first to the last
+    logged day in [start, end], computed on arrays.
+
+    Days with nothing logged are None (not 0), so they don't drag the
+    AVERAGE_DAYS rolling average down.
+    """
+    where, params = "", []
+    if start:
+        where += " AND r.date >= ?"
+        params.append(start)
+    if end:
+        where += " AND r.date <= ?"
+        params.append(end)
+    data = load_columns(conn, DAILY_ROWS_SQL.format(where=where), params)
+    if not len(data["date"]):
+        return {"dates": [], "meal_types": [], "total": [], "total_avg": [], "entries": [],
+                "average_per_day": None, "average_days": AVERAGE_DAYS}
+
+    row_days = data["date"].astype("datetime64[D]")
+    days = np.arange(row_days[0], row_days[-1] + 1)
+    day_index = (row_days - days[0]).astype(int)
+    meal_ids, meal_index = np.unique(data["meal_type_id"], return_inverse=True)
+    names = dict(zip(data["meal_type_id"].tolist(), data["meal_name"].tolist()))
+
+    calories = np.full((len(meal_ids), len(days)), np.nan)
+    calories[meal_index, day_index] = data["total_calories"]
+    entries = np.zeros(len(days))
+    np.add.at(entries, day_index, data["entry_count"])
+
+    logged = entries > 0
+    total = np.where(logged, np.nansum(calories, axis=0), np.nan)
+    with np.errstate(invalid="ignore"):
+        meal_averages = np.nanmean(calories, axis=1)
+    return {
+        "dates": days.astype(str).tolist(),
+        "meal_types": [{"id": int(id), "name": names[id], "calories": to_list(row, 0),
+                        "average": round(float(avg))}
+                       for id, row, avg in zip(meal_ids.tolist(), calories, meal_averages)],
+        "total": to_list(total, 0),
+        "total_avg": to_list(rolling_mean(total, AVERAGE_DAYS), 0),
+        "entries": to_list(entries, 0),
+        "average_per_day": round(float(np.nanmean(total))),
+        "average_days": AVERAGE_DAYS,
+    }
+
+
+def rebuild_rollup(conn):
+    """Recompute the whole rollup from food_log; returns the number of rows written.
+
+    Bumps food_log's version so the memoized dashboard data is dropped.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM food_daily_rollup")
+        cur = conn.execute(f"INSERT INTO food_daily_rollup (date, meal_type_id, {', '.join(ROLLUP_COLUMNS)}) "
+                           + DAILY_AGGREGATE_SQL)
+        bump_versions(conn, "food_log")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+
+def check_rollup(conn):
+    """Compare the rollup with a fresh aggregate.
+
+    Returns a list of ((date, meal_type_id), stored, expected) for keys that
+    differ; stored or expected is None when the key is missing on that side.
+    """
+    key = lambda r: (r["date"], r["meal_type_id"])
+    stored = {key(r): r for r in conn.execute("SELECT * FROM food_daily_rollup")}
+    expected = {key(r): r for r in conn.execute(DAILY_AGGREGATE_SQL)}
+    mismatches = []
+    for k in sorted(stored.keys() | expected.keys()):
+        have, want = stored.get(k), expected.get(k)
+        if have is None or want is None or any(have[c] != want[c] for c in ROLLUP_COLUMNS):
+            mismatches.append((k,
+                               dict(have) if have is not None else None,
+                               dict(want) if want is not None else None))
+    return mismatches
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+@food_bp.cli.command("rebuild-rollup")
+def rebuild_rollup_command():
+    """Recompute food_daily_rollup from food_log."""
+    conn = get_connection()
+    rows = rebuild_rollup(conn)
+    conn.close()
+    click.echo(f"rebuilt food_daily_rollup: {rows} rows")
+
+
+@food_bp.cli.command("check-rollup")
+def check_rollup_command():
+    """Verify food_daily_rollup against food_log (exit 1 on mismatch)."""
+    conn = get_connection()
+    mismatches = check_rollup(conn)
+    conn.close()
+    for k, have, want in mismatches:
+        click.echo(f"{k!r}: stored {have} expected {want}")
+    if mismatches:
+        raise click.exceptions.Exit(1)
+    click.echo("food_daily_rollup is consistent")
@@ -1,27 +1,48 @@
 from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from fitness.db.cache import lookup_cache
 from fitness.db.db import get_connection
+from fitness.db.writer import execute as execute_write
 from fitness.utils.helpers import calculate_pace
+from fitness.utils.pagination import keyset_page
+from fitness.utils.conditional import conditional
+from fitness.utils.export_import import (iter_csv, iter_ndjson, csv_response, ndjson_response,
+                                         export_query, export_filters, date_bounds, bulk_import,
+                                         LookupMap,
+                                         to_text, to_int, to_date, to_time)
 from fitness.food import food_bp
+from fitness.food.rollup import daily_nutrition
+from fitness.food.items import suggest, SUGGESTION_LIMIT, MAX_SUGGESTION_LIMIT
+from fitness.jobs.runner import job_started, save_upload, submit
 import csv, io
 
+FOOD_LIST_SQL = """
+    SELECT f.*, mt.name AS meal_name
+    FROM food_log f
+    JOIN meal_types mt ON f.meal_type_id = mt.id
+"""
+
 
 # ---------- Food Log CRUD ----------
 @food_bp.route('/food')
+@conditional("food_log", "meal_types")
 def food_list():
     conn = get_connection()
-    foods = conn.execute("""
-        SELECT f.*, mt.name AS meal_name
-        FROM food_log f
-        JOIN meal_types mt ON f.meal_type_id = mt.id
-        ORDER BY date DESC, time DESC
-    """).fetchall()
+    page = keyset_page(conn, FOOD_LIST_SQL, alias="f")
+    conn.close()
+    return render_template('food_list.html', foods=page.items, page=page)
+
+@food_bp.route('/api/food')
+@conditional("food_log", "meal_types")
+def api_food_list():
+    conn = get_connection()
+    page = keyset_page(conn, FOOD_LIST_SQL, alias="f")
     conn.close()
-    return render_template('food_list.html', foods=foods)
+    return jsonify(page.to_dict())
 
 @food_bp.route('/food/add', methods=['GET', 'POST'])
 def add_food():
     conn = get_connection()
-    meal_types = conn.execute("SELECT * FROM meal_types ORDER BY name").fetchall()
+    meal_types = lookup_cache.rows(conn, "meal_types")
 
     if request.method == 'POST':
         date = request.form['date']
@@ -32,11 +53,10 @@ def add_food():
         calories = request.form.get('calories') or None
         notes = request.form.get('notes') or None
 
-        conn.execute("""
+        execute_write("""
             INSERT INTO food_log (date, time, meal_type_id, food_item, quantity, calories, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (date, time, meal_type_id, food_item, quantity, calories, notes))
-        conn.commit()
         conn.close()
         flash("✅ Food entry added!", "success")
         return redirect(url_for('food_bp.food_list'))
@@ -47,7 +67,7 @@ def add_food():
 @food_bp.route('/food/edit/<int:id>', methods=['GET', 'POST'])
 def edit_food(id):
     conn = get_connection()
-    meal_types = conn.execute("SELECT * FROM meal_types ORDER BY name").fetchall()
+    meal_types = lookup_cache.rows(conn, "meal_types")
     food = conn.execute("SELECT * FROM food_log WHERE id=?", (id,)).fetchone()
 
     if request.method == 'POST':
@@ -59,12 +79,11 @@ def edit_food(id):
         calories = request.form.get('calories') or None
         notes = request.form.get('notes') or None
 
-        conn.execute("""
+        execute_write("""
             UPDATE food_log
             SET date=?, time=?, meal_type_id=?, food_item=?, quantity=?, calories=?, notes=?
             WHERE id=?
         """, (date, time, meal_type_id, food_item, quantity, calories, notes, id))
-        conn.commit()
         conn.close()
         flash("✏️ Food entry updated!", "info")
         return redirect(url_for('food_bp.food_list'))
@@ -74,96 +93,118 @@ def edit_food(id):
 
 @food_bp.route('/food/delete/<int:id>')
 def delete_food(id):
-    conn = get_connection()
-    conn.execute("DELETE FROM food_log WHERE id=?", (id,))
-    conn.commit()
-    conn.close()
+    execute_write("DELETE FROM food_log WHERE id=?", (id,))
     flash("🗑️ Food entry deleted!", "danger")
     return redirect(url_for('food_bp.food_list'))
 
+@food_bp.route('/api/food/items')
+@conditional("food_log")
+def api_food_items():
+    """Autocomplete: food items starting with ?q=, ranked by frequency and recency."""
+    limit = max(1, min(request.args.get('limit', SUGGESTION_LIMIT, type=int), MAX_SUGGESTION_LIMIT))
+    conn = get_connection()
+    items = suggest(conn, request.args.get('q', ''), limit)
+    conn.close()
+    return jsonify(items)
+
+# ---------- Dashboard ----------
+# Both read food_daily_rollup, so their cost follows the number of days shown,
+# not the number of entries. Optional ?start=/?end= (YYYY-MM-DD) bound the dates.
+@food_bp.route('/food/dashboard')
+@conditional("food_log", "meal_types")
+def food_dashboard():
+    bounds = date_bounds()
+    conn = get_connection()
+    data = daily_nutrition(conn, bounds['start'], bounds['end'])
+    conn.close()
+    return render_template('food_dashboard.html', data=data, **bounds)
+
+@food_bp.route('/api/food/daily')
+@conditional("food_log", "meal_types")
+def api_food_daily():
+    """Calories per day (total and per meal type) plus a rolling average."""
+    bounds = date_bounds()
+    conn = get_connection()
+    data = daily_nutrition(conn, bounds['start'], bounds['end'])
+    conn.close()
+    return jsonify(data)
+
 # ---- Export/import food log -----
 
+# Exports accept ?fields=a,b and ?start=/?end= (YYYY-MM-DD), applied in SQL.
+FOOD_EXPORT_COLUMNS = {
+    "id": "fl.id", "date": "fl.date", "time": "fl.time", "meal_type": "mt.name",
+    "food_item": "fl.food_item", "quantity": "fl.quantity", "calories": "fl.calories", "notes": "fl.notes",
+}
+FOOD_EXPORT_FROM = "food_log fl JOIN meal_types mt ON fl.meal_type_id = mt.id"
+
+def _export_food_cursor(conn):
+    sql, params = export_query(FOOD_EXPORT_COLUMNS, FOOD_EXPORT_FROM, "fl.date DESC, fl.time",
+                               **export_filters(FOOD_EXPORT_COLUMNS))
+    return conn.execute(sql, params)
+
 # --- EXPORT CSV ---
 @food_bp.route('/food/export_csv')
+@conditional("food_log", "meal_types")
 def export_food_csv():
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT fl.id, fl.date, fl.time, mt.name AS meal_type, fl.food_item, fl.quantity, fl.calories, fl.notes
-        FROM food_log fl
-        JOIN meal_types mt ON fl.meal_type_id = mt.id
-        ORDER BY fl.date DESC, fl.time
-    """)
-    rows = cur.fetchall()
-    headers = [desc[0] for desc in cur.description]
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(headers)
-    writer.writerows(rows)
-    output.seek(0)
-
-    return send_file(io.BytesIO(output.getvalue().encode('utf-8')),
-                     mimetype='text/csv',
-                     as_attachment=True,
-                     download_name='food_log.csv')
+    return csv_response(iter_csv(_export_food_cursor(conn)), 'food_log.csv')
 
 # --- EXPORT JSON ---
 @food_bp.route('/food/export_json')
+@conditional("food_log", "meal_types")
 def export_food_json():
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT fl.id, fl.date, fl.time, mt.name AS meal_type, fl.food_item, fl.quantity, fl.calories, fl.notes
-        FROM food_log fl
-        JOIN meal_types mt ON fl.meal_type_id = mt.id
-        ORDER BY fl.date DESC, fl.time
-    """)
-    rows = [dict(zip([col[0] for col in cur.description], row)) for row in cur.fetchall()]
+    rows = [dict(r) for r in _export_food_cursor(conn).fetchall()]
+    conn.close()
     return jsonify(rows)
 
+# --- EXPORT NDJSON (streamed) ---
+@food_bp.route('/food/export_ndjson')
+@conditional("food_log", "meal_types")
+def export_food_ndjson():
+    conn = get_connection()
+    return ndjson_response(iter_ndjson(_export_food_cursor(conn)))
+
 # --- IMPORT CSV ---
+FOOD_INSERT_SQL = """
+    INSERT INTO food_log (date, time, meal_type_id, food_item, quantity, calories, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _food_import_row(row, meal_type_ids):
+    """CSV row (export_csv layout) -> FOOD_INSERT_SQL parameters."""
+    food_item = to_text(row.get('food_item'))
+    if food_item is None:
+        raise ValueError("food_item is required")
+    date, time = to_date(row.get('date')), to_time(row.get('time'))
+    quantity, calories, notes = to_text(row.get('quantity')), to_int(row.get('calories')), to_text(row.get('notes'))
+    # unknown/missing meal types are created on the fly, once the rest of the row is known to be valid
+    meal_type_id = meal_type_ids(row.get('meal_type') or 'Unknown')
+    return (date, time, meal_type_id, food_item, quantity, calories, notes)
+
+def import_food_job(job, path):
+    """Background job: import a saved CSV upload."""
+    conn = get_connection()
+    try:
+        reader = csv.DictReader(job.open_upload(path))
+        meal_type_ids = LookupMap(conn, "meal_types")
+        summary = bulk_import(conn, reader, lambda row: _food_import_row(row, meal_type_ids),
+                              FOOD_INSERT_SQL, progress=job.progress)
+    finally:
+        conn.close()
+    return summary.to_dict()
+
 @food_bp.route('/food/import_csv', methods=['GET', 'POST'])
 def import_food_csv():
     if request.method == 'POST':
         file = request.files['file']
         if not file:
             flash('No file uploaded', 'error')
-            return redirect(url_for('food_bp.food_log'))
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        reader = csv.DictReader(stream)
-
-        conn = get_connection()
-        cur = conn.cursor()
-
-        for row in reader:
-            # Ensure meal type exists or create it
-            meal_type_name = row.get('meal_type') or 'Unknown'
-            cur.execute("SELECT id FROM meal_types WHERE name = ?", (meal_type_name,))
-            meal_type = cur.fetchone()
-            if not meal_type:
-                cur.execute("INSERT INTO meal_types (name) VALUES (?)", (meal_type_name,))
-                meal_type_id = cur.lastrowid
-            else:
-                meal_type_id = meal_type[0]
-
-            # Insert food log
-            cur.execute("""
-                INSERT INTO food_log (date, time, meal_type_id, food_item, quantity, calories, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row.get('date'),
-                row.get('time'),
-                meal_type_id,
-                row.get('food_item'),
-                row.get('quantity'),
-                row.get('calories'),
-                row.get('notes')
-            ))
-
-        conn.commit()
-        conn.close()
-        flash('Food log imported successfully!', 'success')
-        return redirect(url_for('food_bp.food_log'))
+            return redirect(url_for('food_bp.food_list'))
+
+        path = save_upload(file)
+        job_id = submit("food-import", import_food_job, path, description=file.filename, upload=path)
+        return job_started(job_id)
 
-    return render_template('import_food.html')
\ No newline at end of file
+    return render_template('import_food.html')
@@ -3,6 +3,7 @@ from fitness.db.db import get_connection
 from fitness.utils.helpers import calculate_pace
 from fitness.food import food_bp
 import csv, io
+import sqlite3
 
 # ---------- Meal Types CRUD ----------
 
@@ -43,8 +44,11 @@ def edit_meal_type(id):
 @food_bp.route('/meal_types/delete/<int:id>')
 def delete_meal_type(id):
     conn = get_connection()
-    conn.execute("DELETE FROM meal_types WHERE id=?", (id,))
-    conn.commit()
+    try:
+        conn.execute("DELETE FROM meal_types WHERE id=?", (id,))
+        conn.commit()
+        flash("🗑️ Meal type deleted!", "danger")
+    except sqlite3.IntegrityError:
+        flash("Meal type is used by existing food entries.", "danger")
     conn.close()
-    flash("🗑️ Meal type deleted!", "danger")
     return redirect(url_for('food_bp.meal_types'))
\ No newline at end of file
@@ -1,8 +1,18 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import render_template, request, redirect, url_for, flash, jsonify, send_file, abort
 from fitness.db.db import get_connection
+from fitness.db.writer import execute as execute_write
 from fitness.utils.helpers import calculate_pace
+from fitness.utils.pagination import keyset_page
+from fitness.utils.charts import (ewma, load_columns, memoized, rolling_mean, rolling_std, to_pairs,
+                                   trend_slope)
+from fitness.utils.conditional import conditional
+from fitness.utils.export_import import (iter_csv, csv_response, bulk_import,
+                                         date_bounds, to_int, to_float, to_date, to_time)
 from fitness.health import health_bp
+from fitness.jobs.runner import job_started, save_upload, submit
 import csv, io
+import itertools
+import math
 import sqlite3
 
 
@@ -11,12 +21,21 @@ import sqlite3
 # =========================
 
 @health_bp.route('/health')
+@conditional("health_log")
 def health_list():
     conn = get_connection()
-    cur = conn.cursor()
-    rows = cur.execute("SELECT * FROM health_log ORDER BY date DESC, time DESC").fetchall()
+    page = keyset_page(conn, "SELECT * FROM health_log")
+    conn.close()
+    return render_template('health_list.html', records=page.items, page=page)
+
+
+@health_bp.route('/api/health')
+@conditional("health_log")
+def api_health_list():
+    conn = get_connection()
+    page = keyset_page(conn, "SELECT * FROM health_log")
     conn.close()
-    return render_template('health_list.html', records=rows)
+    return jsonify(page.to_dict())
 
 
 @health_bp.route('/health/add', methods=['GET', 'POST'])
@@ -24,23 +43,20 @@ def health_add():
     if request.method == 'POST':
         date = request.form['date']
         time = request.form['time']
-        systolic = request.form.get('systolic')
-        diastolic = request.form.get('diastolic')
-        bpm = request.form.get('bpm')
-        weight = request.form.get('weight')
+        systolic = to_int(request.form.get('systolic'))
+        diastolic = to_int(request.form.get('diastolic'))
+        bpm = to_int(request.form.get('bpm'))
+        weight = to_float(request.form.get('weight'))
 
         # Calculate BMI (height = 65 inches)
         bmi = None
         if weight:
-            bmi = round(float(weight) * 703 / (65 * 65), 1)
+            bmi = round(weight * 703 / (65 * 65), 1)
 
-        conn = get_connection()
-        conn.execute("""
+        execute_write("""
             INSERT INTO health_log (date, time, systolic, diastolic, bpm, weight, bmi)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (date, time, systolic, diastolic, bpm, weight, bmi))
-        conn.commit()
-        conn.close()
         return redirect(url_for('health_bp.health_list'))
 
     return render_template('health_form.html')
@@ -54,21 +70,20 @@ def health_edit(id):
     if request.method == 'POST':
         date = request.form['date']
         time = request.form['time']
-        systolic = request.form.get('systolic')
-        diastolic = request.form.get('diastolic')
-        bpm = request.form.get('bpm')
-        weight = request.form.get('weight')
+        systolic = to_int(request.form.get('systolic'))
+        diastolic = to_int(request.form.get('diastolic'))
+        bpm = to_int(request.form.get('bpm'))
+        weight = to_float(request.form.get('weight'))
 
         bmi = None
         if weight:
-            bmi = round(float(weight) * 703 / (65 * 65), 1)
+            bmi = round(weight * 703 / (65 * 65), 1)
 
-        cur.execute("""
+        execute_write("""
             UPDATE health_log
             SET date=?, time=?, systolic=?, diastolic=?, bpm=?, weight=?, bmi=?
             WHERE id=?
         """, (date, time, systolic, diastolic, bpm, weight, bmi, id))
-        conn.commit()
         conn.close()
         return redirect(url_for('health_bp.health_list'))
 
@@ -79,35 +94,139 @@ def health_edit(id):
 
 @health_bp.route('/health/delete/<int:id>')
 def health_delete(id):
-    conn = get_connection()
-    conn.execute("DELETE FROM health_log WHERE id=?", (id,))
-    conn.commit()
-    conn.close()
+    execute_write("DELETE FROM health_log WHERE id=?", (id,))
     return redirect(url_for('health_bp.health_list'))
 
 @health_bp.route('/health/dashboard')
 def health_dashboard():
+    # the charts load their data from api_health_series
+    return render_template('health_dashboard.html')
+
+
+# ---------------------------
+# Time series
+# ---------------------------
+HEALTH_METRICS = ("systolic", "diastolic", "bpm", "weight", "bmi")
+SERIES_BUCKETS = {"day": "%Y-%m-%d", "week": "%Y-%W", "month": "%Y-%m"}
+DEFAULT_SERIES_POINTS = 500
+MAX_SERIES_POINTS = 5000
+BP_WINDOW = 7           # readings (or buckets) in the BP moving average / deviation
+WEIGHT_TREND_SPAN = 10  # EWMA span for the weight trend line
+WEEK_MS = 7 * 24 * 3600 * 1000
+# epoch milliseconds of a reading; falls back to midnight when time is missing or odd
+READING_TS = ("CAST(IFNULL(strftime('%s', date || ' ' || time), strftime('%s', date)) AS INTEGER) * 1000")
+
+
+def _series_where(start, end):
+    clauses, params = [], []
+    if start:
+        clauses.append("date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("date <= ?")
+        params.append(end)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+@memoized("health_log")
+def health_series(conn, start, end, bucket, points):
+    """Chart series for api_health_series, computed once per health_log version."""
+    where, params = _series_where(start, end)
+    if bucket == 'raw':
+        sql = f"""
+            SELECT {READING_TS} AS ts, {', '.join(f"NULLIF({m}, '') AS {m}" for m in HEALTH_METRICS)}
+            FROM health_log{where}
+            ORDER BY date, IFNULL(time, '')
+        """
+    else:
+        sql = f"""
+            SELECT MIN({READING_TS}) AS ts, {', '.join(f"AVG(NULLIF({m}, '')) AS {m}" for m in HEALTH_METRICS)}
+            FROM health_log{where}
+            GROUP BY strftime('{SERIES_BUCKETS[bucket]}', date)
+            ORDER BY ts
+        """
+    data = load_columns(conn, sql, params)
+    ts = data['ts']
+
+    derived = {
+        'systolic_avg': rolling_mean(data['systolic'], BP_WINDOW),
+        'diastolic_avg': rolling_mean(data['diastolic'], BP_WINDOW),
+        'systolic_sd': rolling_std(data['systolic'], BP_WINDOW),
+        'diastolic_sd': rolling_std(data['diastolic'], BP_WINDOW),
+        'weight_trend': ewma(data['weight'], WEIGHT_TREND_SPAN),
+    }
+    series = {name: to_pairs(ts, values, points)
+              for name, values in [*((m, data[m]) for m in HEALTH_METRICS), *derived.items()]}
+    slope = trend_slope(ts, data['weight'])  # lbs per millisecond
+    return {"start": start, "end": end, "bucket": bucket, "points": points, "rows": len(ts),
+            "series": series,
+            "weight_change_per_week": None if math.isnan(slope) else round(slope * WEEK_MS, 2)}
+
+
+@health_bp.route('/api/health/series')
+@conditional("health_log")
+def api_health_series():
+    """Chart data for the health dashboard.
+
+    ?start=/?end= bound the dates, ?points= is the target number of points per
+    series. ?bucket=day|week|month returns SQL averages per period; otherwise
+    the raw readings are downsampled with LTTB. Each series is a list of
+    [epoch_ms, value] pairs. The *_avg and *_sd series are BP moving averages
+    and standard deviations over BP_WINDOW points, weight_trend is an
+    exponential trend, and weight_change_per_week is the least-squares slope.
+    """
+    bounds = date_bounds()
+    points = max(3, min(request.args.get('points', DEFAULT_SERIES_POINTS, type=int), MAX_SERIES_POINTS))
+    bucket = request.args.get('bucket') or 'raw'
+    if bucket != 'raw' and bucket not in SERIES_BUCKETS:
+        abort(400, "bucket must be raw, day, week or month")
+
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    records = conn.execute("SELECT date, systolic, diastolic, bpm, weight, bmi FROM health_log ORDER BY date").fetchall()
+    data = health_series(conn, bounds['start'], bounds['end'], bucket, points)
     conn.close()
+    return jsonify(data)
+
+
+HEALTH_INSERT_SQL = """
+    INSERT INTO health_log (date, time, systolic, diastolic, bpm, weight, bmi)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
 
-    dates = [r['date'] for r in records]
-    systolic = [r['systolic'] for r in records]
-    diastolic = [r['diastolic'] for r in records]
-    bpm = [r['bpm'] for r in records]
-    weight = [r['weight'] for r in records]
-    bmi = [r['bmi'] for r in records]
+def _health_import_row(row):
+    """Positional CSV row (Date, Time, Systolic, Diastolic, BPM, Weight) -> HEALTH_INSERT_SQL parameters."""
+    if not row:
+        return None  # blank line
+    if len(row) < 6:
+        raise ValueError(f"expected 6 columns, got {len(row)}")
+    date_str, time_str, systolic, diastolic, bpm, weight = row[:6]
 
-    return render_template(
-        'health_dashboard.html',
-        dates=dates,
-        systolic=systolic,
-        diastolic=diastolic,
-        bpm=bpm,
-        weight=weight,
-        bmi=bmi
-    )
+    weight = to_float(weight)
+    bmi = None
+    if weight:
+        bmi = round(weight * 703 / (65 * 65), 1)  # 5'5" = 65 inches
+
+    return (to_date(date_str), to_time(time_str), to_int(systolic), to_int(diastolic),
+            to_int(bpm), weight, bmi)
+
+
+def import_health_job(job, path):
+    """Background job: import a saved CSV upload."""
+    reader = csv.reader(job.open_upload(path))
+    # Optionally skip header if first cell contains "Date"
+    first_row = next(reader, None)
+    first_line = 2
+    if first_row and "date" not in first_row[0].lower():
+        reader = itertools.chain([first_row], reader)
+        first_line = 1
+
+    conn = get_connection()
+    try:
+        summary = bulk_import(conn, reader, _health_import_row, HEALTH_INSERT_SQL, first_line=first_line,
+                              progress=job.progress)
+    finally:
+        conn.close()
+    return summary.to_dict()
 
 
 @health_bp.route('/health/import', methods=['GET', 'POST'])
@@ -117,79 +236,23 @@ def health_import():
         if not file or file.filename == '':
             return "No file selected", 400
 
-        conn = get_connection()
-        cur = conn.cursor()
-
-        stream = StringIO(file.stream.read().decode('utf-8'))
-        reader = csv.reader(stream)
-        
-        # Optionally skip header if first cell contains "Date"
-        first_row = next(reader)
-        if "date" not in first_row[0].lower():
-            stream.seek(0)
-            reader = csv.reader(stream)
-        
-        for row in reader:
-            if not row or len(row) < 6:
-                continue
-            date_str, time_str, systolic, diastolic, bpm, weight = [c.strip() for c in row]
-            
-            # Normalize date (MM/DD/YYYY → YYYY-MM-DD)
-            try:
-                date = datetime.strptime(date_str, "%m/%d/%Y").strftime("%Y-%m-%d")
-            except ValueError:
-                date = date_str  # if already in correct format
-
-            weight = float(weight) if weight else None
-            systolic = int(systolic) if systolic else None
-            diastolic = int(diastolic) if diastolic else None
-            bpm = int(bpm) if bpm else None
-
-            bmi = None
-            if weight:
-                bmi = round(weight * 703 / (65 * 65), 1)  # 5'5" = 65 inches
-
-            cur.execute("""
-                INSERT INTO health_log (date, time, systolic, diastolic, bpm, weight, bmi)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (date, time_str, systolic, diastolic, bpm, weight, bmi))
-        
-        conn.commit()
-        conn.close()
-
-        return redirect(url_for('health_bp.health_list'))
-
+        path = save_upload(file)
+        job_id = submit("health-import", import_health_job, path, description=file.filename, upload=path)
+        return job_started(job_id)
 
     return render_template('health_import.html')
 
 
 @health_bp.route('/health/export')
+@conditional("health_log")
 def health_export():
     conn = get_connection()
-    records = conn.execute("""
+    cur = conn.execute("""
         SELECT date, time, systolic, diastolic, bpm, weight, bmi
         FROM health_log
         ORDER BY date
-    """).fetchall()
-    conn.close()
+    """)
+    headers = ["Date", "Time", "Systolic", "Diastolic", "BPM", "Weight (lbs)", "BMI"]
+    return csv_response(iter_csv(cur, headers), 'health_log.csv')
 
-    # Build CSV content
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Date", "Time", "Systolic", "Diastolic", "BPM", "Weight (lbs)", "BMI"])
-
-    for r in records:
-        writer.writerow([
-            r["date"],
-            r["time"],
-            r["systolic"],
-            r["diastolic"],
-            r["bpm"],
-            r["weight"],
-            r["bmi"]
-        ])
-
-    response = Response(output.getvalue(), mimetype="text/csv")
-    response.headers["Content-Disposition"] = "attachment; filename=health_log.csv"
-    return response
 
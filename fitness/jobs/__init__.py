@@ -0,0 +1,13 @@
+# fitness/jobs/__init__.py
+
+from flask import Blueprint
+
+# Define the blueprint
+jobs_bp = Blueprint(
+    'jobs_bp',
+    __name__,
+    template_folder='templates'
+)
+
+# Import routes after blueprint creation
+from fitness.jobs.routes import job_routes
@@ -0,0 +1,76 @@
+# fitness/jobs/routes/job_routes.py
+from flask import render_template, redirect, url_for, flash, jsonify, abort
+from fitness.db.db import get_connection
+from fitness.jobs import jobs_bp
+from fitness.jobs.runner import get_job, list_jobs, request_cancel, submit, job_started
+from fitness.cardio.rollup import rebuild_rollup
+from fitness.food.rollup import rebuild_rollup as rebuild_food_rollup
+from fitness.food.items import rebuild_items
+from fitness.strength.analytics import rebuild_analytics
+from fitness.search.index import rebuild_search_index
+
+
+def _rebuild_job(rebuild):
+    def run(job):
+        conn = get_connection()
+        try:
+            job.progress(0, "rebuilding", force=True)
+            return {"rows": rebuild(conn)}
+        finally:
+            conn.close()
+    return run
+
+
+# name -> (description, job function)
+REBUILDS = {
+    "cardio-rollup": ("Rebuild cardio weekly rollup", _rebuild_job(rebuild_rollup)),
+    "food-rollup": ("Rebuild food daily rollup", _rebuild_job(rebuild_food_rollup)),
+    "food-items": ("Rebuild food item suggestions", _rebuild_job(rebuild_items)),
+    "strength-analytics": ("Rebuild strength analytics", _rebuild_job(rebuild_analytics)),
+    "search-index": ("Rebuild search index", _rebuild_job(rebuild_search_index)),
+}
+
+
+# -------------------------
+# Pages
+# -------------------------
+@jobs_bp.route('/')
+def jobs_list():
+    return render_template('jobs_list.html', jobs=list_jobs(), rebuilds=REBUILDS)
+
+@jobs_bp.route('/<job_id>')
+def job_view(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404)
+    return render_template('job_view.html', job=job)
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if request_cancel(job_id):
+        flash("Cancellation requested.", "warning")
+    else:
+        flash("Job has already finished.", "info")
+    return redirect(url_for('jobs_bp.job_view', job_id=job_id))
+
+@jobs_bp.route('/rebuild/<name>', methods=['POST'])
+def rebuild(name):
+    if name not in REBUILDS:
+        abort(404)
+    description, fn = REBUILDS[name]
+    return job_started(submit(name, fn, description=description), "Rebuild")
+
+
+# -------------------------
+# API (status polling)
+# -------------------------
+@jobs_bp.route('/api')
+def api_jobs():
+    return jsonify(list_jobs())
+
+@jobs_bp.route('/api/<job_id>')
+def api_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
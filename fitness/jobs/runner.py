@@ -0,0 +1,250 @@
+# fitness/jobs/runner.py
+"""Background jobs for long imports and rebuilds, without any external broker.
+
+Each worker process runs jobs on a small thread pool. Job state lives in a
+`jobs` table in its own SQLite file (jobs.db next to fitness.db), not in
+fitness.db. An import holds fitness.db's write lock for its whole
+transaction, and progress updates from the job still have to go through
+and be visible to every worker. Any worker can therefore answer status
+requests, and cancellation is a flag that the job checks whenever it
+reports progress.
+"""
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from flask import flash, jsonify, redirect, request, url_for
+
+from fitness.db.db import DB_PATH
+
+log = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.environ.get("FITNESS_JOBS_DB_PATH",
+                              os.path.join(os.path.dirname(DB_PATH), "jobs.db"))
+# job threads per worker process
+JOB_WORKERS = int(os.environ.get("FITNESS_JOB_WORKERS", 2))
+# where uploads wait for their job
+UPLOAD_DIR = os.environ.get("FITNESS_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "fitness-uploads"))
+# seconds between progress writes (and cancellation checks)
+PROGRESS_INTERVAL = 0.5
+
+JOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',   -- queued, running, succeeded, failed, cancelled
+        progress INTEGER NOT NULL DEFAULT 0,     -- rows processed
+        percent REAL,
+        message TEXT,
+        result TEXT,                             -- JSON
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        pid INTEGER,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+        started_at TEXT,
+        finished_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+"""
+ACTIVE = ("queued", "running")
+NOW = "strftime('%Y-%m-%dT%H:%M:%SZ', 'now')"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+
+_schema_ready = set()
+
+
+def _jobs_db():
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=5, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if JOBS_DB_PATH not in _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(JOBS_SCHEMA)
+        _schema_ready.add(JOBS_DB_PATH)
+    return closing(conn)
+
+
+class Job:
+    """Handle passed to a job function for progress reporting and cancellation."""
+
+    def __init__(self, id):
+        self.id = id
+        self.done = 0
+        self._reported = 0.0
+        self._raw = None
+        self._size = None
+
+    def open_upload(self, path, encoding="utf-8-sig"):
+        """Open a saved upload as text, decoded line by line; progress percentages
+        follow the bytes read. utf-8-sig drops the BOM spreadsheet programs like to prepend."""
+        self._raw = open(path, "rb")
+        self._size = os.path.getsize(path) or None
+        return io.TextIOWrapper(self._raw, encoding=encoding, newline="")
+
+    def progress(self, done, message=None, force=False):
+        """Record `done` rows processed; raises JobCancelled if cancellation was requested.
+
+        Writes are throttled to one per PROGRESS_INTERVAL unless force is set.
+        """
+        self.done = done
+        now = time.monotonic()
+        if not force and now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        percent = None
+        if self._raw is not None and self._size and not self._raw.closed:
+            percent = round(min(self._raw.tell() / self._size, 1.0) * 100, 1)
+        with _jobs_db() as db:
+            db.execute("UPDATE jobs SET progress = ?, percent = IFNULL(?, percent), message = IFNULL(?, message) "
+                       "WHERE id = ?", (done, percent, message, self.id))
+            cancel = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.id,)).fetchone()[0]
+        if cancel:
+            raise JobCancelled()
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.close()
+
+
+# ---------------------------
+# Executor
+# ---------------------------
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """This process's thread pool, recreated after a fork (gunicorn workers)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="fitness-job")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def submit(kind, fn, *args, description=None, upload=None):
+    """Queue fn(job, *args) and return the job id.
+
+    fn's return value (JSON-serializable) is stored as the job's result. An
+    `upload` path is deleted once the job ends, however it ends.
+    """
+    job_id = uuid.uuid4().hex
+    with _jobs_db() as db:
+        db.execute("INSERT INTO jobs (id, kind, description, pid) VALUES (?, ?, ?, ?)",
+                   (job_id, kind, description, os.getpid()))
+    _get_executor().submit(_run, job_id, fn, args, upload)
+    return job_id
+
+
+def _run(job_id, fn, args, upload):
+    job = Job(job_id)
+    try:
+        with _jobs_db() as db:
+            started = db.execute(f"UPDATE jobs SET status = 'running', started_at = {NOW}, pid = ? "
+                                 "WHERE id = ? AND status = 'queued' AND NOT cancel_requested",
+                                 (os.getpid(), job_id)).rowcount
+        if not started:
+            _finish(job_id, "cancelled", "cancelled before it started")
+            return
+        result = fn(job, *args)
+        _finish(job_id, "succeeded", None, result, job.done)
+    except JobCancelled:
+        _finish(job_id, "cancelled", "cancelled; its changes were rolled back")
+    except Exception as e:
+        log.error("job %s failed:\n%s", job_id, traceback.format_exc())
+        _finish(job_id, "failed", str(e) or e.__class__.__name__)
+    finally:
+        job.close()
+        if upload:
+            try:
+                os.remove(upload)
+            except OSError:
+                pass
+
+
+def _finish(job_id, status, message, result=None, done=None):
+    with _jobs_db() as db:
+        db.execute(f"UPDATE jobs SET status = ?, message = IFNULL(?, message), result = ?, "
+                   f"progress = IFNULL(?, progress), "
+                   f"percent = CASE WHEN ? = 'succeeded' THEN 100 ELSE percent END, finished_at = {NOW} "
+                   "WHERE id = ?",
+                   (status, message, json.dumps(result) if result is not None else None, done, status, job_id))
+
+
+# ---------------------------
+# Queries / control
+# ---------------------------
+def _job_dict(row):
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def get_job(job_id):
+    with _jobs_db() as db:
+        row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_dict(row) if row else None
+
+
+def list_jobs(limit=50):
+    with _jobs_db() as db:
+        rows = db.execute("SELECT * FROM jobs ORDER BY created_at DESC, rowid DESC LIMIT ?", (limit,)).fetchall()
+    return [_job_dict(r) for r in rows]
+
+
+def request_cancel(job_id):
+    """Flag a queued or running job for cancellation; False if it already ended."""
+    with _jobs_db() as db:
+        return db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)",
+                          (job_id, *ACTIVE)).rowcount > 0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError):
+        return True
+    return True
+
+
+def recover_jobs():
+    """Fail jobs left queued/running by a process that no longer exists."""
+    with _jobs_db() as db:
+        for row in db.execute("SELECT id, pid FROM jobs WHERE status IN (?, ?)", ACTIVE).fetchall():
+            if not _pid_alive(row["pid"]):
+                db.execute(f"UPDATE jobs SET status = 'failed', message = 'interrupted: worker exited', "
+                           f"finished_at = {NOW} WHERE id = ?", (row["id"],))
+
+
+def save_upload(file):
+    """Save an uploaded file for a job and return its path."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.upload")
+    file.save(path)
+    return path
+
+
+def job_started(job_id, what="Import"):
+    """Response for a request that queued a job: 202 + JSON for API clients,
+    otherwise a redirect to the job's progress page."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job_id, "status_url": url_for("jobs_bp.api_job", job_id=job_id)}), 202
+    flash(f"{what} started in the background.", "info")
+    return redirect(url_for("jobs_bp.job_view", job_id=job_id))
@@ -0,0 +1,15 @@
+# fitness/search/__init__.py
+
+from flask import Blueprint
+
+# Define the blueprint
+search_bp = Blueprint(
+    'search_bp',
+    __name__,
+    template_folder='templates',
+    cli_group='search'
+)
+
+# Import routes after blueprint creation
+from fitness.search.routes import search_routes
+from fitness.search import index
@@ -0,0 +1,112 @@
+# fitness/search/index.py
+"""Full-text search over the logs (search_index, an FTS5 table).
+
+The index is maintained by triggers on cardio_workouts, food_log, workouts
+and health_log (migration 0010). rowid = source id * 4 + kind, so a hit maps
+straight back to its row. This module runs ranked searches and can rebuild
+the index from the base tables:
+
+    flask search rebuild-index
+"""
+import re
+
+import click
+from markupsafe import Markup, escape
+
+from fitness.db.cache import bump_versions
+from fitness.db.db import get_connection
+from fitness.search import search_bp
+
+# rowid % 4 -> kind
+KINDS = ("cardio", "food", "strength", "health")
+
+HEALTH_BODY_SQL = ("trim(IFNULL('bp ' || systolic || '/' || diastolic, '') || IFNULL(' pulse ' || bpm, '') || "
+                   "IFNULL(' weight ' || weight, '') || IFNULL(' bmi ' || bmi, ''))")
+INDEX_SOURCES = (
+    "SELECT cw.id * 4, cw.date, at.name, cw.notes "
+    "FROM cardio_workouts cw LEFT JOIN activity_types at ON at.id = cw.activity_type_id",
+    "SELECT id * 4 + 1, date, food_item, notes FROM food_log",
+    "SELECT id * 4 + 2, date, body_part, notes FROM workouts",
+    f"SELECT id * 4 + 3, date, 'health', {HEALTH_BODY_SQL} FROM health_log",
+)
+
+# snippet()/highlight() markers; swapped for <mark> after the text is escaped
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+SNIPPET_TOKENS = 12
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one
+    as a prefix (so results appear while typing). Words are quoted, so FTS5
+    operators and punctuation in the input are never a syntax error."""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words) + "*"
+
+
+def _marked(text):
+    if text is None:
+        return Markup("")
+    return Markup(str(escape(text)).replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>"))
+
+
+def search(conn, text, kinds=None, limit=50, offset=0):
+    """Best matches first. Returns (items, has_more); title and snippet are
+    HTML-escaped Markup with matches wrapped in <mark>."""
+    query = fts_query(text)
+    if query is None:
+        return [], False
+    sql = f"""
+        SELECT rowid, date,
+               highlight(search_index, 1, '{MARK_OPEN}', '{MARK_CLOSE}') AS title,
+               snippet(search_index, 2, '{MARK_OPEN}', '{MARK_CLOSE}', '…', {SNIPPET_TOKENS}) AS snippet
+        FROM search_index
+        WHERE search_index MATCH ?
+    """
+    params = [query]
+    if kinds:
+        sql += f" AND rowid % 4 IN ({', '.join('?' * len(kinds))})"
+        params.extend(KINDS.index(k) for k in kinds)
+    sql += " ORDER BY rank LIMIT ? OFFSET ?"
+    rows = conn.execute(sql, (*params, limit + 1, offset)).fetchall()
+    items = [{
+        "kind": KINDS[r["rowid"] % 4],
+        "id": r["rowid"] // 4,
+        "date": r["date"],
+        "title": _marked(r["title"]),
+        "snippet": _marked(r["snippet"]),
+    } for r in rows[:limit]]
+    return items, len(rows) > limit
+
+
+def rebuild_search_index(conn):
+    """Re-index every row from the base tables; returns the number of rows indexed.
+
+    Bumps the indexed tables' versions, which the search pages' ETags are built from.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM search_index")
+        total = 0
+        for select in INDEX_SOURCES:
+            total += conn.execute(f"INSERT INTO search_index (rowid, date, title, body) {select}").rowcount
+        conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+        bump_versions(conn, "cardio_workouts", "food_log", "workouts", "health_log")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return total
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+@search_bp.cli.command("rebuild-index")
+def rebuild_index_command():
+    """Recompute search_index from the log tables."""
+    conn = get_connection()
+    rows = rebuild_search_index(conn)
+    conn.close()
+    click.echo(f"rebuilt search_index: {rows} rows")
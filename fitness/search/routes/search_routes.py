@@ -0,0 +1,47 @@
+# fitness/search/routes/search_routes.py
+from flask import render_template, request, url_for, jsonify
+from fitness.db.db import get_connection
+from fitness.utils.pagination import page_size
+from fitness.utils.conditional import conditional
+from fitness.search import search_bp
+from fitness.search.index import KINDS, search
+
+# where a hit of each kind links to
+KIND_ENDPOINTS = {
+    "cardio": "cardio_bp.edit_cardio",
+    "food": "food_bp.edit_food",
+    "strength": "strength_bp.strength_view",
+    "health": "health_bp.health_edit",
+}
+SEARCH_TABLES = ("cardio_workouts", "food_log", "workouts", "health_log", "activity_types")
+
+
+def _run_search():
+    """Search for ?q= restricted to ?kind= (repeatable), one ?page= (1-based) of ?limit= hits."""
+    text = request.args.get('q', '').strip()
+    kinds = [k for k in request.args.getlist('kind') if k in KINDS]
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = page_size()
+    conn = get_connection()
+    items, has_more = search(conn, text, kinds, limit, (page - 1) * limit)
+    conn.close()
+    for item in items:
+        item['url'] = url_for(KIND_ENDPOINTS[item['kind']], id=item['id'])
+    return text, kinds, page, limit, items, has_more
+
+
+@search_bp.route('/')
+@conditional(*SEARCH_TABLES)
+def search_page():
+    text, kinds, page, limit, items, has_more = _run_search()
+    return render_template('search.html', q=text, kinds=kinds, all_kinds=KINDS, page=page,
+                           items=items, has_more=has_more)
+
+@search_bp.route('/api')
+@conditional(*SEARCH_TABLES)
+def api_search():
+    """Ranked hits; title and snippet are HTML with matches wrapped in <mark>."""
+    text, kinds, page, limit, items, has_more = _run_search()
+    for item in items:
+        item['title'], item['snippet'] = str(item['title']), str(item['snippet'])
+    return jsonify({"q": text, "page": page, "limit": limit, "has_more": has_more, "items": items})
@@ -7,8 +7,10 @@ strength_bp = Blueprint(
     'strength_bp',
     __name__,
     template_folder='templates',
-    static_folder='static'
+    static_folder='static',
+    cli_group='strength'
 )
 
 # Import routes after blueprint creation
 from fitness.strength.routes import strength_routes
+from fitness.strength import analytics
@@ -0,0 +1,135 @@
+# fitness/strength/analytics.py
+"""Per-exercise daily analytics (strength_exercise_daily).
+
+Every write that changes sets calls refresh_workouts() inside its
+transaction with the affected workout ids. The (exercise_type_id, date) keys
+those workouts cover, before and after the change, are recomputed from the
+base tables, so the dashboard API is a single primary-key range read.
+
+    flask strength rebuild-analytics
+"""
+import json
+
+import click
+import numpy as np
+
+from fitness.db.cache import bump_versions
+from fitness.db.db import get_connection
+from fitness.strength import strength_bp
+from fitness.utils.charts import ewma, load_columns, memoized, to_list
+
+ONE_RM_TREND_SPAN = 5  # sessions
+
+# Aggregate per (exercise_type_id, date); {where} narrows the joined rows.
+DAILY_AGGREGATE_SQL = """
+    WITH ranked AS (
+        SELECT e.exercise_type_id, w.date, s.reps, s.weight,
+               ROW_NUMBER() OVER (PARTITION BY e.exercise_type_id, w.date
+                                  ORDER BY s.weight DESC, s.reps DESC) AS rank
+        FROM workouts w
+        JOIN exercises e ON e.workout_id = w.id
+        JOIN sets s ON s.exercise_id = e.id
+        {where}
+    )
+    SELECT exercise_type_id, date,
+           IFNULL(SUM(weight * reps), 0),
+           MAX(CASE WHEN rank = 1 THEN weight END),
+           MAX(CASE WHEN rank = 1 THEN reps END),
+           IFNULL(SUM(reps), 0),
+           COUNT(*),
+           MAX(CASE WHEN reps = 1 THEN weight ELSE weight * (1 + reps / 30.0) END)
+    FROM ranked
+    GROUP BY exercise_type_id, date
+"""
+INSERT_DAILY = """
+    INSERT INTO strength_exercise_daily
+        (exercise_type_id, date, total_volume, top_weight, top_reps, total_reps, set_count, est_1rm)
+"""
+# keys are passed as a JSON array of [exercise_type_id, date] pairs
+KEYS_JSON = "SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)"
+
+
+def workout_keys(conn, workout_ids):
+    """The (exercise_type_id, date) keys covered by the given workouts."""
+    return {(type_id, date) for type_id, date in conn.execute("""
+        SELECT DISTINCT e.exercise_type_id, w.date
+        FROM workouts w JOIN exercises e ON e.workout_id = w.id
+        WHERE w.id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(workout_ids)),))}
+
+
+def refresh_keys(conn, keys):
+    """Recompute the analytics rows for the given (exercise_type_id, date) keys."""
+    if not keys:
+        return
+    keys_json = json.dumps(sorted(keys))
+    conn.execute(f"DELETE FROM strength_exercise_daily WHERE (exercise_type_id, date) IN ({KEYS_JSON})",
+                 (keys_json,))
+    where = (f"WHERE w.date IN (SELECT json_extract(value, '$[1]') FROM json_each(?1)) "
+             f"AND (e.exercise_type_id, w.date) IN ({KEYS_JSON.replace('?', '?1')})")
+    conn.execute(INSERT_DAILY + DAILY_AGGREGATE_SQL.format(where=where), (keys_json,))
+
+
+def refresh_workouts(conn, workout_ids, old_keys=()):
+    """Refresh the keys the workouts cover now plus `old_keys` (what they covered
+    before an edit or delete, from workout_keys()). Call inside the write transaction."""
+    refresh_keys(conn, workout_keys(conn, workout_ids) | set(old_keys))
+
+
+def rebuild_analytics(conn):
+    """Recompute the whole table; returns the number of rows written.
+
+    Bumps the source tables' versions so memoized series and ETags built from
+    the old rows are dropped.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM strength_exercise_daily")
+        cur = conn.execute(INSERT_DAILY + DAILY_AGGREGATE_SQL.format(where=""))
+        bump_versions(conn, "workouts", "exercises", "sets")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+
+@memoized("workouts", "exercises", "sets")
+def exercise_series(conn, exercise_type_id, start=None, end=None):
+    """Chart series for one exercise type, oldest first, optionally bounded by
+    date (inclusive); est_1rm_trend is an exponential trend of the daily 1RM."""
+    sql = """
+        SELECT date, total_volume, top_weight, top_reps, total_reps, est_1rm
+        FROM strength_exercise_daily WHERE exercise_type_id = ?
+    """
+    params = [exercise_type_id]
+    if start:
+        sql += " AND date >= ?"
+        params.append(start)
+    if end:
+        sql += " AND date <= ?"
+        params.append(end)
+    data = load_columns(conn, sql + " ORDER BY date", params)
+    top_weights = data["top_weight"][~np.isnan(data["top_weight"])]
+    return {
+        "dates": data["date"].tolist(),
+        "volumes": to_list(data["total_volume"], 1),
+        "top_weights": to_list(data["top_weight"], 1),
+        "top_reps": to_list(data["top_reps"], 0),
+        "total_reps": to_list(data["total_reps"], 0),
+        "est_1rm": to_list(data["est_1rm"], 1),
+        "est_1rm_trend": to_list(ewma(data["est_1rm"], ONE_RM_TREND_SPAN), 1),
+        "pr": float(top_weights.max()) if len(top_weights) else 0,
+    }
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+@strength_bp.cli.command("rebuild-analytics")
+def rebuild_analytics_command():
+    """Recompute strength_exercise_daily from workouts/exercises/sets."""
+    conn = get_connection()
+    rows = rebuild_analytics(conn)
+    conn.close()
+    click.echo(f"rebuilt strength_exercise_daily: {rows} rows")
@@ -0,0 +1,129 @@
+# fitness/strength/importer.py
+"""Bulk loader for set-level strength history (the export_strength layout).
+
+Rows are grouped in memory into workout -> exercise -> sets trees, existing
+workouts/exercises are resolved with one query each, and every level is
+written with insert_many() (one statement per chunk), so the number of
+statements no longer grows with the number of rows.
+"""
+import json
+
+from fitness.db.cache import bump_versions
+from fitness.strength.analytics import refresh_workouts
+from fitness.utils.export_import import (ImportSummary, allocate_ids, insert_many, to_date, to_float, to_int,
+                                         to_text, IMPORT_CHUNK_SIZE)
+
+
+def _workout_key(date, body_part, notes):
+    # '' and NULL are the same "empty" for matching, as the forms store '';
+    # new rows get NULL (see load_workouts)
+    return (date, body_part or '', notes or '')
+
+
+def group_rows(rows, summary, first_line=2, progress=None):
+    """Parse rows into {workout_key: {exercise_name: [set params]}}, rejecting bad rows.
+
+    progress(rows_read), if given, is called every IMPORT_CHUNK_SIZE rows.
+    """
+    workouts = {}
+    for line, row in enumerate(rows, start=first_line):
+        if progress is not None and (line - first_line) % IMPORT_CHUNK_SIZE == 0:
+            progress(line - first_line)
+        try:
+            key = _workout_key(to_date(row['date']), to_text(row.get('body_part')), to_text(row.get('notes')))
+            exercise_name = to_text(row['exercise_name'])
+            if exercise_name is None:
+                raise ValueError("exercise_name is required")
+            set_params = (to_int(row.get('set_number')), to_int(row.get('reps')),
+                          to_float(row.get('weight')), to_int(row.get('rest_seconds')))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            summary.reject(line, e)
+            continue
+        workouts.setdefault(key, {}).setdefault(exercise_name, []).append(set_params)
+    if progress is not None:
+        progress(_rows_read(workouts, summary))
+    return workouts
+
+
+def _rows_read(workouts, summary):
+    return summary.rejected + sum(len(sets) for exercises in workouts.values() for sets in exercises.values())
+
+
+def load_workouts(conn, workouts, summary, progress=None):
+    """Write grouped workouts, reusing existing workouts/exercises with the same keys.
+
+    progress(rows_read), if given, is called after every chunk of sets is
+    written; all rows have been read by then, so it reports the same count
+    each time and is only there to let a job be cancelled mid-write.
+
+    Returns the ids of every workout that received sets.
+    """
+    if not workouts:
+        return []
+
+    dates = sorted({key[0] for key in workouts})
+    workout_ids = {}
+    for id, date, body_part, notes in conn.execute(
+            "SELECT id, date, body_part, notes FROM workouts "
+            "WHERE date IN (SELECT value FROM json_each(?)) ORDER BY id", (json.dumps(dates),)):
+        workout_ids.setdefault(_workout_key(date, body_part, notes), id)
+
+    new_workouts = [key for key in workouts if key not in workout_ids]
+    for key, id in zip(new_workouts, allocate_ids(conn, "workouts", len(new_workouts))):
+        workout_ids[key] = id
+    insert_many(conn, "INSERT INTO workouts (id, date, body_part, notes) VALUES (?, ?, ?, ?)",
+                [(workout_ids[key], key[0], key[1] or None, key[2] or None) for key in new_workouts])
+
+    touched = [workout_ids[key] for key in workouts]
+    exercise_ids = {}
+    for id, workout_id, name in conn.execute(
+            "SELECT id, workout_id, exercise_name FROM exercises "
+            "WHERE workout_id IN (SELECT value FROM json_each(?)) ORDER BY id", (json.dumps(touched),)):
+        exercise_ids.setdefault((workout_id, name), id)
+
+    new_exercises = [(workout_ids[key], name) for key, exercises in workouts.items()
+                     for name in exercises if (workout_ids[key], name) not in exercise_ids]
+    for ex_key, id in zip(new_exercises, allocate_ids(conn, "exercises", len(new_exercises))):
+        exercise_ids[ex_key] = id
+    insert_many(conn, "INSERT INTO exercises (id, workout_id, exercise_name) VALUES (?, ?, ?)",
+                [(exercise_ids[ex_key], *ex_key) for ex_key in new_exercises])
+
+    rows_read = _rows_read(workouts, summary)
+    batch = []
+    for key, exercises in workouts.items():
+        for name, sets in exercises.items():
+            exercise_id = exercise_ids[(workout_ids[key], name)]
+            batch.extend((exercise_id, *s) for s in sets)
+            if len(batch) >= IMPORT_CHUNK_SIZE:
+                _insert_sets(conn, batch, summary, progress, rows_read)
+    _insert_sets(conn, batch, summary, progress, rows_read)
+    return touched
+
+
+def _insert_sets(conn, batch, summary, progress=None, rows_read=0):
+    if batch:
+        insert_many(conn, """
+            INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
+            VALUES (?, ?, ?, ?, ?)
+        """, batch)
+        summary.accepted += len(batch)
+        batch.clear()
+        if progress is not None:
+            progress(rows_read)
+
+
+def import_strength_rows(conn, rows, first_line=2, progress=None):
+    """Import an iterable of set rows in one transaction; returns an ImportSummary."""
+    summary = ImportSummary()
+    workouts = group_rows(rows, summary, first_line, progress)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        touched = load_workouts(conn, workouts, summary, progress)
+        refresh_workouts(conn, touched)
+        if touched:
+            bump_versions(conn, "workouts", "exercises", "sets")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
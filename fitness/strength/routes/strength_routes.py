@@ -1,8 +1,19 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import render_template, request, redirect, url_for, flash, jsonify, send_file, abort
+from fitness.db.cache import bump_versions, lookup_cache
 from fitness.db.db import get_connection
+from fitness.db.writer import write
 from fitness.utils.helpers import calculate_pace
+from fitness.utils.pagination import keyset_page
+from fitness.utils.conditional import conditional
+from fitness.utils.export_import import (iter_csv, iter_ndjson, csv_response, ndjson_response,
+                                         export_query, export_filters, date_bounds)
 from fitness.strength import strength_bp
+from fitness.jobs.runner import job_started, save_upload, submit
+from fitness.strength.importer import import_strength_rows
+from fitness.strength.analytics import exercise_series, refresh_workouts, workout_keys
+from fitness.strength.workouts import load_workout_tree, load_workout_trees, parse_payload, save_workout_tree
 import csv, io
+import json
 import sqlite3
 
 
@@ -50,10 +61,13 @@ def edit_exercise_type(id):
 @strength_bp.route('/exercise_types/delete/<int:id>')
 def delete_exercise_type(id):
     conn = get_connection()
-    conn.execute("DELETE FROM exercise_types WHERE id=?", (id,))
-    conn.commit()
+    try:
+        conn.execute("DELETE FROM exercise_types WHERE id=?", (id,))
+        conn.commit()
+        flash("Exercise type deleted.", "warning")
+    except sqlite3.IntegrityError:
+        flash("Exercise type is used by existing workouts.", "danger")
     conn.close()
-    flash("Exercise type deleted.", "warning")
     return redirect(url_for('strength_bp.exercise_types'))
 
 
@@ -61,16 +75,32 @@ def delete_exercise_type(id):
 # Workouts CRUD
 # -------------------------
 @strength_bp.route('/strength')
+@conditional("workouts", "exercises", "sets")
 def strength_list():
     conn = get_connection()
-    rows = conn.execute("SELECT * FROM workouts ORDER BY date DESC, time DESC").fetchall()
+    page = keyset_page(conn, "SELECT * FROM workouts")
+    trees = load_workout_trees(conn, [w['id'] for w in page.items])
+    conn.close()
+    return render_template('strength_list.html', workouts=page.items, page=page, trees=trees)
+
+@strength_bp.route('/api/workouts')
+@conditional("workouts", "exercises", "sets")
+def api_strength_list():
+    """Workout page; ?expand=exercises nests each workout's exercises and sets."""
+    conn = get_connection()
+    page = keyset_page(conn, "SELECT * FROM workouts")
+    data = page.to_dict()
+    if request.args.get('expand') == 'exercises':
+        trees = load_workout_trees(conn, [w['id'] for w in page.items])
+        for item in data['items']:
+            item['exercises'] = trees[item['id']]['exercises']
     conn.close()
-    return render_template('strength_list.html', workouts=rows)
+    return jsonify(data)
 
 @strength_bp.route('/strength/add', methods=['GET', 'POST'])
 def strength_add():
     conn = get_connection()
-    exercise_types = conn.execute("SELECT * FROM exercise_types ORDER BY body_part, name").fetchall()
+    exercise_types = lookup_cache.rows(conn, "exercise_types")
     if request.method == 'POST':
         # top-level workout
         date = request.form['date']
@@ -78,37 +108,20 @@ def strength_add():
         body_part = request.form.get('body_part')
         notes = request.form.get('notes')
 
-        cur = conn.cursor()
-        cur.execute("INSERT INTO workouts (date, time, body_part, notes) VALUES (?, ?, ?, ?)",
-                    (date, time, body_part, notes))
-        workout_id = cur.lastrowid
+        def save(conn, exercises):
+            cur = conn.execute("INSERT INTO workouts (date, time, body_part, notes) VALUES (?, ?, ?, ?)",
+                               (date, time, body_part, notes))
+            save_workout_tree(conn, cur.lastrowid, exercises)
+            refresh_workouts(conn, [cur.lastrowid])
+            bump_versions(conn, "workouts", "exercises", "sets")
 
         # Expect exercises and sets to come as JSON string in hidden field named 'payload'
         # The client JS will build a JSON structure and post it as payload
-        import json
-        payload = request.form.get('payload')
-        if payload:
-            try:
-                data = json.loads(payload)
-                for ex in data.get('exercises', []):
-                    ex_name = ex.get('exercise_name')
-                    cur.execute("INSERT INTO exercises (workout_id, exercise_name) VALUES (?, ?)",
-                                (workout_id, ex_name))
-                    ex_id = cur.lastrowid
-                    for s in ex.get('sets', []):
-                        set_number = s.get('set_number')
-                        reps = s.get('reps') or None
-                        weight = s.get('weight') or None
-                        rest_seconds = s.get('rest') or None
-                        cur.execute("""
-                            INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (ex_id, set_number, reps, weight, rest_seconds))
-                conn.commit()
-                flash("Workout saved.", "success")
-            except Exception as e:
-                conn.rollback()
-                flash(f"Error saving workout: {e}", "danger")
+        try:
+            write(save, parse_payload(request.form.get('payload') or '{}'))
+            flash("Workout saved.", "success")
+        except Exception as e:
+            flash(f"Error saving workout: {e}", "danger")
         conn.close()
         return redirect(url_for('strength_bp.strength_list'))
 
@@ -118,28 +131,26 @@ def strength_add():
 @strength_bp.route('/strength/view/<int:id>')
 def strength_view(id):
     conn = get_connection()
-    workout = conn.execute("SELECT * FROM workouts WHERE id=?", (id,)).fetchone()
-    exercises = conn.execute("SELECT * FROM exercises WHERE workout_id=? ORDER BY id", (id,)).fetchall()
-    # For each exercise collect sets
-    ex_list = []
-    for ex in exercises:
-        sets = conn.execute("SELECT * FROM sets WHERE exercise_id=? ORDER BY set_number", (ex['id'],)).fetchall()
-        ex_list.append({'exercise': ex, 'sets': sets})
+    tree = load_workout_tree(conn, id)
     conn.close()
-    return render_template('strength_view.html', workout=workout, exercises=ex_list)
+    if tree is None:
+        abort(404)
+    return render_template('strength_view.html', workout=tree['workout'], exercises=tree['exercises'])
 
 @strength_bp.route('/strength/delete/<int:id>')
 def strength_delete(id):
-    conn = get_connection()
-    cur = conn.cursor()
-    # delete sets -> exercises -> workout
-    ex_ids = [r['id'] for r in cur.execute("SELECT id FROM exercises WHERE workout_id=?", (id,)).fetchall()]
-    for ex_id in ex_ids:
-        cur.execute("DELETE FROM sets WHERE exercise_id=?", (ex_id,))
-    cur.execute("DELETE FROM exercises WHERE workout_id=?", (id,))
-    cur.execute("DELETE FROM workouts WHERE id=?", (id,))
-    conn.commit()
-    conn.close()
+    def delete(conn):
+        old_keys = workout_keys(conn, [id])
+        # delete sets -> exercises -> workout
+        ex_ids = [r['id'] for r in conn.execute("SELECT id FROM exercises WHERE workout_id=?", (id,)).fetchall()]
+        for ex_id in ex_ids:
+            conn.execute("DELETE FROM sets WHERE exercise_id=?", (ex_id,))
+        conn.execute("DELETE FROM exercises WHERE workout_id=?", (id,))
+        conn.execute("DELETE FROM workouts WHERE id=?", (id,))
+        refresh_workouts(conn, [], old_keys)
+        bump_versions(conn, "workouts", "exercises", "sets")
+
+    write(delete)
     flash("Workout deleted.", "warning")
     return redirect(url_for('strength_bp.strength_list'))
 
@@ -147,62 +158,49 @@ def strength_delete(id):
 @strength_bp.route('/strength/edit/<int:id>', methods=['GET', 'POST'])
 def strength_edit(id):
     conn = get_connection()
-    exercise_types = conn.execute("SELECT * FROM exercise_types ORDER BY body_part, name").fetchall()
+    exercise_types = lookup_cache.rows(conn, "exercise_types")
     if request.method == 'POST':
-        # update workout details and replace exercises/sets
+        # update workout details and exercises/sets
         date = request.form['date']
         time = request.form.get('time')
         body_part = request.form.get('body_part')
         notes = request.form.get('notes')
 
-        cur = conn.cursor()
-        cur.execute("UPDATE workouts SET date=?, time=?, body_part=?, notes=? WHERE id=?",
-                    (date, time, body_part, notes, id))
+        # Diff the submitted exercises/sets against what is stored so only the
+        # rows that changed are written and unchanged sets keep their ids.
+        # Without a payload the exercises are left as they are.
+        payload = request.form.get('payload')
 
-        # delete old exercises & sets
-        ex_ids = [r['id'] for r in cur.execute("SELECT id FROM exercises WHERE workout_id=?", (id,)).fetchall()]
-        for ex_id in ex_ids:
-            cur.execute("DELETE FROM sets WHERE exercise_id=?", (ex_id,))
-        cur.execute("DELETE FROM exercises WHERE workout_id=?", (id,))
+        def update(conn, exercises):
+            old_keys = workout_keys(conn, [id])
+            cur = conn.execute("""
+                UPDATE workouts SET date=?, time=?, body_part=?, notes=?
+                WHERE id=? AND (date IS NOT ? OR time IS NOT ? OR body_part IS NOT ? OR notes IS NOT ?)
+            """, (date, time, body_part, notes, id, date, time, body_part, notes))
+            changed = cur.rowcount
+            if exercises is not None:
+                counts = save_workout_tree(conn, id, exercises)
+                changed += sum(counts.values())
+            refresh_workouts(conn, [id], old_keys)
+            if changed:
+                bump_versions(conn, "workouts", "exercises", "sets")
+            return changed
 
-        # insert new from payload
-        import json
-        payload = request.form.get('payload')
-        if payload:
-            try:
-                data = json.loads(payload)
-                for ex in data.get('exercises', []):
-                    ex_name = ex.get('exercise_name')
-                    cur.execute("INSERT INTO exercises (workout_id, exercise_name) VALUES (?, ?)",
-                                (id, ex_name))
-                    ex_id = cur.lastrowid
-                    for s in ex.get('sets', []):
-                        set_number = s.get('set_number')
-                        reps = s.get('reps') or None
-                        weight = s.get('weight') or None
-                        rest_seconds = s.get('rest') or None
-                        cur.execute("""
-                            INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (ex_id, set_number, reps, weight, rest_seconds))
-                conn.commit()
-                flash("Workout updated.", "success")
-            except Exception as e:
-                conn.rollback()
-                flash(f"Error updating workout: {e}", "danger")
+        try:
+            changed = write(update, parse_payload(payload) if payload else None)
+            flash(f"Workout updated ({changed} row{'s' if changed != 1 else ''} changed).", "success")
+        except Exception as e:
+            flash(f"Error updating workout: {e}", "danger")
         conn.close()
         return redirect(url_for('strength_bp.strength_view', id=id))
 
     # GET: load workout and nested exercises/sets to prepopulate the form
-    workout = conn.execute("SELECT * FROM workouts WHERE id=?", (id,)).fetchone()
-    exercises = conn.execute("SELECT * FROM exercises WHERE workout_id=? ORDER BY id", (id,)).fetchall()
-    ex_list = []
-    for ex in exercises:
-        sets = conn.execute("SELECT * FROM sets WHERE exercise_id=? ORDER BY set_number", (ex['id'],)).fetchall()
-        ex_list.append({'exercise': ex, 'sets': sets})
+    tree = load_workout_tree(conn, id)
     conn.close()
+    if tree is None:
+        abort(404)
     return render_template('strength_form.html', action="Edit", exercise_types=exercise_types,
-                           workout=workout, exercises=ex_list)
+                           workout=tree['workout'], exercises=tree['exercises'])
 
 
 
@@ -214,94 +212,95 @@ def strength_edit(id):
 @strength_bp.route('/strength_dashboard')
 def strength_dashboard():
     conn = get_connection()
-    exercises = conn.execute("SELECT id, exercise_name FROM exercises ORDER BY exercise_name").fetchall()
+    # one entry per exercise type that has been logged
+    exercises = conn.execute("""
+        SELECT et.id, et.name AS exercise_name FROM exercise_types et
+        WHERE EXISTS (SELECT 1 FROM exercises e WHERE e.exercise_type_id = et.id)
+        ORDER BY et.name
+    """).fetchall()
     conn.close()
     return render_template('strength_dashboard.html', exercises=exercises)
 
-@strength_bp.route('/api/strength_data/<int:exercise_id>')
-def get_strength_data(exercise_id):
+@strength_bp.route('/api/strength_data/<int:exercise_type_id>')
+@conditional("workouts", "exercises", "sets", "exercise_types")
+def get_strength_data(exercise_type_id):
+    """Daily volume, top set and estimated 1RM (with trend) for an exercise type, read
+    from strength_exercise_daily. Optional ?start=/?end= (YYYY-MM-DD) bound the dates."""
+    bounds = date_bounds()
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    # ✅ total volume (weight * reps) per workout date for given exercise
-    cur.execute("""
-        SELECT w.date, SUM(s.weight * s.reps) AS total_volume
-        FROM sets s
-        JOIN workouts w ON s.id = w.id
-        WHERE s.exercise_id = ?
-        GROUP BY w.date
-        ORDER BY w.date
-    """, (exercise_id,))
-    vol_data = cur.fetchall()
-
-    # ✅ PR (heaviest single set weight for this exercise)
-    cur.execute("""
-        SELECT MAX(weight) AS pr_weight
-        FROM sets
-        WHERE exercise_id = ?
-    """, (exercise_id,))
-    pr_data = cur.fetchone()
-
+    exercise = lookup_cache.get(conn, "exercise_types", exercise_type_id)
+    if exercise is None:
+        conn.close()
+        abort(404)
+    series = exercise_series(conn, exercise_type_id, bounds['start'], bounds['end'])
     conn.close()
 
-    return jsonify({
-        "dates": [r["date"] for r in vol_data],
-        "volumes": [r["total_volume"] for r in vol_data],
-        "pr": pr_data["pr_weight"] if pr_data and pr_data["pr_weight"] else 0
-    })
+    return jsonify({"exercise_type_id": exercise_type_id, "exercise_name": exercise['name'], **series})
 
 
 
 
 # ---------- EXPORT WORKOUTS ----------
+# One row per set. Exports accept ?fields=a,b and ?start=/?end= (YYYY-MM-DD), applied in SQL.
+STRENGTH_EXPORT_COLUMNS = {
+    "workout_id": "w.id", "date": "w.date", "body_part": "w.body_part", "notes": "w.notes",
+    "exercise_id": "e.id", "exercise_name": "e.exercise_name", "set_number": "s.set_number",
+    "reps": "s.reps", "weight": "s.weight", "rest_seconds": "s.rest_seconds",
+}
+STRENGTH_EXPORT_FROM = """workouts w
+    JOIN exercises e ON w.id = e.workout_id
+    JOIN sets s ON e.id = s.exercise_id"""
+# the CSV layout (and import format) has no exercise_id column
+STRENGTH_CSV_FIELDS = [c for c in STRENGTH_EXPORT_COLUMNS if c != "exercise_id"]
+
 @strength_bp.route('/export_strength/<string:fmt>')
+@conditional("workouts", "exercises", "sets")
 def export_strength(fmt):
+    if fmt not in ('csv', 'json', 'ndjson'):
+        return "Unsupported format", 400
+
+    filters = export_filters(STRENGTH_EXPORT_COLUMNS,
+                             default_fields=STRENGTH_CSV_FIELDS if fmt == 'csv' else None)
+    sql, params = export_query(STRENGTH_EXPORT_COLUMNS, STRENGTH_EXPORT_FROM,
+                               "w.date, w.id, e.id, s.set_number", **filters)
     conn = get_connection()
-    cur = conn.cursor()
-
-    # Join all relevant data
-    cur.execute("""
-        SELECT w.id as workout_id, w.date, w.body_part, w.notes,
-               e.id as exercise_id, e.exercise_name,
-               s.set_number, s.reps, s.weight, s.rest_seconds
-        FROM workouts w
-        JOIN exercises e ON w.id = e.workout_id
-        JOIN sets s ON e.id = s.exercise_id
-        ORDER BY w.date, w.id, e.id, s.set_number
-    """)
-    rows = cur.fetchall()
-    conn.close()
+    cur = conn.execute(sql, params)
 
     if fmt == 'csv':
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow([
-            'workout_id','date','body_part','notes',
-            'exercise_name','set_number','reps','weight','rest_seconds'
-        ])
-        for r in rows:
-            writer.writerow([
-                r['workout_id'], r['date'], r['body_part'], r['notes'],
-                r['exercise_name'], r['set_number'], r['reps'], r['weight'], r['rest_seconds']
-            ])
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name='strength_workouts.csv'
-        )
-
-    elif fmt == 'json':
-        data = [dict(r) for r in rows]
-        return jsonify(data)
+        return csv_response(iter_csv(cur), 'strength_workouts.csv')
+
+    elif fmt == 'ndjson':
+        return ndjson_response(iter_ndjson(cur))
 
     else:
-        return "Unsupported format", 400
+        data = [dict(r) for r in cur.fetchall()]
+        conn.close()
+        return jsonify(data)
 
 
 # ---------- IMPORT WORKOUTS ----------
+def import_strength_job(job, path, fmt):
+    """Background job: import a saved CSV or JSON upload."""
+    if fmt == 'csv':
+        rows = csv.DictReader(job.open_upload(path))
+        first_line = 2
+    else:
+        try:
+            rows = json.load(job.open_upload(path))
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be a list of set rows")
+        first_line = 1  # "line" is the 1-based list position for JSON
+
+    conn = get_connection()
+    try:
+        summary = import_strength_rows(conn, rows, first_line, progress=job.progress)
+    finally:
+        conn.close()
+    return summary.to_dict()
+
+
 @strength_bp.route('/import_strength', methods=['GET', 'POST'])
 def import_strength():
     if request.method == 'POST':
@@ -310,95 +309,12 @@ def import_strength():
 
         if not file:
             return "No file uploaded", 400
-
-        conn = get_connection()
-        cur = conn.cursor()
-
-        if fmt == 'csv':
-            stream = io.StringIO(file.stream.read().decode('utf-8'))
-            reader = csv.DictReader(stream)
-            for row in reader:
-                date = row['date']
-                body_part = row['body_part']
-                notes = row['notes']
-                exercise_name = row['exercise_name']
-                set_number = int(row['set_number'])
-                reps = int(row['reps'])
-                weight = float(row['weight']) if row['weight'] else None
-                rest_seconds = int(row['rest_seconds']) if row['rest_seconds'] else None
-
-                # Insert workout (if not exists)
-                cur.execute("SELECT id FROM workouts WHERE date=? AND body_part=? AND notes=?", 
-                            (date, body_part, notes))
-                w = cur.fetchone()
-                if w: workout_id = w['id']
-                else:
-                    cur.execute("INSERT INTO workouts (date, body_part, notes) VALUES (?, ?, ?)",
-                                (date, body_part, notes))
-                    workout_id = cur.lastrowid
-
-                # Insert exercise (if not exists)
-                cur.execute("SELECT id FROM exercises WHERE workout_id=? AND exercise_name=?",
-                            (workout_id, exercise_name))
-                e = cur.fetchone()
-                if e: exercise_id = e['id']
-                else:
-                    cur.execute("INSERT INTO exercises (workout_id, exercise_name) VALUES (?, ?)",
-                                (workout_id, exercise_name))
-                    exercise_id = cur.lastrowid
-
-                # Insert set
-                cur.execute("""
-                    INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (exercise_id, set_number, reps, weight, rest_seconds))
-
-            conn.commit()
-            conn.close()
-            return "CSV data imported successfully!"
-
-        elif fmt == 'json':
-            data = json.load(file)
-            for r in data:
-                date = r['date']
-                body_part = r['body_part']
-                notes = r.get('notes', '')
-                exercise_name = r['exercise_name']
-                set_number = r['set_number']
-                reps = r['reps']
-                weight = r.get('weight')
-                rest_seconds = r.get('rest_seconds')
-
-                cur.execute("SELECT id FROM workouts WHERE date=? AND body_part=? AND notes=?", 
-                            (date, body_part, notes))
-                w = cur.fetchone()
-                if w: workout_id = w['id']
-                else:
-                    cur.execute("INSERT INTO workouts (date, body_part, notes) VALUES (?, ?, ?)",
-                                (date, body_part, notes))
-                    workout_id = cur.lastrowid
-
-                cur.execute("SELECT id FROM exercises WHERE workout_id=? AND exercise_name=?",
-                            (workout_id, exercise_name))
-                e = cur.fetchone()
-                if e: exercise_id = e['id']
-                else:
-                    cur.execute("INSERT INTO exercises (workout_id, exercise_name) VALUES (?, ?)",
-                                (workout_id, exercise_name))
-                    exercise_id = cur.lastrowid
-
-                cur.execute("""
-                    INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (exercise_id, set_number, reps, weight, rest_seconds))
-
-            conn.commit()
-            conn.close()
-            return "JSON data imported successfully!"
-
-        else:
+        if fmt not in ('csv', 'json'):
             return "Unsupported format", 400
 
-    return render_template('import_strength.html')
-
+        path = save_upload(file)
+        job_id = submit("strength-import", import_strength_job, path, fmt,
+                        description=file.filename, upload=path)
+        return job_started(job_id)
 
+    return render_template('import_strength.html')
@@ -0,0 +1,158 @@
+# fitness/strength/workouts.py
+"""Load workouts together with their exercises and sets.
+
+One joined query replaces the per-exercise `SELECT * FROM sets` loop, and the
+rows are grouped in Python into the shape the strength templates expect:
+
+    {"workout": {...}, "exercises": [{"exercise": {...}, "sets": [{...}, ...]}, ...]}
+"""
+import json
+
+from fitness.utils.export_import import allocate_ids
+
+WORKOUT_TREE_SQL = """
+    SELECT w.id AS workout_id, w.date, w.time, w.body_part, w.notes,
+           e.id AS exercise_id, e.exercise_name,
+           s.id AS set_id, s.set_number, s.reps, s.weight, s.rest_seconds
+    FROM workouts w
+    LEFT JOIN exercises e ON e.workout_id = w.id
+    LEFT JOIN sets s ON s.exercise_id = e.id
+    WHERE w.id IN (SELECT value FROM json_each(?))
+    ORDER BY w.id, e.id, s.set_number, s.id
+"""
+
+
+def load_workout_trees(conn, workout_ids):
+    """Load many workouts at once; returns {workout_id: tree} (missing ids are left out)."""
+    trees = {}
+    exercises = {}
+    for r in conn.execute(WORKOUT_TREE_SQL, (json.dumps(list(workout_ids)),)):
+        tree = trees.get(r["workout_id"])
+        if tree is None:
+            tree = trees[r["workout_id"]] = {
+                "workout": {"id": r["workout_id"], "date": r["date"], "time": r["time"],
+                            "body_part": r["body_part"], "notes": r["notes"]},
+                "exercises": [],
+            }
+        if r["exercise_id"] is None:
+            continue
+        ex = exercises.get(r["exercise_id"])
+        if ex is None:
+            ex = exercises[r["exercise_id"]] = {
+                "exercise": {"id": r["exercise_id"], "workout_id": r["workout_id"],
+                             "exercise_name": r["exercise_name"]},
+                "sets": [],
+            }
+            tree["exercises"].append(ex)
+        if r["set_id"] is not None:
+            ex["sets"].append({"id": r["set_id"], "exercise_id": r["exercise_id"],
+                               "set_number": r["set_number"], "reps": r["reps"],
+                               "weight": r["weight"], "rest_seconds": r["rest_seconds"]})
+    return trees
+
+
+def load_workout_tree(conn, workout_id):
+    """Load one workout with its exercises and sets, or None if it does not exist."""
+    return load_workout_trees(conn, [workout_id]).get(workout_id)
+
+
+# ---------------------------
+# Saving (diff-based)
+# ---------------------------
+SET_FIELDS = ("set_number", "reps", "weight", "rest_seconds")
+
+
+def _opt_int(value):
+    return int(value) if value not in (None, "") else None
+
+
+def parse_payload(payload):
+    """Parse the form's hidden JSON payload into a list of exercises.
+
+    Each exercise is {"id", "exercise_name", "sets": [{"id", "set_number", "reps",
+    "weight", "rest_seconds"}]}; ids are present for rows that already exist.
+    Raises ValueError on malformed input.
+    """
+    data = json.loads(payload)
+    exercises = []
+    for ex in data.get("exercises", []):
+        name = (ex.get("exercise_name") or "").strip()
+        if not name:
+            continue
+        sets = [{
+            "id": _opt_int(s.get("id")),
+            "set_number": s.get("set_number"),
+            "reps": s.get("reps") or None,
+            "weight": s.get("weight") or None,
+            "rest_seconds": s.get("rest", s.get("rest_seconds")) or None,
+        } for s in ex.get("sets", [])]
+        exercises.append({"id": _opt_int(ex.get("id")), "exercise_name": name, "sets": sets})
+    return exercises
+
+
+def _match(stored, submitted, fallback_key):
+    """Pair submitted items with stored ones: by id first, then by fallback_key
+    among what is left. Returns (pairs, unmatched_submitted, unmatched_stored)."""
+    remaining = {item["id"]: item for item in stored}
+    pairs, unmatched = [], []
+    for item in submitted:
+        old = remaining.pop(item["id"], None) if item["id"] is not None else None
+        if old is not None:
+            pairs.append((old, item))
+        else:
+            unmatched.append(item)
+    new = []
+    for item in unmatched:
+        old = next((o for o in remaining.values() if fallback_key(o) == fallback_key(item)), None)
+        if old is not None:
+            del remaining[old["id"]]
+            pairs.append((old, item))
+        else:
+            new.append(item)
+    return pairs, new, list(remaining.values())
+
+
+def save_workout_tree(conn, workout_id, exercises):
+    """Make a workout's stored exercises and sets match `exercises` (see parse_payload).
+
+    Only rows that actually differ are written, as batched executemany()
+    statements, so unchanged exercises and sets keep their ids. The caller
+    owns the transaction. Returns counts of inserted/updated/deleted rows.
+    """
+    tree = load_workout_tree(conn, workout_id)
+    stored = [dict(ex["exercise"], sets=ex["sets"]) for ex in tree["exercises"]] if tree else []
+
+    ex_pairs, new_exercises, gone_exercises = _match(stored, exercises, lambda e: e["exercise_name"])
+
+    set_updates, set_inserts, set_deletes, ex_renames = [], [], [], []
+    for old, ex in ex_pairs:
+        if old["exercise_name"] != ex["exercise_name"]:
+            ex_renames.append((ex["exercise_name"], old["id"]))
+        pairs, new_sets, gone_sets = _match(old["sets"], ex["sets"], lambda s: s["set_number"])
+        for old_set, s in pairs:
+            if any(old_set[f] != s[f] for f in SET_FIELDS):
+                set_updates.append((*(s[f] for f in SET_FIELDS), old_set["id"]))
+        set_inserts.extend((old["id"], *(s[f] for f in SET_FIELDS)) for s in new_sets)
+        set_deletes.extend((s["id"],) for s in gone_sets)
+
+    ex_inserts = []
+    for ex, ex_id in zip(new_exercises, allocate_ids(conn, "exercises", len(new_exercises))):
+        ex_inserts.append((ex_id, workout_id, ex["exercise_name"]))
+        set_inserts.extend((ex_id, *(s[f] for f in SET_FIELDS)) for s in ex["sets"])
+    for ex in gone_exercises:
+        set_deletes.extend((s["id"],) for s in ex["sets"])
+    ex_deletes = [(ex["id"],) for ex in gone_exercises]
+
+    conn.executemany("DELETE FROM sets WHERE id=?", set_deletes)
+    conn.executemany("DELETE FROM exercises WHERE id=?", ex_deletes)
+    conn.executemany("UPDATE exercises SET exercise_name=? WHERE id=?", ex_renames)
+    conn.executemany("UPDATE sets SET set_number=?, reps=?, weight=?, rest_seconds=? WHERE id=?", set_updates)
+    conn.executemany("INSERT INTO exercises (id, workout_id, exercise_name) VALUES (?, ?, ?)", ex_inserts)
+    conn.executemany("""
+        INSERT INTO sets (exercise_id, set_number, reps, weight, rest_seconds)
+        VALUES (?, ?, ?, ?, ?)
+    """, set_inserts)
+
+    return {"inserted": len(ex_inserts) + len(set_inserts),
+            "updated": len(ex_renames) + len(set_updates),
+            "deleted": len(ex_deletes) + len(set_deletes)}
@@ -0,0 +1,225 @@
+# fitness/utils/charts.py
+"""Vectorized chart analytics shared by the dashboards.
+
+A query's result is loaded once into column arrays (load_columns); missing
+values become NaN. The series helpers below then work on whole arrays
+instead of per-row Python loops. Results that only depend on the data can
+be memoized with @memoized(*tables). The cache key includes those tables'
+table_versions counters, so any write invalidates them in every worker.
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+
+from fitness.db.cache import table_versions
+
+
+# ---------------------------
+# Loading
+# ---------------------------
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def load_columns(conn, sql, params=()):
+    """Run a query and return {column: array}: float arrays (NaN for NULL) for
+    numeric columns, object arrays for anything else (dates, names).
+
+    A column counts as numeric when it holds at least one number, or when all
+    of its values are NULL, blank or numeric text. Anything else in it ('' from
+    a blank form field, stray text) becomes NaN.
+    """
+    cur = conn.execute(sql, params)
+    names = [d[0] for d in cur.description]
+    rows = cur.fetchall()
+    columns = zip(*rows) if rows else ([] for _ in names)
+    data = {}
+    for name, values in zip(names, columns):
+        try:
+            data[name] = np.array(values, dtype=float)
+            continue
+        except (TypeError, ValueError):
+            pass
+        floats = [_to_float(v) for v in values]
+        if (any(isinstance(v, (int, float)) for v in values)
+                or all(v is None or v == "" or not np.isnan(f) for v, f in zip(values, floats))):
+            data[name] = np.array(floats, dtype=float)
+        else:
+            data[name] = np.array(values, dtype=object)
+    return data
+
+
+# ---------------------------
+# Series
+# ---------------------------
+def rolling_mean(values, window, min_periods=1):
+    """Trailing mean over `window` points, ignoring NaN; NaN where fewer than
+    min_periods values are available."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0))
+    counts = np.cumsum(valid)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts >= min_periods, sums / counts, np.nan)
+
+
+def rolling_std(values, window, min_periods=2):
+    """Trailing population standard deviation over `window` points, ignoring NaN."""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    sums, squares, counts = np.cumsum(filled), np.cumsum(filled * filled), np.cumsum(valid)
+    for a in (sums, squares, counts):
+        a[window:] = a[window:] - a[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / counts
+        var = np.maximum(squares / counts - mean * mean, 0.0)
+        return np.where(counts >= min_periods, np.sqrt(var), np.nan)
+
+
+def ewma(values, span):
+    """Exponentially weighted moving average (alpha = 2 / (span + 1)) over the
+    non-NaN values, carried forward across gaps.
+
+    The recurrence is evaluated in closed form one block at a time, with the
+    block size chosen so that the (1 - alpha) ** -k weights stay well inside
+    float64 range. span must be at least 1.
+    """
+    if span < 1:
+        raise ValueError(f"span must be at least 1, got {span!r}")
+    out = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return out
+    x = values[valid]
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+
+    if decay == 0:
+        trend = x  # span 1: no smoothing, and decay ** -k would overflow
+    else:
+        block = max(1, int(12 * np.log(10) / -np.log(decay)))
+        trend = np.empty(len(x))
+        trend[0] = x[0]
+        prev = x[0]
+        for start in range(1, len(x), block):
+            chunk = x[start:start + block]
+            k = np.arange(len(chunk))
+            # y_k = decay^(k+1) * prev + alpha * sum_{j<=k} decay^(k-j) x_j
+            scaled = np.cumsum(chunk * decay ** -k) * decay ** k
+            trend[start:start + len(chunk)] = decay ** (k + 1) * prev + alpha * scaled
+            prev = trend[start + len(chunk) - 1]
+
+    out[valid] = trend
+    # carry the last trend value across gaps
+    idx = np.maximum.accumulate(np.where(~np.isnan(out), np.arange(len(out)), 0))
+    return np.where(np.arange(len(out)) >= valid[0], out[idx], np.nan)
+
+
+def period_over_period(values):
+    """(delta, percent change) of each value against the previous one; NaN for the first."""
+    previous = np.concatenate(([np.nan], values[:-1]))
+    delta = values - previous
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(previous != 0, delta / previous * 100.0, np.nan)
+    return delta, pct
+
+
+def ratio(numerator, denominator):
+    """numerator / denominator with NaN where the denominator is 0 or missing."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def trend_slope(x, y):
+    """Least-squares slope of y over x, ignoring NaN; NaN with fewer than two points."""
+    mask = ~(np.isnan(x) | np.isnan(y))
+    if mask.sum() < 2:
+        return float("nan")
+    return float(np.polyfit(x[mask], y[mask], 1)[0])
+
+
+# ---------------------------
+# Downsampling / output
+# ---------------------------
+def lttb(x, y, threshold):
+    """Indices of the points kept when downsampling (x, y) (sorted by x) to
+    `threshold` points with Largest-Triangle-Three-Buckets, which keeps the
+    visual shape (peaks and troughs) of the series."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(int) + 1
+    edges[-1] = n - 1
+    # mean of every bucket, used as the third vertex for the bucket before it
+    sums_x, sums_y = np.add.reduceat(x[1:n - 1], edges[:-1] - 1), np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[i + 1]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[i + 1] - ay))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def to_pairs(x, y, points=None, digits=1):
+    """[[x, y], ...] for the non-NaN values of y, downsampled with LTTB when
+    `points` is given; x is emitted as an int (epoch milliseconds)."""
+    mask = ~np.isnan(y)
+    x, y = x[mask], y[mask]
+    if points:
+        keep = lttb(x, y, points)
+        x, y = x[keep], y[keep]
+    return [list(p) for p in zip(x.astype(np.int64).tolist(), np.round(y, digits).tolist())]
+
+
+def to_list(values, digits=2):
+    """JSON/template-friendly list with None for NaN (ints when digits is 0)."""
+    cast = int if digits == 0 else float
+    return [None if np.isnan(v) else cast(v) for v in np.round(values, digits).tolist()]
+
+
+# ---------------------------
+# Memoization
+# ---------------------------
+def memoized(*tables, maxsize=32):
+    """Cache fn(conn, *args) per worker, keyed by args and the table_versions
+    counters of `tables`, so a write to any of them invalidates the result."""
+    def decorator(fn):
+        cache = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(conn, *args):
+            versions = table_versions(conn)
+            key = (args, tuple(versions.get(t, (None,))[0] for t in tables))
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    wrapper.hits += 1
+                    return cache[key]
+            result = fn(conn, *args)
+            with lock:
+                wrapper.misses += 1
+                cache[key] = result
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        wrapper.hits = wrapper.misses = 0
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+# fitness/utils/conditional.py
+"""Conditional GET for read-only views, driven by table_versions.
+
+    @cardio_bp.route("/dashboard")
+    @conditional("cardio_workouts")
+    def dashboard(): ...
+
+The ETag is a hash of the endpoint, the query string, the change counters
+of the tables the view reads and the code's build id (so a deploy that
+changes templates invalidates it). A request whose If-None-Match still
+matches gets a 304 before the view (and its queries) runs. There is no
+Last-Modified: table_versions.updated_at only has one-second resolution and
+knows nothing about deploys, so If-Modified-Since could revalidate a stale
+copy. Responses carry `Cache-Control: no-cache`, so
+browsers keep them but revalidate every time.
+"""
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from flask import make_response, request, session
+from werkzeug.http import is_resource_modified
+
+from fitness.db.cache import table_versions
+from fitness.db.db import get_connection
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@lru_cache(maxsize=None)
+def build_id():
+    """Newest mtime of the package's code and templates; the same for every worker."""
+    return max(os.path.getmtime(os.path.join(root, name))
+               for root, _, files in os.walk(PACKAGE_DIR)
+               for name in files if name.endswith((".py", ".html")))
+
+
+def _etag(tables):
+    versions = table_versions(get_connection())
+    state = [(t, versions.get(t, (None,))[0]) for t in tables]
+    key = repr((build_id(), request.endpoint, request.full_path, state)).encode()
+    return hashlib.sha1(key).hexdigest()
+
+
+def conditional(*tables):
+    """Answer GET/HEAD with 304 Not Modified while `tables` are unchanged."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages showing pending flash messages must be rendered
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                return view(*args, **kwargs)
+
+            etag = _etag(tables)
+            if not is_resource_modified(request.environ, etag=etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,314 @@
+# fitness/utils/export_import.py
+
+import csv
+import io
+import json
+import math
+from datetime import date, datetime
+from functools import lru_cache
+
+from flask import Response, abort, request
+
+from fitness.db.cache import bump_versions, written_table
+from fitness.db.db import detach_connection
+from fitness.utils.helpers import format_date, format_time
+
+# rows pulled from the cursor per fetchmany() call while streaming an export
+EXPORT_BATCH_SIZE = 500
+
+
+def export_query(columns, from_sql, order_by, fields=None, start=None, end=None):
+    """Build the SELECT for an export and return (sql, params).
+
+    columns maps each output name to its SQL expression (it must contain
+    "date"); fields projects a subset of those names and start/end bound the
+    date range inside the WHERE clause, so SQLite never reads the excluded rows.
+    """
+    select = ", ".join(f"{columns[name]} AS {name}" for name in (fields or columns))
+    where, params = [], []
+    if start:
+        where.append(f"{columns['date']} >= ?")
+        params.append(start)
+    if end:
+        where.append(f"{columns['date']} <= ?")
+        params.append(end)
+    sql = f"SELECT {select} FROM {from_sql}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return f"{sql} ORDER BY {order_by}", params
+
+
+def date_bounds():
+    """Read ?start=YYYY-MM-DD&end=YYYY-MM-DD (both optional, inclusive); 400 on bad input."""
+    bounds = {}
+    for arg in ("start", "end"):
+        value = request.args.get(arg)
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                abort(400, f"{arg} must be YYYY-MM-DD")
+        bounds[arg] = value or None
+    return bounds
+
+
+def export_filters(columns, default_fields=None):
+    """Read ?fields=a,b&start=YYYY-MM-DD&end=YYYY-MM-DD for export_query(); 400 on bad input."""
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        abort(400, f"Unknown field(s): {', '.join(unknown)}")
+    return {"fields": fields or default_fields, **date_bounds()}
+
+
+def iter_rows(cursor, batch_size=EXPORT_BATCH_SIZE):
+    """Yield rows from an executed cursor, one fetchmany() batch at a time."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_csv(cursor, headers=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield CSV text for an executed cursor, one chunk per fetchmany() batch.
+
+    Only one batch is ever held in memory, whatever the size of the result.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(headers or [desc[0] for desc in cursor.description])
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()  # header only: the query returned no rows
+
+
+def iter_ndjson(cursor, batch_size=EXPORT_BATCH_SIZE):
+    """Yield newline-delimited JSON (one object per row), one chunk per fetchmany() batch."""
+    columns = [desc[0] for desc in cursor.description]
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield "".join(dumps(dict(zip(columns, row))) + "\n" for row in rows)
+
+
+def streaming_response(chunks, mimetype, headers=None):
+    """Stream an iterable of text chunks.
+
+    No Content-Length is set, so the server sends it with chunked transfer
+    encoding. The request's pooled connection is detached and only returned
+    to the pool once the server closes the response (finished or aborted),
+    because the generator keeps reading from its cursor after the view returns.
+    """
+    conn = detach_connection()
+    response = Response(chunks, mimetype=mimetype, headers=headers)
+    if conn is not None:
+        response.call_on_close(conn.close)
+    return response
+
+
+def csv_response(chunks, filename):
+    """Stream CSV chunks as a file download."""
+    return streaming_response(chunks, "text/csv",
+                              {"Content-Disposition": f"attachment; filename={filename}"})
+
+
+def ndjson_response(chunks):
+    """Stream NDJSON chunks as application/x-ndjson."""
+    return streaming_response(chunks, "application/x-ndjson")
+
+
+# ---------------------------
+# Bulk import
+# ---------------------------
+# rows per insert statement while importing
+IMPORT_CHUNK_SIZE = 5000
+# how many rejected rows are described in the summary (the count is always exact)
+MAX_REPORTED_ERRORS = 20
+
+
+def to_text(value):
+    """Strip a CSV cell; empty becomes None."""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = str(value)
+    return value.strip() or None
+
+
+def to_int(value):
+    value = to_text(value)
+    return None if value is None else int(float(value))  # accepts "150.0"
+
+
+def to_float(value):
+    value = to_text(value)
+    if value is None:
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+
+@lru_cache(maxsize=8192)
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value).isoformat()  # fast path, already YYYY-MM-DD
+    except ValueError:
+        parsed = format_date(value)
+        try:
+            datetime.strptime(parsed, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"invalid date {value!r}") from None
+        return parsed
+
+
+@lru_cache(maxsize=8192)
+def _parse_time(value):
+    return format_time(value)
+
+
+# Dates and times repeat heavily across an import, so parsing is memoized.
+def to_date(value):
+    """Required date: MM/DD/YYYY or YYYY-MM-DD, stored as YYYY-MM-DD."""
+    value = to_text(value)
+    if value is None:
+        raise ValueError("date is required")
+    return _parse_date(value)
+
+
+def to_time(value):
+    """Optional time; '9:30 AM' is stored as '09:30'."""
+    value = to_text(value)
+    return None if value is None else _parse_time(value)
+
+
+def allocate_ids(conn, table, count):
+    """Reserve `count` consecutive ids in an AUTOINCREMENT table for explicit-id
+    inserts, so batch-insert callers know each new row's id up front.
+
+    Only safe inside the write transaction (BEGIN IMMEDIATE) doing the inserts.
+    """
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    max_id = conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()[0]
+    start = max(seq[0] if seq else 0, max_id) + 1
+    return range(start, start + count)
+
+
+@lru_cache(maxsize=32)
+def _json_insert_sql(insert_sql):
+    head, _, values = insert_sql.rpartition("VALUES")
+    columns = ", ".join(f"value ->> {i}" for i in range(values.count("?")))
+    return f"{head} SELECT {columns} FROM json_each(?)"
+
+
+def insert_many(conn, insert_sql, rows):
+    """Insert parameter tuples for an `INSERT ... VALUES (?, ...)` statement as
+    one statement: the rows are passed as a single JSON array and read back
+    with json_each().
+
+    Unlike executemany() (one statement per row) this keeps FTS5 from
+    flushing search_index after every row its triggers write, which is most of
+    the cost of a large import.
+    """
+    if rows:
+        conn.execute(_json_insert_sql(insert_sql), (json.dumps(rows),))
+
+
+class LookupMap:
+    """name -> id for a lookup table, loaded with a single query.
+
+    Unknown names are inserted on first use (inside the caller's transaction)
+    and cached, so each distinct name costs at most one statement per import.
+    """
+
+    def __init__(self, conn, table):
+        self.conn = conn
+        self.table = table
+        self.ids = {name: id for id, name in conn.execute(f"SELECT id, name FROM {table}")}
+
+    def __call__(self, name):
+        name = to_text(name)
+        if name is None:
+            raise ValueError(f"{self.table} name is required")
+        id = self.ids.get(name)
+        if id is None:
+            id = self.conn.execute(f"INSERT INTO {self.table} (name) VALUES (?)", (name,)).lastrowid
+            self.ids[name] = id
+        return id
+
+
+class ImportSummary:
+    """Counts of accepted/rejected rows plus the first few rejection reasons."""
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line}: {error}")
+
+    def to_dict(self):
+        return {"accepted": self.accepted, "rejected": self.rejected, "errors": self.errors}
+
+    def __str__(self):
+        return f"{self.accepted} rows imported, {self.rejected} rejected"
+
+
+def bulk_import(conn, rows, convert, insert_sql, first_line=2, chunk_size=IMPORT_CHUNK_SIZE,
+                progress=None):
+    """Convert rows and insert them in chunks (insert_many) in one transaction.
+
+    convert(row) returns the parameter tuple for insert_sql, None to skip the
+    row (e.g. a blank line), or raises ValueError/KeyError/TypeError to reject
+    it. first_line is the file
+    line number of the first row (2 after a CSV header) for error messages.
+    progress(rows_read), if given, is called every chunk_size rows and
+    once before the commit (a background job's Job.progress). Any other error, including one raised by
+    progress() to cancel, rolls the whole import back.
+    """
+    summary = ImportSummary()
+    batch = []
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")  # take the write lock once, up front
+    try:
+        for line, row in enumerate(rows, start=first_line):
+            if progress is not None and (line - first_line) % chunk_size == 0:
+                progress(line - first_line)
+            try:
+                params = convert(row)
+            except (ValueError, KeyError, TypeError) as e:
+                summary.reject(line, e)
+                continue
+            if params is None:
+                continue
+            batch.append(params)
+            if len(batch) >= chunk_size:
+                insert_many(conn, insert_sql, batch)
+                summary.accepted += len(batch)
+                batch.clear()
+        insert_many(conn, insert_sql, batch)
+        summary.accepted += len(batch)
+        if summary.accepted:
+            bump_versions(conn, written_table(insert_sql))
+        if progress is not None:
+            progress(summary.accepted + summary.rejected)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
+
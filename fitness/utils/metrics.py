@@ -0,0 +1,199 @@
+# fitness/utils/metrics.py
+"""Per-endpoint request and SQL metrics, exported in Prometheus text format.
+
+    init_app(app)   # before/after request hooks + GET /metrics
+
+Every request gets a QueryStats bound to its pooled connection (see
+fitness/db/db.py). The connection counts statements through sqlite3's trace
+callback and times execute/fetch/commit calls. When the request ends, its
+latency, statement count and DB time are added to this worker's histograms
+and counters. Like /db/stats, /metrics describes the worker that answered,
+so with gunicorn each worker has to be scraped (or the numbers read per pid).
+
+Streamed responses (exports) are measured up to their first byte.
+
+Set DB_DEBUG_HEADER (app config, or FITNESS_DB_DEBUG_HEADER=1), or run in
+debug mode, to add an `X-DB-Queries` header to every response, plus a
+`Server-Timing` entry that browser dev tools display:
+
+    X-DB-Queries: 42; time=12.8ms; repeated=40
+"""
+import bisect
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, request
+
+from fitness.db.cache import lookup_cache
+from fitness.db.db import QueryStats, pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}   # labels -> [per-bucket counts (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """Single value read from a callback whenever /metrics is rendered."""
+
+    type = "gauge"
+
+    def __init__(self, name, help, read):
+        self.name, self.help, self.read = name, help, read
+
+    def samples(self):
+        yield f"{self.name} {_number(self.read())}"
+
+
+REQUEST_SECONDS = Histogram("fitness_http_request_duration_seconds",
+                            "Time from the start of the request to the response, by endpoint.",
+                            ("endpoint", "method"))
+REQUESTS = Counter("fitness_http_requests_total", "Requests answered, by endpoint and status.",
+                   ("endpoint", "method", "status"))
+REQUEST_STATEMENTS = Histogram("fitness_db_statements_per_request", "SQL statements run by one request.",
+                               ("endpoint",), buckets=STATEMENT_BUCKETS)
+DB_STATEMENTS = Counter("fitness_db_statements_total", "SQL statements run, by endpoint.", ("endpoint",))
+DB_SECONDS = Counter("fitness_db_seconds_total",
+                     "Seconds spent executing, fetching and committing SQL, by endpoint.", ("endpoint",))
+
+METRICS = [REQUEST_SECONDS, REQUESTS, REQUEST_STATEMENTS, DB_STATEMENTS, DB_SECONDS]
+
+
+def register(metric):
+    """Add a Counter/Histogram/Gauge (anything with name/help/type/samples()) to /metrics."""
+    METRICS.append(metric)
+    return metric
+
+
+def _gauges():
+    """Point-in-time values from the connection pool and lookup cache."""
+    pool, cache = pool_stats(), lookup_cache.stats()
+    yield ("fitness_db_pool_connections", "gauge", "Pooled connections by state.",
+           [({"state": s}, pool[s]) for s in ("opened", "in_use", "idle")])
+    yield ("fitness_db_pool_checkouts_total", "counter", "Pool checkouts by how they were served.",
+           [({"result": r}, pool[r]) for r in ("hits", "misses", "waits", "overflows")])
+    yield ("fitness_db_pool_wait_seconds_total", "counter", "Seconds spent waiting for a pooled connection.",
+           [({}, pool["wait_seconds"])])
+    yield ("fitness_lookup_cache_requests_total", "counter", "Lookup table reads by cache result.",
+           [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])])
+
+
+def render():
+    """This worker's metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}"]
+        lines.extend(metric.samples())
+    for name, kind, help, samples in _gauges():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(labels, labels.values())} {_number(value)}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Request hooks
+# ---------------------------
+def _start_request():
+    g._request_started = time.perf_counter()
+    g._query_stats = QueryStats()
+
+
+def _finish_request(response):
+    started = g.pop("_request_started", None)
+    stats = g.get("_query_stats")
+    if started is None or stats is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "none"
+
+    REQUEST_SECONDS.observe((endpoint, request.method), elapsed)
+    REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+    REQUEST_STATEMENTS.observe((endpoint,), stats.statements)
+    DB_STATEMENTS.inc((endpoint,), stats.statements)
+    DB_SECONDS.inc((endpoint,), stats.seconds)
+
+    if current_app.config.get("DB_DEBUG_HEADER") or current_app.debug:
+        db_ms = stats.seconds * 1000
+        response.headers["X-DB-Queries"] = f"{stats.statements}; time={db_ms:.1f}ms; repeated={stats.repeated()}"
+        response.headers.add("Server-Timing", f'db;dur={db_ms:.1f};desc="{stats.statements} queries"')
+        response.headers.add("Server-Timing", f"app;dur={elapsed * 1000:.1f}")
+    return response
+
+
+def metrics_view():
+    return Response(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_app(app):
+    """Record request/SQL metrics for every request and serve them at /metrics."""
+    app.config.setdefault("DB_DEBUG_HEADER", os.environ.get("FITNESS_DB_DEBUG_HEADER") == "1")
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
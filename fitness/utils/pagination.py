@@ -0,0 +1,86 @@
+# fitness/utils/pagination.py
+
+import base64
+import json
+
+from flask import abort, current_app, request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class Page:
+    """One page of newest-first rows plus the cursors around it."""
+
+    def __init__(self, items, limit, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.limit = limit
+        self.next_cursor = next_cursor   # older rows
+        self.prev_cursor = prev_cursor   # newer rows
+
+    def to_dict(self):
+        return {
+            "items": [dict(r) for r in self.items],
+            "limit": self.limit,
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor,
+        }
+
+
+def encode_cursor(row):
+    """Opaque cursor for a row's (date, time, id) sort key."""
+    key = [row["date"], row["time"] or "", row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        date, time, id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(date), str(time), int(id)
+    except Exception:
+        abort(400, "Invalid cursor")
+
+
+def page_size():
+    """?limit= clamped to [1, MAX_PAGE_SIZE]; PAGE_SIZE/MAX_PAGE_SIZE app config override the defaults."""
+    default = current_app.config.get("PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    maximum = current_app.config.get("MAX_PAGE_SIZE", MAX_PAGE_SIZE)
+    limit = request.args.get("limit", default, type=int)
+    return max(1, min(limit, maximum))
+
+
+def keyset_page(conn, select_sql, alias=None, params=()):
+    """Run select_sql (a SELECT ... FROM ... [JOIN ...] with no WHERE/ORDER BY)
+    as one page ordered newest first on (date, time, id).
+
+    Reads ?after= / ?before= cursors and ?limit= from the request. Each page is
+    an index seek, so its cost does not depend on how much history exists.
+    """
+    t = f"{alias}." if alias else ""
+    key = f"({t}date, IFNULL({t}time, ''), {t}id)"
+    limit = page_size()
+    after = request.args.get("after")
+    before = request.args.get("before")
+
+    if before:
+        sql = (f"{select_sql} WHERE {key} > (?, ?, ?) "
+               f"ORDER BY {t}date, IFNULL({t}time, ''), {t}id LIMIT ?")
+        rows = conn.execute(sql, (*params, *decode_cursor(before), limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        items = list(reversed(rows[:limit]))
+        return Page(items, limit,
+                    next_cursor=encode_cursor(items[-1]) if items else None,
+                    prev_cursor=encode_cursor(items[0]) if has_more else None)
+
+    order = f"ORDER BY {t}date DESC, IFNULL({t}time, '') DESC, {t}id DESC LIMIT ?"
+    if after:
+        sql = f"{select_sql} WHERE {key} < (?, ?, ?) {order}"
+        rows = conn.execute(sql, (*params, *decode_cursor(after), limit + 1)).fetchall()
+    else:
+        rows = conn.execute(f"{select_sql} {order}", (*params, limit + 1)).fetchall()
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return Page(items, limit,
+                next_cursor=encode_cursor(items[-1]) if has_more else None,
+                prev_cursor=encode_cursor(items[0]) if after and items else None)